@@ -0,0 +1,71 @@
+"""
+Faster JSON rendering and parsing for the API (REST_FRAMEWORK renderer
+and parser classes in settings.py).
+
+With orjson installed (`pip install orjson`) responses are encoded and
+request bodies decoded by it. Without it, or for anything it cannot
+handle, these classes behave exactly like DRF's JSONRenderer/JSONParser.
+
+Output matches DRF's compact JSON. Values orjson has no type for (lazy
+translations, Decimal, datetimes left in `data`, ...) go through DRF's
+encoder, so they come out the same as before. With UNICODE_JSON,
+COMPACT_JSON or STRICT_JSON turned off DRF's own classes are used.
+"""
+
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    _default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it can."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            # ?indent / "application/json; indent=4": let DRF pretty-print
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            # e.g. integers beyond 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like DRF: U+2028/U+2029 are valid JSON but not valid JavaScript.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser that decodes with orjson when the body is UTF-8."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            # orjson rejects NaN/Infinity, as DRF does with STRICT_JSON
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
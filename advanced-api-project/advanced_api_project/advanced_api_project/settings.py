@@ -17,6 +17,19 @@ INSTALLED_APPS = [
     'api',
 ]
 
+# orjson when installed, DRF's json otherwise (advanced_api_project/renderers.py)
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'advanced_api_project.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'advanced_api_project.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -0,0 +1,99 @@
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from advanced_api_project.renderers import FastJSONRenderer, orjson
+from api.models import Author, Book
+from api.serializers import AuthorSerializer
+
+
+class Command(BaseCommand):
+    """
+    Time and peak memory of an AuthorSerializer(many=True) response (each
+    author with its nested books), split into serializing and rendering,
+    for DRF's JSONRenderer and FastJSONRenderer.
+
+    Authors and books are built in memory, so no database is needed.
+
+    Usage:
+      python manage.py benchmark_serializers
+      python manage.py benchmark_serializers --rows 1000 --books 10
+    """
+
+    help = "Benchmark AuthorSerializer output with the stdlib and the fast JSON renderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            action="append",
+            help="Number of authors (repeatable). Default: 1000, 10000 and 100000.",
+        )
+        parser.add_argument("--books", type=int, default=5, help="Books per author.")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"orjson: {orjson.__version__ if orjson else 'not installed'}")
+        for rows in options["rows"] or [1000, 10000, 100000]:
+            authors = build_authors(rows, options["books"])
+            serialize = lambda: AuthorSerializer(authors, many=True).data
+            data = serialize()
+
+            self.stdout.write(f"{rows} authors, {rows * options['books']} books")
+            ms = timed(serialize, options["repeat"])
+            self.stdout.write(
+                f"  serialize        {ms:>9.1f} ms   peak {peak_memory(serialize) / 2**20:>7.1f} MB"
+            )
+            baseline = None
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                render = lambda: renderer.render(data)
+                ms = timed(render, options["repeat"])
+                baseline = baseline or ms
+                self.stdout.write(
+                    f"  {type(renderer).__name__:<16} {ms:>9.1f} ms   "
+                    f"peak {peak_memory(render) / 2**20:>7.1f} MB   "
+                    f"{len(render()) / 2**20:>6.1f} MB out   ({baseline / max(ms, 0.001):.1f}x)"
+                )
+
+
+def build_authors(count, books_per_author):
+    """Unsaved authors whose `books` are set as if prefetched."""
+    authors = []
+    for i in range(count):
+        author = Author(id=i + 1, name=f"Author {i}")
+        books = [
+            Book(
+                id=i * books_per_author + j + 1,
+                title=f"Book {j} by author {i}",
+                publication_year=1950 + (i + j) % 75,
+                author=author,
+            )
+            for j in range(books_per_author)
+        ]
+        # author.books.all() returns this instead of querying
+        author._prefetched_objects_cache = {"books": books}
+        authors.append(author)
+    return authors
+
+
+def timed(func, repeat):
+    """Median milliseconds of `repeat` runs of `func`."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def peak_memory(func):
+    """Peak bytes allocated while `func` runs (tracemalloc)."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+
+        from .authentication import token_deleted, user_saved
+        from .follows import Follow, follows_changed
+
+        m2m_changed.connect(follows_changed, sender=Follow)
+        # drop cached token lookups on logout / password change
+        post_delete.connect(token_deleted, sender=Token)
+        post_save.connect(user_saved, sender=self.get_model("User"))
@@ -0,0 +1,118 @@
+"""
+Token authentication with a cache in front of the Token + User lookup.
+
+DRF's TokenAuthentication runs `SELECT ... FROM authtoken_token JOIN
+accounts_user` on every request. CachedTokenAuthentication keeps the
+token (with its user) in the cache named by AUTH_TOKEN_CACHE_ALIAS for
+AUTH_TOKEN_CACHE_TIMEOUT seconds, so a warm token costs no query.
+
+Cache keys are "accounts:token:<sha256 of the key>" (raw tokens are never
+used as keys). Entries are dropped when:
+- a token is deleted (logout, rotation: a new key is a new Token row);
+- its user is saved (password change, deactivation, profile edit).
+
+Note: with the default per-process LocMemCache an invalidation only
+reaches the process that handled it; the other workers keep the entry
+until the timeout. Use a shared cache (Redis, Memcached) for
+AUTH_TOKEN_CACHE_ALIAS when running several processes.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+def token_cache():
+    return caches[getattr(settings, "AUTH_TOKEN_CACHE_ALIAS", "default")]
+
+
+def cache_timeout():
+    return getattr(settings, "AUTH_TOKEN_CACHE_TIMEOUT", 300)
+
+
+def cache_key(key):
+    return "accounts:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_tokens(*keys):
+    token_cache().delete_many([cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication ("Authorization: Token <key>") with a lookup cache.
+
+    aauthenticate() is the same check for the async views of the ASGI
+    deployment (social_media_api/async_views.py).
+    """
+
+    def get_key(self, request):
+        """The token from the Authorization header, None if there is none."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_("Invalid token header. No credentials provided."))
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed(
+                _("Invalid token header. Token string should not contain spaces.")
+            )
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _("Invalid token header. Token string should not contain invalid characters.")
+            )
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return self.authenticate_credentials(key)
+
+    def authenticate_credentials(self, key):
+        cache = token_cache()
+        token = cache.get(cache_key(key))
+        if token is None:
+            try:
+                token = Token.objects.select_related("user").get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            cache.set(cache_key(key), token, cache_timeout())
+        return self.check_user(token)
+
+    async def aauthenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cache = token_cache()
+        token = await cache.aget(cache_key(key))
+        if token is None:
+            try:
+                token = await Token.objects.select_related("user").aget(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            await cache.aset(cache_key(key), token, cache_timeout())
+        return self.check_user(token)
+
+    def check_user(self, token):
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return (token.user, token)
+
+
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    invalidate_tokens(*Token.objects.filter(user=instance).values_list("key", flat=True))
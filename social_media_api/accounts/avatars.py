@@ -0,0 +1,102 @@
+"""
+Profile picture renditions.
+
+The uploaded `profile_picture` is kept as is, but clients are given small
+fixed-size copies: for each AVATAR_SIZES entry, a square crop in each of
+AVATAR_FORMATS (WebP, plus JPEG for clients without WebP).
+
+- Uploading a picture (UserSerializer.update) queues `render_avatar`
+  (accounts/tasks.py), so the request does not pay for decoding and
+  resizing a multi-megabyte image. The old renditions are served until
+  the task has rendered the new ones, then deleted; removing the picture
+  drops them straight away.
+- Files are named after a hash of their bytes
+  (avatars/<user id>/<size>-<hash>.<ext>): a URL never changes content,
+  so it can be cached forever, and a new upload gets new URLs.
+- The names are stored in User.avatar_renditions
+  ({"small": {"webp": name, "jpeg": name}, ...}); UserSerializer turns
+  them into URLs without touching the storage.
+"""
+
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Pillow format name and extension of each rendition format
+FORMATS = {"webp": ("WEBP", "webp"), "jpeg": ("JPEG", "jpg")}
+
+
+def avatar_sizes():
+    """Rendition name -> edge in pixels."""
+    return getattr(settings, "AVATAR_SIZES", {"small": 64, "medium": 256})
+
+
+def avatar_formats():
+    return getattr(settings, "AVATAR_FORMATS", ("webp", "jpeg"))
+
+
+def avatar_quality():
+    return getattr(settings, "AVATAR_QUALITY", 80)
+
+
+def open_picture(file):
+    """The picture, upright and in a mode every format can save."""
+    image = Image.open(file)
+    # decode large JPEGs at a fraction of their size (much faster)
+    image.draft("RGB", (max(avatar_sizes().values()),) * 2)
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    return image
+
+
+def encode(image, fmt):
+    """Bytes of `image` saved as rendition format `fmt`."""
+    pil_format, _ = FORMATS[fmt]
+    if pil_format == "JPEG" and image.mode == "RGBA":
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, quality=avatar_quality(), optimize=pil_format == "JPEG")
+    return buffer.getvalue()
+
+
+def build_renditions(user_id, file):
+    """Write every rendition of the picture in `file`; returns their names."""
+    source = open_picture(file)
+    renditions = {}
+    for label, edge in avatar_sizes().items():
+        image = ImageOps.fit(source, (edge, edge), Image.Resampling.LANCZOS)
+        for fmt in avatar_formats():
+            data = encode(image, fmt)
+            digest = hashlib.sha256(data).hexdigest()[:16]
+            name = f"avatars/{user_id}/{label}-{digest}.{FORMATS[fmt][1]}"
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(data))
+            renditions.setdefault(label, {})[fmt] = name
+    return renditions
+
+
+def delete_renditions(renditions, keep=()):
+    for formats in (renditions or {}).values():
+        for name in formats.values():
+            if name not in keep:
+                default_storage.delete(name)
+
+
+def avatar_urls(user, request=None):
+    """{"small": {"webp": url, ...}, ...}, or None if not rendered yet."""
+    if not user.avatar_renditions:
+        return None
+    urls = {}
+    for label, formats in user.avatar_renditions.items():
+        urls[label] = {}
+        for fmt, name in formats.items():
+            url = default_storage.url(name)
+            urls[label][fmt] = request.build_absolute_uri(url) if request else url
+    return urls
@@ -0,0 +1,201 @@
+"""
+Follow graph service: follow/unfollow, denormalized counts and a cached
+"who does this user follow" set.
+
+- follow()/unfollow() change the `followers` through table with a single
+  conditional INSERT/DELETE (same approach as posts/likes.py) and adjust
+  User.follower_count / following_count with F() in the same transaction,
+  only when a row was really added or removed.
+- following_ids(user_id) returns the set of ids a user follows. It is
+  cached under "accounts:following:<user id>" and dropped whenever that
+  user's follows change, so is_following() is a set lookup.
+
+Note: the default LocMemCache is per process and evicts least recently
+used keys once OPTIONS["MAX_ENTRIES"] is reached; with several processes
+use a shared cache. FOLLOW_GRAPH_CACHE_TIMEOUT bounds any staleness.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+User = get_user_model()
+# `a.followers` rows: from_user = a (followed), to_user = the follower
+Follow = User.followers.through
+
+
+def cache_key(user_id):
+    return f"accounts:following:{user_id}"
+
+
+def cache_timeout():
+    return getattr(settings, "FOLLOW_GRAPH_CACHE_TIMEOUT", 600)
+
+
+def following_ids(user_id):
+    """frozenset of the ids `user_id` follows (cached)."""
+    ids = cache.get(cache_key(user_id))
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(to_user_id=user_id).values_list("from_user_id", flat=True)
+        )
+        cache.set(cache_key(user_id), ids, cache_timeout())
+    return ids
+
+
+def is_following(user, target_id):
+    if user is None or not user.is_authenticated:
+        return False
+    return target_id in following_ids(user.pk)
+
+
+def invalidate_following(*user_ids):
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
+
+
+def _change_counts(follower_id, followed_id, delta):
+    User.objects.filter(pk=followed_id).update(
+        follower_count=Greatest(F("follower_count") + delta, 0)
+    )
+    User.objects.filter(pk=follower_id).update(
+        following_count=Greatest(F("following_count") + delta, 0)
+    )
+
+
+def _insert_follow(follower_id, followed_id):
+    """True if the row was inserted, False if the follow already existed."""
+    try:
+        with transaction.atomic():
+            Follow.objects.create(from_user_id=followed_id, to_user_id=follower_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def follow(user, target):
+    """`user` follows `target`. Returns False if it already did."""
+    with transaction.atomic():
+        if not _insert_follow(user.pk, target.pk):
+            return False
+        _change_counts(user.pk, target.pk, 1)
+    invalidate_following(user.pk)
+    return True
+
+
+def unfollow(user, target):
+    """`user` stops following `target`. Returns False if it did not follow."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(from_user_id=target.pk, to_user_id=user.pk).delete()
+        if not deleted:
+            return False
+        _change_counts(user.pk, target.pk, -1)
+    invalidate_following(user.pk)
+    return True
+
+
+def resolve_users(ids=(), usernames=()):
+    """
+    Look up users by id and by username with in_bulk (one query each).
+    Returns ({id: user}, {username: user}).
+    """
+    users = User.objects.only("id", "username", "follower_count")
+    by_id = users.in_bulk(ids) if ids else {}
+    by_username = users.in_bulk(usernames, field_name="username") if usernames else {}
+    return by_id, by_username
+
+
+def bulk_follow(user, targets):
+    """
+    `user` follows every user in `targets` with one bulk INSERT.
+
+    The user's row is locked first, so two imports by the same user do not
+    both count the same new follow. Returns the set of ids newly followed.
+    """
+    target_ids = {target.pk for target in targets} - {user.pk}
+    if not target_ids:
+        return set()
+
+    with transaction.atomic():
+        User.objects.select_for_update().filter(pk=user.pk).exists()
+        existing = set(
+            Follow.objects.filter(to_user_id=user.pk, from_user_id__in=target_ids)
+            .values_list("from_user_id", flat=True)
+        )
+        new_ids = target_ids - existing
+        Follow.objects.bulk_create(
+            [Follow(from_user_id=target_id, to_user_id=user.pk) for target_id in new_ids],
+            ignore_conflicts=True,
+        )
+        User.objects.filter(pk__in=new_ids).update(follower_count=F("follower_count") + 1)
+        User.objects.filter(pk=user.pk).update(
+            following_count=F("following_count") + len(new_ids)
+        )
+    invalidate_following(user.pk)
+    return new_ids
+
+
+def bulk_unfollow(user, targets):
+    """`user` unfollows every user in `targets`. Returns the set of ids unfollowed."""
+    target_ids = {target.pk for target in targets} - {user.pk}
+    if not target_ids:
+        return set()
+
+    with transaction.atomic():
+        User.objects.select_for_update().filter(pk=user.pk).exists()
+        follows = Follow.objects.filter(to_user_id=user.pk, from_user_id__in=target_ids)
+        removed = set(follows.values_list("from_user_id", flat=True))
+        follows.delete()
+        User.objects.filter(pk__in=removed).update(
+            follower_count=Greatest(F("follower_count") - 1, 0)
+        )
+        User.objects.filter(pk=user.pk).update(
+            following_count=Greatest(F("following_count") - len(removed), 0)
+        )
+    invalidate_following(user.pk)
+    return removed
+
+
+def recount(user_ids=None):
+    """Recompute follower/following counts from the through table."""
+    def total(field):
+        rows = (
+            Follow.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        return Coalesce(Subquery(rows), 0)
+
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    return users.update(
+        follower_count=total("from_user"),
+        following_count=total("to_user"),
+    )
+
+
+def follows_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    m2m_changed handler for edits that bypass follow()/unfollow() (admin,
+    shell, `user.following.add(...)`): recount and drop cached sets.
+    """
+    if action == "pre_clear":
+        # pk_set is None for clear(); remember who is affected.
+        own, other = ("to_user_id", "from_user_id") if reverse else ("from_user_id", "to_user_id")
+        instance._follows_cleared = set(
+            Follow.objects.filter(**{own: instance.pk}).values_list(other, flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    others = set(pk_set or ()) | instance.__dict__.pop("_follows_cleared", set())
+    affected = others | {instance.pk}
+    recount(affected)
+    # instance.following changed (reverse) or its followers' sets did
+    invalidate_following(*([instance.pk] if reverse else others))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.authentication import CachedTokenAuthentication, invalidate_tokens
+from posts.benchmarking import SEED_PREFIX, User, timed
+
+
+class Command(BaseCommand):
+    """
+    Compare DRF's TokenAuthentication with CachedTokenAuthentication:
+    queries and time per authenticated request, cold and warm.
+
+    Usage (on a scratch database, see posts/benchmarking.py):
+      python manage.py benchmark_auth
+      python manage.py benchmark_auth --repeat 5000
+    """
+
+    help = "Benchmark token authentication with and without the token cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=f"{SEED_PREFIX}auth", defaults={"password": "!"})
+        token, _ = Token.objects.get_or_create(user=user)
+        factory = APIRequestFactory()
+
+        def authenticate(backend):
+            request = Request(factory.get("/", HTTP_AUTHORIZATION=f"Token {token.key}"))
+            return backend.authenticate(request)
+
+        rows = [
+            # (name, backend, drop the cache entry before each request)
+            ("TokenAuthentication", TokenAuthentication(), False),
+            ("Cached (cold)", CachedTokenAuthentication(), True),
+            ("Cached (warm)", CachedTokenAuthentication(), False),
+        ]
+        for name, backend, cold in rows:
+            def run():
+                if cold:
+                    invalidate_tokens(token.key)
+                return authenticate(backend)
+
+            with CaptureQueriesContext(connection) as queries:
+                run()
+            median, p95 = timed(run, repeat=options["repeat"])
+            self.stdout.write(
+                f"{name:<22} {len(queries)} queries/request   "
+                f"median {median * 1000:>7.1f} us   p95 {p95 * 1000:>7.1f} us"
+            )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from accounts.tasks import render_avatar
+from tasks.queue import enqueue
+
+
+class Command(BaseCommand):
+    """
+    Queue rendering of profile picture renditions (accounts/avatars.py)
+    for users that have a picture but no renditions, e.g. after the
+    migration that added them. `run_workers` (or the web process) renders.
+
+    Usage:
+      python manage.py render_avatars
+      python manage.py render_avatars --all    # re-render every picture
+    """
+
+    help = "Queue avatar renditions for users whose picture has none."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true")
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_picture="").exclude(profile_picture__isnull=True)
+        if not options["all"]:
+            users = users.filter(avatar_renditions={})
+        queued = 0
+        for user_id, picture in users.values_list("id", "profile_picture").iterator():
+            enqueue(
+                render_avatar,
+                {"user_id": user_id, "picture": picture},
+                key=f"avatar:{user_id}:{picture}",
+            )
+            queued += 1
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} avatars."))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    Follow = User.followers.through
+
+    def total(field):
+        rows = (
+            Follow.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        return Coalesce(Subquery(rows), 0)
+
+    User.objects.update(follower_count=total("from_user"), following_count=total("to_user"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -12,11 +12,16 @@ class User(AbstractUser):
     Adds:
       - bio: short text about the user
       - profile_picture: an optional image upload
+      - avatar_renditions: storage names of the small copies of
+        profile_picture (accounts/avatars.py), empty until rendered
       - followers: users who follow this user (many-to-many self relation)
+      - follower_count / following_count: denormalized sizes of the two
+        sides of `followers`, kept up to date by accounts/follows.py
     """
 
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    avatar_renditions = models.JSONField(default=dict, blank=True)
 
     followers = models.ManyToManyField(
         "self",
@@ -24,6 +29,8 @@ class User(AbstractUser):
         related_name="following",
         blank=True,
     )
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.username
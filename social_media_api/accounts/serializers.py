@@ -1,16 +1,80 @@
 from django.contrib.auth import authenticate, get_user_model
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.authtoken.models import Token  
 
+from tasks.queue import enqueue
+
+from .avatars import avatar_urls, delete_renditions
+from .follows import is_following
+from .tasks import render_avatar
+from .uploads import CheckedImageField
+
 User = get_user_model()
 
 
 class UserSerializer(serializers.ModelSerializer):
-    """Basic serializer to show user info."""
+    """
+    Basic serializer to show user info.
+
+    `is_following` tells whether the requesting user follows this one; it
+    is answered from the cached following set (accounts/follows.py), so
+    serializing a list of users adds no queries.
+
+    `avatar` has the URLs of the small WebP/JPEG copies of the profile
+    picture (accounts/avatars.py); null until they are rendered.
+    """
+
+    profile_picture = CheckedImageField(required=False, allow_null=True, max_length=100)
+    is_following = serializers.SerializerMethodField()
+    avatar = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ["id", "username", "email", "bio", "profile_picture"]
+        fields = [
+            "id",
+            "username",
+            "email",
+            "bio",
+            "profile_picture",
+            "avatar",
+            "follower_count",
+            "following_count",
+            "is_following",
+        ]
+        read_only_fields = ["follower_count", "following_count"]
+
+    def get_is_following(self, obj):
+        request = self.context.get("request")
+        return is_following(getattr(request, "user", None), obj.pk)
+
+    def get_avatar(self, obj):
+        return avatar_urls(obj, self.context.get("request"))
+
+    def update(self, instance, validated_data):
+        # Save only the edited columns so a profile edit never writes back
+        # stale follower/following counts.
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        fields = list(validated_data)
+        new_picture = "profile_picture" in validated_data
+        old_renditions = instance.avatar_renditions
+        if new_picture and not instance.profile_picture:
+            instance.avatar_renditions = {}
+            fields.append("avatar_renditions")
+        with transaction.atomic():
+            instance.save(update_fields=fields)
+            if new_picture and instance.profile_picture:
+                # the old renditions are served until the new ones replace them
+                picture = instance.profile_picture.name
+                enqueue(
+                    render_avatar,
+                    {"user_id": instance.pk, "picture": picture},
+                    key=f"avatar:{instance.pk}:{picture}",
+                )
+            elif new_picture:
+                transaction.on_commit(lambda: delete_renditions(old_renditions))
+        return instance
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -50,3 +114,24 @@ class LoginSerializer(serializers.Serializer):
 
         attrs["user"] = user
         return attrs
+
+
+class BulkFollowSerializer(serializers.Serializer):
+    """Users to (un)follow, by id and/or username."""
+
+    MAX_USERS = 500
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, max_length=MAX_USERS
+    )
+    usernames = serializers.ListField(
+        child=serializers.CharField(), required=False, max_length=MAX_USERS
+    )
+
+    def validate(self, attrs):
+        total = len(attrs.get("ids", [])) + len(attrs.get("usernames", []))
+        if not total:
+            raise serializers.ValidationError("Give at least one of ids or usernames.")
+        if total > self.MAX_USERS:
+            raise serializers.ValidationError(f"At most {self.MAX_USERS} users per request.")
+        return attrs
@@ -0,0 +1,27 @@
+"""Background tasks of the accounts app (run through tasks/queue.py)."""
+
+from tasks.queue import task
+
+from .avatars import build_renditions, delete_renditions
+from .models import User
+
+
+@task("accounts.render_avatar")
+def render_avatar(user_id, picture):
+    """Render the renditions of `picture` if it is still the user's picture."""
+    user = User.objects.filter(pk=user_id, profile_picture=picture).first()
+    if user is None:  # replaced or removed since the upload
+        return
+    with user.profile_picture.open("rb") as file:
+        renditions = build_renditions(user_id, file)
+    updated = User.objects.filter(pk=user_id, profile_picture=picture).update(
+        avatar_renditions=renditions
+    )
+    if updated:
+        delete_renditions(user.avatar_renditions, keep=_names(renditions))
+    else:
+        delete_renditions(renditions)
+
+
+def _names(renditions):
+    return {name for formats in renditions.values() for name in formats.values()}
@@ -1,3 +1,344 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import struct
+import tempfile
+import tracemalloc
+import zlib
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from asgiref.sync import async_to_sync
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from posts.models import Post, TimelineEntry
+from tasks.models import Job
+from tasks.queue import claim_due, execute
+
+from .authentication import CachedTokenAuthentication
+from .follows import follow, following_ids, unfollow
+from .serializers import UserSerializer
+
+User = get_user_model()
+
+MB = 2**20
+
+
+def png(width=8, height=8, mode="RGB", color="red"):
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def png_header(width, height):
+    """The start of a PNG claiming to be width x height, without the pixels."""
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", b"\0" * 16)
+
+
+class ProfilePictureUploadTests(TestCase):
+    """Uploads to /profile/ (accounts/uploads.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name="picture.png"):
+        body = encode_multipart(
+            BOUNDARY, {"profile_picture": SimpleUploadedFile(name, content)}
+        )
+        with self.settings(MEDIA_ROOT=self.media_root):
+            return self.client.generic("PATCH", "/profile/", body, content_type=MULTIPART_CONTENT)
+
+    def test_image(self):
+        response = self.upload(png())
+        self.assertEqual(response.status_code, 200, response.content)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.profile_picture.name.endswith(".png"))
+
+    def test_too_large(self):
+        response = self.upload(png() + bytes(50 * MB))
+        self.assertEqual(response.status_code, 413, response.content)
+
+    def test_too_many_pixels(self):
+        response = self.upload(png_header(20000, 20000))
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertIn("profile_picture", response.json())
+
+    def test_not_an_image(self):
+        response = self.upload(b"not an image\n" * 1000, name="picture.png")
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertIn("profile_picture", response.json())
+
+    @override_settings(AVATAR_UPLOAD_MAX_BYTES=64 * MB)
+    def test_large_upload_memory_is_bounded(self):
+        # an image header followed by 50 MB the handler streams to disk
+        body = encode_multipart(
+            BOUNDARY,
+            {"profile_picture": SimpleUploadedFile("big.png", png() + bytes(50 * MB))},
+        )
+        tracemalloc.start()
+        try:
+            with self.settings(MEDIA_ROOT=self.media_root):
+                response = self.client.generic(
+                    "PATCH", "/profile/", body, content_type=MULTIPART_CONTENT
+                )
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(response.status_code, 200, response.content)
+        # the test client keeps its own copy of the request body; on top of
+        # that, handling the upload must not hold more than a few MB
+        self.assertLess(peak - len(body), 8 * MB, f"peak {peak} bytes")
+
+
+@override_settings(TASKS_MODE="worker", AVATAR_SIZES={"small": 16, "medium": 32})
+class AvatarRenditionTests(TestCase):
+    """Profile picture renditions (accounts/avatars.py, accounts/tasks.py)."""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content):
+        body = encode_multipart(
+            BOUNDARY, {"profile_picture": SimpleUploadedFile("picture.png", content)}
+        )
+        response = self.client.generic("PATCH", "/profile/", body, content_type=MULTIPART_CONTENT)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def run_jobs(self):
+        for job_id in claim_due(10):
+            execute(job_id)
+
+    def avatar(self):
+        return self.client.get("/profile/").json()["avatar"]
+
+    def renditions(self):
+        self.user.refresh_from_db()
+        return self.user.avatar_renditions
+
+    def test_rendered_by_the_task(self):
+        self.assertIsNone(self.upload(png(120, 80, "RGBA", (255, 0, 0, 128)))["avatar"])
+        self.assertEqual(Job.objects.get().name, "accounts.render_avatar")
+        self.run_jobs()
+
+        avatar = self.avatar()
+        self.assertEqual(set(avatar), {"small", "medium"})
+        self.assertTrue(avatar["small"]["webp"].endswith(".webp"))
+        self.assertTrue(avatar["small"]["jpeg"].endswith(".jpg"))
+        for label, edge in (("small", 16), ("medium", 32)):
+            for fmt, pil_format in (("webp", "WEBP"), ("jpeg", "JPEG")):
+                with default_storage.open(self.renditions()[label][fmt]) as file:
+                    image = Image.open(file)
+                    self.assertEqual((image.format, image.size), (pil_format, (edge, edge)))
+
+    def test_old_renditions_until_the_new_ones(self):
+        self.upload(png(color="red"))
+        self.run_jobs()
+        old = self.renditions()
+
+        self.assertEqual(self.upload(png(color="blue"))["avatar"], self.avatar())
+        self.assertEqual(self.renditions(), old)
+        self.run_jobs()
+        new = self.renditions()
+        self.assertNotEqual(new["small"]["webp"], old["small"]["webp"])
+        self.assertFalse(default_storage.exists(old["small"]["webp"]))
+        self.assertTrue(default_storage.exists(new["small"]["webp"]))
+
+    def test_replaced_picture_is_not_rendered(self):
+        self.upload(png(color="red"))
+        self.upload(png(color="blue"))
+        # both jobs run; only the current picture gets renditions
+        self.run_jobs()
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        names = [name for formats in self.renditions().values() for name in formats.values()]
+        _, files = default_storage.listdir(f"avatars/{self.user.pk}")
+        self.assertEqual(sorted(files), sorted(os.path.basename(name) for name in names))
+
+    def test_render_avatars_command(self):
+        self.upload(png())
+        Job.objects.all().delete()
+        call_command("render_avatars", stdout=io.StringIO())
+        self.assertEqual(Job.objects.count(), 1)
+        self.run_jobs()
+        call_command("render_avatars", stdout=io.StringIO())
+        self.assertEqual(Job.objects.count(), 1)
+
+
+class TokenCacheTests(TestCase):
+    """The token lookup cache (accounts/authentication.py)."""
+
+    def setUp(self):
+        caches["auth_tokens"].clear()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_warm_token_costs_no_query(self):
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual((user, token), (self.user, self.token))
+
+    def test_async_lookup_shares_the_cache(self):
+        self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, _ = async_to_sync(self.auth.aauthenticate_credentials)(self.token.key)
+        self.assertEqual(user, self.user)
+
+    def test_logout_drops_the_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.assertEqual(client.get("/profile/").status_code, 200)
+        self.assertEqual(client.post("/logout/").status_code, 204)
+        self.assertEqual(client.get("/profile/").status_code, 401)
+
+    def test_user_changes_drop_the_token(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_unknown_token(self):
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials("nope")
+
+
+class FollowGraphTests(TestCase):
+    """Follows, their counts and the cached following set (accounts/follows.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user("alice", password="pw")
+        self.bob = User.objects.create_user("bob", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def counts(self):
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        return self.alice.following_count, self.bob.follower_count
+
+    def test_follow_and_unfollow(self):
+        for _ in range(2):
+            response = self.client.post(f"/follow/{self.bob.pk}/")
+            self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.counts(), (1, 1))
+        self.assertEqual(following_ids(self.alice.pk), {self.bob.pk})
+
+        for _ in range(2):
+            self.client.post(f"/unfollow/{self.bob.pk}/")
+        self.assertEqual(self.counts(), (0, 0))
+        self.assertEqual(following_ids(self.alice.pk), set())
+
+    def test_repeats_report_no_change(self):
+        self.assertTrue(follow(self.alice, self.bob))
+        self.assertFalse(follow(self.alice, self.bob))
+        self.assertTrue(unfollow(self.alice, self.bob))
+        self.assertFalse(unfollow(self.alice, self.bob))
+
+    def test_following_set_is_cached(self):
+        follow(self.alice, self.bob)
+        following_ids(self.alice.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(following_ids(self.alice.pk), {self.bob.pk})
+
+    def test_is_following_without_queries_per_user(self):
+        follow(self.alice, self.bob)
+        carol = User.objects.create_user("carol", password="pw")
+        request = SimpleNamespace(user=self.alice)
+        following_ids(self.alice.pk)
+        with self.assertNumQueries(0):
+            data = UserSerializer([self.bob, carol], many=True, context={"request": request}).data
+        self.assertEqual([user["is_following"] for user in data], [True, False])
+
+    def test_edits_outside_the_service(self):
+        following_ids(self.alice.pk)
+        # alice.following: the users alice follows
+        self.alice.following.add(self.bob)
+        self.assertEqual(following_ids(self.alice.pk), {self.bob.pk})
+        self.assertEqual(self.counts(), (1, 1))
+        self.bob.followers.clear()
+        self.assertEqual(following_ids(self.alice.pk), set())
+        self.assertEqual(self.counts(), (0, 0))
+
+
+class BulkFollowTests(TestCase):
+    """POST /follow/bulk/ and /unfollow/bulk/ (accounts/follows.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user("alice", password="pw")
+        self.bob = User.objects.create_user("bob", password="pw")
+        self.carol = User.objects.create_user("carol", password="pw")
+        self.dave = User.objects.create_user("dave", password="pw")
+        follow(self.alice, self.dave)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def post(self, url, data):
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def statuses(self, body):
+        return [result["status"] for result in body["results"]]
+
+    def test_follow(self):
+        post = Post.objects.create(author=self.carol, title="t", content="c")
+        body = self.post(
+            "/follow/bulk/",
+            {"ids": [self.bob.pk, self.dave.pk, 9999, self.alice.pk], "usernames": ["carol"]},
+        )
+        self.assertEqual(body["followed"], 2)
+        self.assertEqual(
+            self.statuses(body),
+            ["followed", "already_following", "not_found", "self", "followed"],
+        )
+        self.assertEqual(following_ids(self.alice.pk), {self.bob.pk, self.carol.pk, self.dave.pk})
+        self.alice.refresh_from_db()
+        self.carol.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.carol.follower_count), (3, 1))
+        # the new author's posts are backfilled into the timeline
+        self.assertTrue(TimelineEntry.objects.filter(user=self.alice, post=post).exists())
+
+    def test_unfollow(self):
+        body = self.post("/unfollow/bulk/", {"ids": [self.dave.pk, self.bob.pk]})
+        self.assertEqual(body["unfollowed"], 1)
+        self.assertEqual(self.statuses(body), ["unfollowed", "not_following"])
+        self.assertEqual(following_ids(self.alice.pk), set())
+        self.dave.refresh_from_db()
+        self.assertEqual(self.dave.follower_count, 0)
+
+    def test_invalid_body(self):
+        for data in ({}, {"ids": list(range(1, 502))}):
+            response = self.client.post("/follow/bulk/", data, format="json")
+            self.assertEqual(response.status_code, 400, data)
@@ -0,0 +1,126 @@
+"""
+Bounded streaming upload of profile pictures (ProfileView).
+
+BoundedImageUploadHandler replaces Django's default upload handlers for
+that view:
+
+- the request is refused up front (413) if its Content-Length is over
+  AVATAR_UPLOAD_MAX_BYTES, and the upload is stopped as soon as more
+  than that has been received (chunked or lying clients);
+- every chunk goes straight to a temporary file, so memory use is a
+  chunk (64 KB) plus the header bytes, whatever the size of the upload;
+- the image header is read from the first chunks: a file Pillow does not
+  recognise, or with more than AVATAR_UPLOAD_MAX_PIXELS pixels (a
+  decompression bomb), is rejected before the rest is read;
+- a SHA-256 of the content is computed while streaming and used as the
+  file name.
+
+The header Pillow read is kept on the file as `image_info`; CheckedImageField
+(the serializer field of `profile_picture`) takes that as proof the file
+is an image instead of opening and verifying it a second time.
+"""
+
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException, ValidationError
+
+# extension of the stored file, from the format Pillow detected
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+# bytes of the upload inspected for the image header
+HEADER_BYTES = 256 * 2**10
+
+
+def max_upload_bytes():
+    return getattr(settings, "AVATAR_UPLOAD_MAX_BYTES", 10 * 2**20)
+
+
+def max_upload_pixels():
+    return getattr(settings, "AVATAR_UPLOAD_MAX_PIXELS", 40_000_000)
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "The upload is too large."
+    default_code = "upload_too_large"
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    """Streams image uploads to disk, enforcing size and pixel limits."""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # multipart overhead (boundaries, other fields) is small; allow a margin
+        if content_length > max_upload_bytes() + 64 * 2**10:
+            raise self.too_large()
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.field_name = field_name
+        self.digest = hashlib.sha256()
+        self.head = bytearray()
+        self.image_info = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > max_upload_bytes():
+            self.abort(self.too_large())
+        self.digest.update(raw_data)
+        if self.image_info is None:
+            self.head += raw_data[: HEADER_BYTES - len(self.head)]
+            self.inspect_header(complete=len(self.head) >= HEADER_BYTES)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.image_info is None:
+            self.inspect_header(complete=True)
+        self.head = None
+        file = super().file_complete(file_size)
+        extension = EXTENSIONS.get(self.image_info["format"], "img")
+        file.name = f"{self.digest.hexdigest()[:32]}.{extension}"
+        file.image_info = self.image_info
+        return file
+
+    def inspect_header(self, complete):
+        """Read size and format from the bytes so far; reject bad images."""
+        try:
+            with Image.open(io.BytesIO(self.head)) as image:
+                width, height = image.size
+                self.image_info = {"format": image.format, "width": width, "height": height}
+        except Image.DecompressionBombError:
+            self.abort(self.invalid("The image has too many pixels."))
+        except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+            if complete:
+                self.abort(self.invalid("Upload a valid image."))
+            return  # header not complete yet
+        if width * height > max_upload_pixels():
+            self.abort(
+                self.invalid(f"The image is too large ({width}x{height} pixels).")
+            )
+
+    def abort(self, exc):
+        self.upload_interrupted()
+        raise exc
+
+    def too_large(self):
+        limit = max_upload_bytes() // 2**20
+        return UploadTooLarge(f"Uploads are limited to {limit} MB.")
+
+    def invalid(self, message):
+        return ValidationError({self.field_name: [message]})
+
+
+class CheckedImageField(serializers.ImageField):
+    """
+    ImageField that does not re-read files BoundedImageUploadHandler has
+    already checked (they carry `image_info`); other files are verified
+    with Pillow as usual.
+    """
+
+    def to_internal_value(self, data):
+        if getattr(data, "image_info", None) is None:
+            return super().to_internal_value(data)
+        return serializers.FileField.to_internal_value(self, data)
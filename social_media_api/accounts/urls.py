@@ -1,11 +1,23 @@
 from django.urls import path
-from .views import RegisterView, LoginView, ProfileView, FollowUserView, UnfollowUserView
+from .views import (
+    RegisterView,
+    LoginView,
+    LogoutView,
+    ProfileView,
+    FollowUserView,
+    UnfollowUserView,
+    BulkFollowUserView,
+    BulkUnfollowUserView,
+)
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
     path("login/", LoginView.as_view(), name="login"),
+    path("logout/", LogoutView.as_view(), name="logout"),
     path("profile/", ProfileView.as_view(), name="profile"),
         
     path("follow/<int:user_id>/", FollowUserView.as_view(), name="follow-user"),
     path("unfollow/<int:user_id>/", UnfollowUserView.as_view(), name="unfollow-user"),  
+    path("follow/bulk/", BulkFollowUserView.as_view(), name="follow-bulk"),
+    path("unfollow/bulk/", BulkUnfollowUserView.as_view(), name="unfollow-bulk"),
 ]
@@ -5,13 +5,23 @@ from rest_framework.generics import RetrieveUpdateAPIView
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from notifications.utils import create_notification
+from posts.timeline import (
+    add_author_to_timeline,
+    add_authors_to_timeline,
+    remove_author_from_timeline,
+    remove_authors_from_timeline,
+)
+
+from .follows import bulk_follow, bulk_unfollow, follow, resolve_users, unfollow
 
 
 from .models import CustomUser, User
+from .uploads import BoundedImageUploadHandler
 from .serializers import (
     UserSerializer,
     RegisterSerializer,
     LoginSerializer,
+    BulkFollowSerializer,
 )
 
 
@@ -37,6 +47,8 @@ class RegisterView(APIView):
 # ------------------ Login ------------------
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
+    # per client IP (throttling/throttles.py): slows down password guessing
+    throttle_scope = "login"
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -53,13 +65,42 @@ class LoginView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ------------------ Logout ------------------
+class LogoutView(APIView):
+    """
+    POST /logout/
+    Deletes the token used for this request (which also drops it from the
+    token cache, see accounts/authentication.py).
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if isinstance(request.auth, Token):
+            Token.objects.filter(key=request.auth.key).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # ------------------ Profile ------------------
 class ProfileView(RetrieveUpdateAPIView):
+    """
+    GET/PUT/PATCH /profile/
+    The current user's profile. `profile_picture` uploads are streamed to
+    disk and checked while they arrive (accounts/uploads.py).
+    """
+
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def initialize_request(self, request, *args, **kwargs):
+        # before anything reads the body
+        request.upload_handlers = [BoundedImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def get_object(self):
-        return self.request.user
+        # request.user may come from the token cache; show and edit the
+        # current row (counts change without touching the cached copy).
+        return User.objects.get(pk=self.request.user.pk)
 
 
 # ------------------ Follow ------------------
@@ -70,6 +111,7 @@ class FollowUserView(generics.GenericAPIView):
     """
 
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "follow"
     queryset = CustomUser.objects.all()  
 
     def post(self, request, user_id):
@@ -84,7 +126,8 @@ class FollowUserView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        request.user.following.add(target_user)
+        if follow(request.user, target_user):
+            add_author_to_timeline(request.user, target_user)
         return Response(
             {"detail": f"You are now following {target_user.username}."},
             status=status.HTTP_200_OK,
@@ -99,6 +142,7 @@ class UnfollowUserView(generics.GenericAPIView):
     """
 
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "follow"
     queryset = CustomUser.objects.all()  
 
     def post(self, request, user_id):
@@ -113,10 +157,96 @@ class UnfollowUserView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        request.user.following.remove(target_user)
+        if unfollow(request.user, target_user):
+            remove_author_from_timeline(request.user, target_user)
         return Response(
             {"detail": f"You have unfollowed {target_user.username}."},
             status=status.HTTP_200_OK,
         )
-    
 
+
+# ------------------ Bulk follow / unfollow ------------------
+def follow_many(user, targets):
+    """Follow `targets` and backfill the new ones into the timeline; returns their ids."""
+    new_ids = bulk_follow(user, targets)
+    add_authors_to_timeline(user, [target for target in targets if target.pk in new_ids])
+    return new_ids
+
+
+def unfollow_many(user, targets):
+    """Unfollow `targets` and drop their posts from the timeline; returns the ids removed."""
+    removed = bulk_unfollow(user, targets)
+    remove_authors_from_timeline(user, removed)
+    return removed
+
+
+class BulkFollowBaseView(APIView):
+    """
+    Shared request handling for the bulk endpoints: validates the body,
+    resolves ids/usernames with in_bulk and reports a status per entry,
+    in the order given.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    # one request counts once, however many users it lists
+    throttle_scope = "follow"
+    # (user, targets) -> set of ids actually changed
+    operation = None
+    done_status = None
+    unchanged_status = None
+
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get("ids", [])
+        usernames = serializer.validated_data.get("usernames", [])
+
+        by_id, by_username = resolve_users(ids, usernames)
+        requested = [("id", value, by_id.get(value)) for value in ids]
+        requested += [("username", value, by_username.get(value)) for value in usernames]
+
+        targets = {user.pk: user for _, _, user in requested if user is not None}
+        changed = self.operation(request.user, list(targets.values()))
+
+        results = []
+        for key, value, user in requested:
+            if user is None:
+                result = "not_found"
+            elif user.pk == request.user.pk:
+                result = "self"
+            elif user.pk in changed:
+                result = self.done_status
+            else:
+                result = self.unchanged_status
+            results.append({key: value, "user_id": getattr(user, "pk", None), "status": result})
+
+        return Response(
+            {self.done_status: len(changed), "results": results},
+            status=status.HTTP_200_OK,
+        )
+
+
+class BulkFollowUserView(BulkFollowBaseView):
+    """
+    POST /follow/bulk/
+    {"ids": [1, 2], "usernames": ["alice"]}  (up to 500 users)
+
+    One lookup per key type, one INSERT for all new follows. Each entry
+    comes back as followed / already_following / not_found / self.
+    """
+
+    operation = staticmethod(follow_many)
+    done_status = "followed"
+    unchanged_status = "already_following"
+
+
+class BulkUnfollowUserView(BulkFollowBaseView):
+    """
+    POST /unfollow/bulk/
+    Same body as /follow/bulk/. Each entry comes back as unfollowed /
+    not_following / not_found / self.
+    """
+
+    operation = staticmethod(unfollow_many)
+    done_status = "unfollowed"
+    unchanged_status = "not_following"
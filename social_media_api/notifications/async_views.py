@@ -0,0 +1,53 @@
+"""
+Async (ASGI) views of the notifications app, mounted by
+social_media_api/urls_asgi.py: the notification list and the live
+stream (which needs ASGI and has no WSGI counterpart).
+"""
+
+from django.http import StreamingHttpResponse
+
+from social_media_api.async_views import AsyncAPIView
+from social_media_api.sparse_fields import sparse_queryset
+from .models import Notification
+from .serializers import NotificationSerializer
+from .stream import event_stream
+from .views import NotificationListView, NotificationPagination
+
+
+class AsyncNotificationListView(AsyncAPIView):
+    """GET /notifications/ (async), see NotificationListView."""
+
+    query_budget = NotificationListView.query_budget
+    read_from_replica = NotificationListView.read_from_replica
+
+    async def get(self, request):
+        drf_request = self.drf_request(request)
+        paginator = NotificationPagination()
+        notifications = sparse_queryset(
+            Notification.objects.filter(recipient=request.user).select_related("actor"),
+            NotificationSerializer, drf_request, keep=NotificationPagination.ordering,
+        )
+
+        page = await paginator.apaginate_queryset(notifications, drf_request)
+        serializer = NotificationSerializer(page, many=True, context={"request": drf_request})
+        return self.json(paginator.get_paginated_data(serializer.data))
+
+
+class AsyncNotificationStreamView(AsyncAPIView):
+    """
+    GET /notifications/stream/
+    - Server-sent events: new and updated notifications of the current
+      user, pushed as they are saved (see notifications/stream.py).
+    - Send Last-Event-ID (or ?last_event_id=) to resume after a reconnect.
+    """
+
+    async def get(self, request):
+        last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+        response = StreamingHttpResponse(
+            event_stream(request.user.pk, last_event_id),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # tell nginx not to buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
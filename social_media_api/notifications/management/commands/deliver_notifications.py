@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from notifications.utils import deliver_outbox
+
+
+class Command(BaseCommand):
+    """
+    Deliver notification events left in the outbox (e.g. by a process that
+    stopped before its background worker finished).
+
+    Usage:
+      python manage.py deliver_notifications
+    """
+
+    help = "Move pending NotificationOutbox rows into the Notification table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        delivered = deliver_outbox(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Delivered {delivered} notifications."))
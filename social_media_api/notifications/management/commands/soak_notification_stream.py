@@ -0,0 +1,201 @@
+import asyncio
+import resource
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from posts.benchmarking import SEED_PREFIX, User
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Soak test for GET /notifications/stream/: hold thousands of idle SSE
+    connections open on a running ASGI server, then like one post of each
+    stream's user through the API and measure how fast the notification
+    reaches every stream.
+
+    Usage (seeded database shared with the server; one worker, since the
+    in-process broker does not cross processes):
+      uvicorn social_media_api.asgi:application --port 8001
+      python manage.py soak_notification_stream --url http://127.0.0.1:8001 --connections 5000
+    """
+
+    help = "Open many idle notification streams and measure heartbeats and delivery latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8001")
+        parser.add_argument("--connections", type=int, default=2000)
+        parser.add_argument("--users", type=int, default=50, help="Distinct stream users.")
+        parser.add_argument("--idle", type=float, default=30.0, help="Seconds to stay idle first.")
+        parser.add_argument("--wait", type=float, default=10.0, help="Seconds to wait for delivery.")
+        parser.add_argument("--pid", type=int, help="Server process id, to report its memory.")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http":
+            raise CommandError("Only http:// URLs are supported.")
+        self.host, self.port = url.hostname, url.port or 80
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        if options["connections"] + 100 > hard:
+            raise CommandError(f"Open file limit is {hard}; lower --connections.")
+
+        self.targets, self.liker_token = self.fixtures(options["users"])
+        asyncio.run(self.run(options))
+
+    def fixtures(self, count):
+        """[(token of a stream user, id of one of their posts)], token of the liker."""
+        authors = (
+            Post.objects.filter(author__username__startswith=SEED_PREFIX)
+            .order_by("author_id")
+            .values_list("author_id", flat=True)
+            .distinct()[:count + 1]
+        )
+        authors = list(authors)
+        if len(authors) < 2:
+            raise CommandError("Needs seeded users with posts (run benchmark_queries --seed).")
+        liker, authors = authors[0], authors[1:]
+
+        targets = []
+        for author_id in authors:
+            token, _ = Token.objects.get_or_create(user_id=author_id)
+            post_id = Post.objects.filter(author_id=author_id).values_list("id", flat=True).first()
+            targets.append((token.key, post_id))
+        liker_token, _ = Token.objects.get_or_create(user=User.objects.get(pk=liker))
+        return targets, liker_token.key
+
+    async def run(self, options):
+        streams = [
+            Stream(self, self.targets[i % len(self.targets)][0])
+            for i in range(options["connections"])
+        ]
+
+        started = time.perf_counter()
+        handshakes = asyncio.Semaphore(200)
+        tasks = [asyncio.create_task(stream.run(handshakes)) for stream in streams]
+        while sum(stream.connected for stream in streams) + sum(stream.failed for stream in streams) < len(streams):
+            await asyncio.sleep(0.2)
+        connected = sum(stream.connected for stream in streams)
+        self.stdout.write(
+            f"{connected}/{len(streams)} streams open after {time.perf_counter() - started:.1f}s"
+            f"{self.server_memory(options)}"
+        )
+
+        await asyncio.sleep(options["idle"])
+        alive = sum(stream.connected and not stream.closed for stream in streams)
+        heartbeats = sum(stream.heartbeats for stream in streams)
+        self.stdout.write(
+            f"after {options['idle']:.0f}s idle: {alive} alive, {heartbeats} heartbeats"
+            f"{self.server_memory(options)}"
+        )
+
+        sent_at = {}
+        for token, post_id in self.targets:
+            sent_at[token] = time.perf_counter()
+            await self.like(post_id)
+        await asyncio.sleep(options["wait"])
+
+        latencies = [
+            (stream.event_at - sent_at[stream.token]) * 1000
+            for stream in streams
+            if stream.event_at is not None
+        ]
+        expected = sum(stream.connected and not stream.closed for stream in streams)
+        if latencies:
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(
+                f"delivered to {len(latencies)}/{expected} streams   "
+                f"p50 {statistics.median(latencies):.0f} ms   p99 {p99:.0f} ms"
+            )
+        else:
+            self.stdout.write(f"delivered to 0/{expected} streams")
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def like(self, post_id):
+        """Unlike, then like the post as the liker (a like on a liked post would remove it)."""
+        for action in ("unlike", "like"):
+            await self.post(f"/api/posts/{post_id}/{action}/")
+
+    async def post(self, path):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(
+                (
+                    f"POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                    f"Authorization: Token {self.liker_token}\r\n"
+                    "Content-Length: 0\r\nConnection: close\r\n\r\n"
+                ).encode("ascii")
+            )
+            await writer.drain()
+            await reader.read()
+        finally:
+            writer.close()
+
+    def server_memory(self, options):
+        if not options["pid"]:
+            return ""
+        try:
+            with open(f"/proc/{options['pid']}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        return f"   (server RSS {int(line.split()[1]) // 1024} MB)"
+        except OSError:
+            pass
+        return ""
+
+
+class Stream:
+    """One SSE client: connects, then counts heartbeats and events."""
+
+    def __init__(self, command, token):
+        self.command = command
+        self.token = token
+        self.connected = False
+        self.failed = False
+        self.closed = False
+        self.heartbeats = 0
+        self.event_at = None
+
+    async def run(self, handshakes):
+        try:
+            async with handshakes:
+                reader, writer = await asyncio.open_connection(self.command.host, self.command.port)
+                writer.write(
+                    (
+                        f"GET /notifications/stream/ HTTP/1.1\r\n"
+                        f"Host: {self.command.host}:{self.command.port}\r\n"
+                        f"Authorization: Token {self.token}\r\n"
+                        "Accept: text/event-stream\r\n\r\n"
+                    ).encode("ascii")
+                )
+                await writer.drain()
+                status = await reader.readline()
+                if b" 200 " not in status:
+                    self.failed = True
+                    return
+                self.connected = True
+        except OSError:
+            self.failed = True
+            return
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.startswith(b": heartbeat"):
+                    self.heartbeats += 1
+                elif line.startswith(b"id:") and self.event_at is None:
+                    self.event_at = time.perf_counter()
+        finally:
+            self.closed = True
+            writer.close()
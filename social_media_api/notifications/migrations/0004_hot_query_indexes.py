@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0003_notification_aggregation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'read', '-timestamp'], name='notif_recipient_read_ts'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read', False)), fields=['recipient', '-timestamp'], name='notif_recipient_unread'),
+        ),
+    ]
@@ -18,6 +18,14 @@ class Notification(models.Model):
       - recipient: alice
       - verb: "liked your post"
       - target: Post object that was liked
+
+    Notifications are aggregated: another event with the same
+    (recipient, verb, target) while the row is unread and inside
+    NOTIFICATIONS_AGGREGATION_WINDOW updates this row instead of adding one
+    ("bob and 41 others liked your post").
+      - actor: the most recent actor
+      - actor_count: how many actors the group stands for
+      - recent_actors: [{"id": ..., "username": ...}], newest first
     """
 
     recipient = models.ForeignKey(
@@ -45,9 +53,61 @@ class Notification(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
 
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
+
     class Meta:
         ordering = ["read", "-timestamp"]  # unread first, then newest
+        indexes = [
+            # NotificationListView: a user's notifications in list order
+            models.Index(
+                fields=["recipient", "read", "-timestamp"],
+                name="notif_recipient_read_ts",
+            ),
+            # unread badge / aggregation lookups; a partial index on
+            # SQLite and PostgreSQL, skipped by backends without support
+            models.Index(
+                fields=["recipient", "-timestamp"],
+                condition=models.Q(read=False),
+                name="notif_recipient_unread",
+            ),
+        ]
 
     def __str__(self):
         return f"To {self.recipient} - {self.actor} {self.verb}"
 
+
+class NotificationOutbox(models.Model):
+    """
+    Pending notification events (durable stand-in for a message broker).
+
+    `notify()` inserts one row in the transaction of the action it reports,
+    so the event commits or rolls back with it. `deliver_outbox`, run by
+    a background task (notifications/tasks.py) after commit, turns the
+    rows into Notification rows in batches and removes them. Rows left
+    behind by a failed delivery are picked up by its retry, the next
+    delivery or `python manage.py deliver_notifications`.
+    """
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    verb = models.CharField(max_length=255)
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Pending: to {self.recipient_id} - {self.actor_id} {self.verb}"
@@ -0,0 +1,137 @@
+"""
+Publish/subscribe for live notifications (the SSE stream, see
+notifications/stream.py).
+
+`save_notifications` publishes every notification it creates or updates
+once the transaction commits. Subscribers are the open streams of the
+recipient.
+
+The backend is set with NOTIFICATIONS_PUBSUB_BACKEND (dotted path). The
+default InProcessBroker only reaches streams served by the same process,
+so run a single ASGI worker, or plug in a backend built on a shared
+channel (e.g. Redis PUBLISH/SUBSCRIBE) with the same three methods:
+subscribe(user_id), unsubscribe(subscription), publish(user_id, message).
+A client that misses events (other process, full queue, reconnect)
+catches up from the database through Last-Event-ID.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def queue_size():
+    return getattr(settings, "NOTIFICATIONS_STREAM_QUEUE_SIZE", 100)
+
+
+class Subscription:
+    """
+    One open stream. Created inside the event loop that reads it; messages
+    may be put from any thread.
+    """
+
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size())
+        # set when messages were dropped; the stream then ends and the
+        # client resumes from Last-Event-ID
+        self.overflowed = False
+
+    def put(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # the loop is closed: the stream is gone
+            self.broker.unsubscribe(self)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Next message, or None after `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Delivers to subscriptions of this process only."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            path = getattr(
+                settings, "NOTIFICATIONS_PUBSUB_BACKEND", "notifications.pubsub.InProcessBroker"
+            )
+            _broker = import_string(path)()
+        return _broker
+
+
+def publish_notifications(notifications):
+    """Publish saved notifications to their recipients after commit."""
+    if not notifications:
+        return
+
+    from .stream import to_message
+
+    messages = [(n.recipient_id, to_message(n)) for n in notifications]
+
+    def publish():
+        broker = get_broker()
+        for user_id, message in messages:
+            try:
+                broker.publish(user_id, message)
+            except Exception:
+                logger.exception("Failed to publish notification to user %s", user_id)
+
+    transaction.on_commit(publish)
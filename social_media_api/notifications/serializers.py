@@ -1,9 +1,12 @@
 from rest_framework import serializers
+from social_media_api.sparse_fields import SparseFieldsetMixin
 from .models import Notification
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     actor_username = serializers.ReadOnlyField(source="actor.username")
+    recent_actors = serializers.SerializerMethodField()
+    summary = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
@@ -12,9 +15,47 @@ class NotificationSerializer(serializers.ModelSerializer):
             "recipient",
             "actor",
             "actor_username",
+            "actor_count",
+            "recent_actors",
+            "summary",
             "verb",
             "timestamp",
             "read",
             "object_id",
         ]
-        read_only_fields = ["recipient", "actor", "timestamp"]
+        read_only_fields = ["recipient", "actor", "actor_count", "timestamp"]
+        # columns read by the method fields, for ?fields= (social_media_api/sparse_fields.py)
+        field_sources = {
+            "recent_actors": ("recent_actors", "actor__username"),
+            "summary": ("recent_actors", "actor__username", "actor_count", "verb"),
+        }
+
+    def get_recent_actors(self, obj):
+        # rows written before aggregation existed only have `actor`
+        return obj.recent_actors or [{"id": obj.actor_id, "username": obj.actor.username}]
+
+    def get_summary(self, obj):
+        """e.g. "alice liked your post", "alice and bob ...", "alice and 41 others ..." """
+        names = [actor["username"] for actor in self.get_recent_actors(obj)]
+        others = obj.actor_count - 1
+        if others <= 0:
+            who = names[0]
+        elif others == 1 and len(names) > 1:
+            who = f"{names[0]} and {names[1]}"
+        else:
+            who = f"{names[0]} and {others} others"
+        return f"{who} {obj.verb}"
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """Which notifications to mark read; nothing given means all."""
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    min_id = serializers.IntegerField(min_value=1, required=False)
+    max_id = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        min_id, max_id = attrs.get("min_id"), attrs.get("max_id")
+        if min_id is not None and max_id is not None and min_id > max_id:
+            raise serializers.ValidationError("min_id must not be greater than max_id")
+        return attrs
@@ -0,0 +1,123 @@
+"""
+Server-sent events stream of a user's notifications
+(GET /notifications/stream/, ASGI deployment only).
+
+Each event is one Notification as NotificationSerializer renders it:
+
+    id: 1760812345123456-42
+    event: notification
+    data: {"id": 42, "summary": "bob and 3 others liked your post", ...}
+
+The id is "<timestamp in microseconds>-<notification id>". Aggregated
+notifications are updated in place with a new timestamp, so an update is
+a new event with a larger id. A reconnecting client sends the last id it
+saw as Last-Event-ID (browsers do this automatically). The stream then
+replays, oldest first, what changed after that point from the database (at most
+NOTIFICATIONS_STREAM_REPLAY_LIMIT rows) before switching to live events
+from the pub/sub (notifications/pubsub.py).
+
+A comment line is sent every NOTIFICATIONS_STREAM_HEARTBEAT seconds so
+proxies and load balancers keep idle connections open.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+from .models import Notification
+from .pubsub import get_broker
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def heartbeat_interval():
+    return getattr(settings, "NOTIFICATIONS_STREAM_HEARTBEAT", 15)
+
+
+def replay_limit():
+    return getattr(settings, "NOTIFICATIONS_STREAM_REPLAY_LIMIT", 100)
+
+
+def event_position(notification):
+    return (notification.timestamp, notification.pk)
+
+
+def event_id(position):
+    timestamp, pk = position
+    return f"{(timestamp - EPOCH) // MICROSECOND}-{pk}"
+
+
+def parse_event_id(value):
+    """(timestamp, id) from an event id, None if missing or malformed."""
+    try:
+        micros, pk = (int(part) for part in (value or "").split("-"))
+    except ValueError:
+        return None
+    return EPOCH + micros * MICROSECOND, pk
+
+
+def to_message(notification):
+    """What is published for one notification (rendered once, sent to every stream)."""
+    from .serializers import NotificationSerializer
+
+    position = event_position(notification)
+    return {
+        "position": position,
+        "id": event_id(position),
+        "data": json.dumps(NotificationSerializer(notification).data),
+    }
+
+
+def format_event(message):
+    return f"id: {message['id']}\nevent: notification\ndata: {message['data']}\n\n"
+
+
+async def missed_messages(user_id, position):
+    """Notifications created or updated after `position`, oldest first."""
+    timestamp, pk = position
+    rows = (
+        Notification.objects.filter(recipient_id=user_id)
+        .filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk))
+        .select_related("actor")
+        .order_by("timestamp", "id")[:replay_limit()]
+    )
+    return [to_message(notification) async for notification in rows]
+
+
+async def event_stream(user_id, last_event_id=None):
+    """The body of the SSE response (an async iterator of strings)."""
+    # Subscribe before the replay query so nothing published in between
+    # is lost; duplicates are skipped by position below.
+    subscription = get_broker().subscribe(user_id)
+    try:
+        yield "retry: 3000\n\n"
+
+        position = parse_event_id(last_event_id)
+        if position is not None:
+            for message in await missed_messages(user_id, position):
+                position = message["position"]
+                yield format_event(message)
+        # Idle streams must not hold a database connection each.
+        await sync_to_async(connections.close_all)()
+
+        interval = heartbeat_interval()
+        while True:
+            message = await subscription.get(timeout=interval)
+            if subscription.overflowed:
+                # Events were dropped; end the stream so the client
+                # reconnects with Last-Event-ID and replays them.
+                return
+            if message is None:
+                yield ": heartbeat\n\n"
+                continue
+            if position is not None and message["position"] <= position:
+                continue
+            position = message["position"]
+            yield format_event(message)
+    finally:
+        subscription.close()
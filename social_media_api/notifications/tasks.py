@@ -0,0 +1,32 @@
+"""
+Background delivery of notifications (run through tasks/queue.py).
+
+Requests call `notify()` (notifications/utils.py), which inserts the event
+into the NotificationOutbox table in the request's own transaction: an
+action that commits always leaves its event behind, one that rolls back
+never does. `notify()` also queues `deliver_notifications` under a single
+key, so however many events commit while it waits, one job moves them
+all into the Notification table (`deliver_outbox`), in batches.
+
+A failed delivery is retried by the task queue; the rows stay in the
+outbox until then. `python manage.py deliver_notifications` drains the
+outbox by hand.
+"""
+
+from django.conf import settings
+
+from tasks.queue import task
+
+from .utils import deliver_outbox
+
+DELIVERY_KEY = "notifications:deliver"
+
+
+def batch_size():
+    return getattr(settings, "NOTIFICATIONS_BATCH_SIZE", 500)
+
+
+@task("notifications.deliver")
+def deliver_notifications():
+    """Move the pending outbox rows into the Notification table."""
+    deliver_outbox(batch_size=batch_size())
@@ -1,3 +1,328 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from social_media_api.query_budget import assert_max_queries
+
+from posts.models import Post
+from tasks.models import Job
+
+from .models import Notification, NotificationOutbox
+from .pubsub import get_broker, publish_notifications
+from .stream import event_id, event_position, event_stream, parse_event_id, to_message
+from .tasks import DELIVERY_KEY
+from .utils import NotificationEvent, deliver_outbox, notify, to_outbox_rows
+from .views import NotificationListView, NotificationPagination, UnreadCountView
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class MarkReadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user("alice", password="pw")
+        bob = User.objects.create_user("bob", password="pw")
+        self.notifications = Notification.objects.bulk_create(
+            Notification(recipient=self.alice, actor=bob, verb=f"event {i}") for i in range(3)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def mark_read(self, data):
+        response = self.client.post("/notifications/mark_read/", data, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_empty_ids_marks_nothing(self):
+        self.assertEqual(self.mark_read({"ids": []})["marked_read"], 0)
+        self.assertEqual(Notification.objects.filter(read=False).count(), 3)
+
+    def test_ids(self):
+        body = self.mark_read({"ids": [self.notifications[0].pk]})
+        self.assertEqual(body, {"marked_read": 1, "unread_count": 2})
+
+    def test_all(self):
+        self.assertEqual(self.mark_read({}), {"marked_read": 3, "unread_count": 0})
+
+
+class QueryBudgetTests(TestCase):
+    """The notification endpoints stay within their declared `query_budget`."""
+
+    ROWS = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user("alice", password="pw")
+        actors = [User.objects.create_user(f"actor{i}", password="pw") for i in range(10)]
+        Notification.objects.bulk_create(
+            Notification(recipient=cls.alice, actor=actors[i % 10], verb=f"event {i}")
+            for i in range(cls.ROWS)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_list(self):
+        pages = 0
+        url = "/notifications/"
+        while url:
+            with assert_max_queries(NotificationListView.query_budget, url):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            url = response.json()["next"]
+            pages += 1
+        self.assertEqual(pages, self.ROWS // NotificationPagination.page_size)
+
+    def test_unread_count(self):
+        # a cache miss counts the table
+        with assert_max_queries(UnreadCountView.query_budget):
+            response = self.client.get("/notifications/unread_count/")
+        self.assertEqual(response.json(), {"unread_count": self.ROWS})
+
+
+@override_settings(NOTIFICATIONS_ASYNC=True, TASKS_MODE="sync")
+class OutboxTests(TestCase):
+    """Events are saved with the action they report, then delivered by a task (notifications/tasks.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user("alice", password="pw")
+        self.bob = User.objects.create_user("bob", password="pw")
+        self.post = Post.objects.create(author=self.alice, title="t", content="c")
+
+    def test_event_is_saved_with_the_like(self):
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        # the callbacks (running the queued jobs) are not run yet
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.post(f"/api/posts/{self.post.pk}/like/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+        self.assertFalse(Notification.objects.exists())
+        job = Job.objects.get(key=DELIVERY_KEY)
+        self.assertEqual(job.status, Job.QUEUED)
+
+        for callback in callbacks:
+            callback()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertFalse(NotificationOutbox.objects.exists())
+        notification = Notification.objects.get()
+        self.assertEqual(
+            (notification.recipient, notification.actor, notification.verb),
+            (self.alice, self.bob, "liked your post"),
+        )
+
+    def test_rolled_back_action_leaves_no_event(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                notify(self.alice.pk, self.bob.pk, "liked your post", target=self.post)
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+
+class OutboxDeliveryTests(TestCase):
+    """deliver_outbox writes the events in batches (notifications/utils.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user("alice", password="pw")
+        self.actors = User.objects.bulk_create(User(username=f"actor{i}") for i in range(40))
+        self.posts = Post.objects.bulk_create(
+            Post(author=self.alice, title=f"post {i}", content="c") for i in range(40)
+        )
+
+    def queue_events(self, start, count):
+        """`count` likes by different actors on different posts."""
+        pairs = zip(self.actors[start:start + count], self.posts[start:start + count])
+        NotificationOutbox.objects.bulk_create(
+            to_outbox_rows(
+                NotificationEvent(self.alice.pk, actor.pk, "liked your post", Post, post.pk)
+                for actor, post in pairs
+            )
+        )
+
+    def deliver(self, count, start=0, batch_size=500):
+        self.queue_events(start, count)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(deliver_outbox(batch_size=batch_size), count)
+        self.assertFalse(NotificationOutbox.objects.exists())
+        return len(queries)
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        self.assertEqual(self.deliver(4), self.deliver(36, start=4))
+        self.assertEqual(Notification.objects.count(), 40)
+
+    def test_batch_size(self):
+        self.deliver(5, batch_size=2)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_duplicate_events_are_merged(self):
+        event = NotificationEvent(self.alice.pk, self.actors[0].pk, "liked your post", Post, 1)
+        self.assertEqual(len(to_outbox_rows([event, event])), 1)
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, NOTIFICATIONS_RECENT_ACTORS=3)
+class AggregationTests(TestCase):
+    """Events on one target are grouped into one unread notification (notifications/utils.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user("alice", password="pw")
+        self.actors = User.objects.bulk_create(User(username=f"actor{i}") for i in range(5))
+        self.post = Post.objects.create(author=self.alice, title="t", content="c")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def like(self, actor, post=None):
+        notify(self.alice.pk, actor.pk, "liked your post", target=post or self.post)
+
+    def test_likes_share_one_row(self):
+        for actor in self.actors:
+            self.like(actor)
+        self.like(self.actors[4])  # a repeat: not counted twice
+
+        [row] = self.client.get("/notifications/").json()["results"]
+        self.assertEqual(row["actor_count"], 5)
+        self.assertEqual(
+            [actor["username"] for actor in row["recent_actors"]],
+            ["actor4", "actor3", "actor2"],
+        )
+        self.assertEqual(row["summary"], "actor4 and 4 others liked your post")
+        self.assertEqual(self.client.get("/notifications/unread_count/").json()["unread_count"], 1)
+
+    def test_other_targets_and_verbs_are_separate(self):
+        other = Post.objects.create(author=self.alice, title="t", content="c")
+        self.like(self.actors[0])
+        self.like(self.actors[0], post=other)
+        notify(self.alice.pk, self.actors[0].pk, "commented on your post", target=self.post)
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_read_group_is_not_reopened(self):
+        self.like(self.actors[0])
+        Notification.objects.update(read=True)
+        self.like(self.actors[1])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    @override_settings(NOTIFICATIONS_AGGREGATION_WINDOW=60)
+    def test_window(self):
+        self.like(self.actors[0])
+        Notification.objects.update(timestamp=timezone.now() - timedelta(minutes=2))
+        self.like(self.actors[1])
+        self.assertEqual(Notification.objects.count(), 2)
+
+
+@override_settings(NOTIFICATIONS_STREAM_HEARTBEAT=0.01)
+class StreamTests(TransactionTestCase):
+    """
+    The server-sent events stream (notifications/stream.py). Not a
+    TestCase: the stream closes its database connection once idle.
+    """
+
+    def setUp(self):
+        self.alice = User.objects.create_user("alice", password="pw")
+        self.bob = User.objects.create_user("bob", password="pw")
+        now = timezone.now()
+        self.notifications = [
+            Notification.objects.create(
+                recipient=self.alice, actor=self.bob, verb=f"event {i}",
+                timestamp=now + timedelta(seconds=i),
+            )
+            for i in range(3)
+        ]
+
+    def event(self, notification):
+        return f"id: {to_message(notification)['id']}\nevent: notification\n"
+
+    async def take(self, stream, count):
+        return [await anext(stream) for _ in range(count)]
+
+    def test_event_ids(self):
+        position = event_position(self.notifications[0])
+        self.assertEqual(parse_event_id(event_id(position)), position)
+        for value in (None, "", "abc", "1-2-3"):
+            self.assertIsNone(parse_event_id(value))
+
+    async def test_replay_after_last_event_id(self):
+        first, second, third = self.notifications
+        stream = event_stream(self.alice.pk, to_message(first)["id"])
+        try:
+            events = await self.take(stream, 4)
+        finally:
+            await stream.aclose()
+        self.assertEqual(events[0], "retry: 3000\n\n")
+        self.assertTrue(events[1].startswith(self.event(second)))
+        self.assertTrue(events[2].startswith(self.event(third)))
+        self.assertEqual(events[3], ": heartbeat\n\n")
+
+    async def test_live_events(self):
+        stream = event_stream(self.alice.pk)
+        try:
+            await anext(stream)  # subscribed
+            # autocommit: published right away
+            await sync_to_async(publish_notifications)(self.notifications[:1])
+            event = await anext(stream)
+        finally:
+            await stream.aclose()
+        self.assertTrue(event.startswith(self.event(self.notifications[0])))
+        self.assertIn('"verb": "event 0"', event)
+        self.assertEqual(get_broker().subscriber_count(), 0)
+
+    async def test_replayed_events_are_not_sent_twice(self):
+        last = self.notifications[-1]
+        stream = event_stream(self.alice.pk, to_message(self.notifications[0])["id"])
+        try:
+            await self.take(stream, 3)  # retry and the two replayed events
+            await sync_to_async(publish_notifications)([last])
+            self.assertEqual(await anext(stream), ": heartbeat\n\n")
+        finally:
+            await stream.aclose()
+
+    @override_settings(NOTIFICATIONS_STREAM_QUEUE_SIZE=1)
+    async def test_overflow_ends_the_stream(self):
+        stream = event_stream(self.alice.pk)
+        await anext(stream)
+        for notification in self.notifications:
+            get_broker().publish(self.alice.pk, to_message(notification))
+        # the client reconnects with Last-Event-ID and replays the rest
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+        self.assertEqual(get_broker().subscriber_count(), 0)
+
+    @override_settings(ROOT_URLCONF="social_media_api.urls_asgi")
+    async def test_view(self):
+        token = await Token.objects.acreate(user=self.alice)
+        response = await AsyncClient().get(
+            "/notifications/stream/",
+            headers={
+                "authorization": f"Token {token.key}",
+                "last-event-id": to_message(self.notifications[1])["id"],
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        content = aiter(response.streaming_content)
+        try:
+            chunks = [await anext(content) for _ in range(2)]
+        finally:
+            await content.aclose()
+        self.assertTrue(chunks[1].decode().startswith(self.event(self.notifications[2])))
+
+    async def test_anonymous(self):
+        with self.settings(ROOT_URLCONF="social_media_api.urls_asgi"):
+            response = await AsyncClient().get("/notifications/stream/")
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,47 @@
+"""
+Cached per-user unread notification counter.
+
+The count lives in the Django cache under "notifications:unread:<user id>".
+It is filled from the database on a miss, incremented when a new
+(unread) notification row is created and lowered when notifications are
+marked read, so the unread badge normally costs no query at all.
+
+Note: with the default per-process LocMemCache each worker keeps its own
+copy; configure a shared cache (Redis, Memcached) in CACHES for several
+processes. NOTIFICATIONS_UNREAD_CACHE_TIMEOUT bounds any staleness.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Notification
+
+
+def cache_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def cache_timeout():
+    return getattr(settings, "NOTIFICATIONS_UNREAD_CACHE_TIMEOUT", 300)
+
+
+def get_unread_count(user_id):
+    count = cache.get(cache_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, read=False).count()
+        cache.set(cache_key(user_id), count, cache_timeout())
+    return count
+
+
+def change_unread_count(user_id, delta):
+    """Adjust a cached count; a missing key is simply filled on next read."""
+    try:
+        count = cache.incr(cache_key(user_id), delta)
+    except ValueError:
+        return
+    if count < 0:
+        cache.delete(cache_key(user_id))
+
+
+def set_unread_count(user_id, count):
+    cache.set(cache_key(user_id), count, cache_timeout())
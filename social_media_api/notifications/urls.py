@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import NotificationListView
+from .views import MarkReadView, NotificationExportView, NotificationListView, UnreadCountView
 
 urlpatterns = [
     path("notifications/", NotificationListView.as_view(), name="notifications"),
+    path("notifications/export/", NotificationExportView.as_view(), name="notifications-export"),
+    path("notifications/unread_count/", UnreadCountView.as_view(), name="notifications-unread-count"),
+    path("notifications/mark_read/", MarkReadView.as_view(), name="notifications-mark-read"),
 ]
@@ -1,5 +1,65 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from .models import Notification
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from tasks.queue import enqueue
+
+from .models import Notification, NotificationOutbox
+from .pubsub import publish_notifications
+from .unread import change_unread_count
+
+User = get_user_model()
+
+# What the request path hands over: plain ids and the target's model class,
+# so building an event needs no database access.
+NotificationEvent = namedtuple(
+    "NotificationEvent",
+    ["recipient_id", "actor_id", "verb", "target_model", "object_id"],
+)
+
+
+def notifications_async():
+    return getattr(settings, "NOTIFICATIONS_ASYNC", True)
+
+
+def notify(recipient_id, actor_id, verb, target=None):
+    """
+    Queue a notification: one outbox row, written in the current
+    transaction, delivered by a background task after commit
+    (notifications/tasks.py).
+
+    - recipient_id: id of the user who gets the notification
+    - actor_id: id of the user who triggered it
+    - verb: description, e.g. "liked your post"
+    - target: optional model instance (Post, Comment, etc.)
+
+    Call it inside the transaction of the action, so the event is saved
+    if and only if the action is. With NOTIFICATIONS_ASYNC = False the
+    notification is written immediately instead.
+    """
+    event = NotificationEvent(
+        recipient_id=recipient_id,
+        actor_id=actor_id,
+        verb=verb,
+        target_model=type(target) if target is not None else None,
+        object_id=target.pk if target is not None else None,
+    )
+
+    rows = to_outbox_rows([event])
+    if not notifications_async():
+        save_notifications(rows)
+        return
+
+    from .tasks import DELIVERY_KEY, deliver_notifications
+
+    rows[0].save()
+    enqueue(deliver_notifications, key=DELIVERY_KEY)
 
 
 def create_notification(recipient, actor, verb, target=None):
@@ -11,16 +71,155 @@ def create_notification(recipient, actor, verb, target=None):
     - verb: description, e.g. "liked your post"
     - target: optional model instance (Post, Comment, etc.)
     """
+    notify(recipient.pk, actor.pk, verb, target=target)
 
-    notification = Notification(
-        recipient=recipient,
-        actor=actor,
-        verb=verb,
+
+def to_outbox_rows(events):
+    """
+    Convert events into (unsaved) NotificationOutbox rows, merging exact
+    duplicates (e.g. like/unlike/like by the same user in one batch).
+    Rows stay in event order, which save_notifications relies on.
+    """
+    rows = {}
+    for event in events:
+        content_type_id = None
+        if event.target_model is not None:
+            content_type_id = ContentType.objects.get_for_model(event.target_model).pk
+        key = (event.recipient_id, event.actor_id, event.verb, content_type_id, event.object_id)
+        rows.setdefault(
+            key,
+            NotificationOutbox(
+                recipient_id=event.recipient_id,
+                actor_id=event.actor_id,
+                verb=event.verb,
+                content_type_id=content_type_id,
+                object_id=event.object_id,
+            ),
+        )
+    return list(rows.values())
+
+
+def aggregation_window():
+    """Seconds during which new events are merged into an unread group."""
+    return getattr(settings, "NOTIFICATIONS_AGGREGATION_WINDOW", 24 * 60 * 60)
+
+
+def recent_actors_limit():
+    return getattr(settings, "NOTIFICATIONS_RECENT_ACTORS", 3)
+
+
+def _group_key(obj):
+    return (obj.recipient_id, obj.verb, obj.content_type_id, obj.object_id)
+
+
+def _open_groups(keys):
+    """Unread notifications inside the window matching any of `keys`."""
+    since = timezone.now() - timedelta(seconds=aggregation_window())
+    condition = Q()
+    for recipient_id, verb, content_type_id, object_id in keys:
+        condition |= Q(
+            recipient_id=recipient_id,
+            verb=verb,
+            content_type_id=content_type_id,
+            object_id=object_id,
+        )
+    groups = {}
+    matches = Notification.objects.filter(condition, read=False, timestamp__gte=since)
+    for notification in matches.order_by("timestamp"):
+        # if there are several, the newest one wins
+        groups[_group_key(notification)] = notification
+    return groups
+
+
+def save_notifications(rows):
+    """
+    Write outbox rows as notifications, aggregated per
+    (recipient, verb, target): open groups are updated in place with one
+    bulk_update, new groups are added with one bulk_create. Both are
+    published to the recipients' live streams after commit.
+
+    Returns (created, updated) lists of Notification objects.
+    """
+    if not rows:
+        return [], []
+
+    by_key = {}
+    for row in rows:
+        by_key.setdefault(_group_key(row), []).append(row.actor_id)
+
+    groups = _open_groups(by_key)
+    actor_ids = {actor_id for actor_ids in by_key.values() for actor_id in actor_ids}
+    usernames = dict(User.objects.filter(id__in=actor_ids).values_list("id", "username"))
+
+    now = timezone.now()
+    limit = recent_actors_limit()
+    created, updated = [], []
+
+    for key, actor_ids in by_key.items():
+        notification = groups.get(key)
+        if notification is None:
+            recipient_id, verb, content_type_id, object_id = key
+            notification = Notification(
+                recipient_id=recipient_id,
+                verb=verb,
+                content_type_id=content_type_id,
+                object_id=object_id,
+                actor_count=0,
+                recent_actors=[],
+            )
+            created.append(notification)
+        else:
+            updated.append(notification)
+
+        for actor_id in actor_ids:
+            recent = [a for a in notification.recent_actors if a["id"] != actor_id]
+            if len(recent) == len(notification.recent_actors):
+                # Only actors we still remember are recognised as repeats.
+                notification.actor_count += 1
+            recent.insert(0, {"id": actor_id, "username": usernames.get(actor_id, "")})
+            notification.recent_actors = recent[:limit]
+            # a stub with the username, so serializing for the live stream
+            # does not query the actor again
+            notification.actor = User(id=actor_id, username=usernames.get(actor_id, ""))
+        notification.timestamp = now
+
+    Notification.objects.bulk_create(created)
+    Notification.objects.bulk_update(
+        updated, ["actor", "actor_count", "recent_actors", "timestamp"]
     )
 
-    if target is not None:
-        notification.content_type = ContentType.objects.get_for_model(target)
-        notification.object_id = target.pk
+    # Updated groups were already unread; only new rows change the badge.
+    for notification in created:
+        change_unread_count(notification.recipient_id, 1)
+
+    publish_notifications(created + updated)
+    return created, updated
+
+
+def deliver_outbox(batch_size=500):
+    """
+    Move pending outbox rows into the Notification table.
+
+    Rows are claimed by deleting them in the same transaction as the
+    insert; if another process claimed some of them first, the batch is
+    rolled back and left for that process. Returns the number delivered.
+    """
+    delivered = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                NotificationOutbox.objects.select_for_update(skip_locked=True)
+                .order_by("id")[:batch_size]
+            )
+            if not rows:
+                return delivered
+
+            deleted, _ = NotificationOutbox.objects.filter(
+                id__in=[row.id for row in rows]
+            ).delete()
+            if deleted != len(rows):
+                transaction.set_rollback(True)
+                return delivered
 
-    notification.save()
-    return notification
+            save_notifications(rows)
+            delivered += len(rows)
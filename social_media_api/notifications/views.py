@@ -1,18 +1,123 @@
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from social_media_api.pagination import KeysetPagination
+from social_media_api.sparse_fields import sparse_queryset
+from social_media_api.exports import EXPORT_RENDERERS, export_response
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import MarkReadSerializer, NotificationSerializer
+from .unread import change_unread_count, get_unread_count, set_unread_count
+
+
+class NotificationPagination(KeysetPagination):
+    """
+    Cursor pagination matching the model ordering:
+    unread first, then newest (id breaks ties).
+    """
+    page_size = 20
+    ordering = ("read", "-timestamp", "-id")
 
 
 class NotificationListView(generics.ListAPIView):
     """
     GET /notifications/
     - List notifications for the current user.
-    - Unread notifications appear first (ordering in model Meta).
+    - Unread notifications appear first, then newest.
+    - Paginated with ?cursor= (see NotificationPagination).
+    - ?fields= / ?exclude= pick the fields of each item
+      (see social_media_api/sparse_fields.py).
     """
 
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
+    query_budget = 4
+    read_from_replica = True
 
     def get_queryset(self):
         user = self.request.user
-        return Notification.objects.filter(recipient=user)
+        notifications = Notification.objects.filter(recipient=user).select_related("actor")
+        return sparse_queryset(
+            notifications, self.get_serializer_class(), self.request,
+            keep=NotificationPagination.ordering,
+        )
+
+
+class NotificationExportView(APIView):
+    """
+    GET /notifications/export/
+    - Every user's notifications, streamed as a JSON array or NDJSON
+      (admin only, see social_media_api/exports.py).
+    - ?recipient=<user id> limits it to one user.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = EXPORT_RENDERERS
+
+    def get(self, request):
+        notifications = Notification.objects.select_related("actor")
+        recipient = request.query_params.get("recipient")
+        if recipient is not None:
+            if not recipient.isdigit():
+                raise ValidationError({"recipient": "A valid integer is required."})
+            notifications = notifications.filter(recipient_id=recipient)
+        return export_response(request, notifications, NotificationSerializer, "notifications")
+
+
+class UnreadCountView(APIView):
+    """
+    GET /notifications/unread_count/
+    - Number of unread notifications of the current user.
+    - Served from the cache (see notifications/unread.py); the notification
+      table is only counted on a cache miss.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 3
+
+    def get(self, request):
+        return Response({"unread_count": get_unread_count(request.user.pk)})
+
+
+class MarkReadView(APIView):
+    """
+    POST /notifications/mark_read/
+    - {}                              -> mark all notifications read
+    - {"ids": [1, 2, 3]}              -> only these ({"ids": []} marks none)
+    - {"min_id": 10, "max_id": 50}    -> only ids in this range (inclusive)
+
+    Always a single UPDATE; returns how many rows changed and the new
+    unread count.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        unread = Notification.objects.filter(recipient=request.user, read=False)
+        filtered = False
+        if "ids" in data:
+            unread = unread.filter(id__in=data["ids"])
+            filtered = True
+        if data.get("min_id") is not None:
+            unread = unread.filter(id__gte=data["min_id"])
+            filtered = True
+        if data.get("max_id") is not None:
+            unread = unread.filter(id__lte=data["max_id"])
+            filtered = True
+
+        marked = unread.update(read=True)
+
+        if filtered:
+            change_unread_count(request.user.pk, -marked)
+        else:
+            set_unread_count(request.user.pk, 0)
+
+        return Response(
+            {"marked_read": marked, "unread_count": get_unread_count(request.user.pk)},
+            status=status.HTTP_200_OK,
+        )
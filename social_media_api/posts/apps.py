@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    """Re-create the full-text triggers if a migration rebuilt posts_post."""
+    from django.db import connections
+    from .search import install_search_index
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if "posts_post" not in connection.introspection.table_names(cursor):
+            return
+    install_search_index(connection)
 
 
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'posts'
+
+    def ready(self):
+        post_migrate.connect(ensure_search_index, sender=self)
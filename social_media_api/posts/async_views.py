@@ -0,0 +1,73 @@
+"""
+Async (ASGI) versions of the read-heavy post endpoints, mounted by
+social_media_api/urls_asgi.py on the same paths as the DRF views. Same
+responses, validators and budgets as FeedView / PostViewSet.retrieve.
+"""
+
+from rest_framework.exceptions import NotFound
+
+from social_media_api.async_views import AsyncAPIView
+from social_media_api.sparse_fields import sparse_queryset
+from .conditional import apage_validators, apost_validators, not_modified, set_validators
+from .models import Post
+from .serializers import PostSerializer
+from .timeline import aget_feed
+from .views import FeedPagination, FeedView, PostViewSet
+
+
+class AsyncFeedView(AsyncAPIView):
+    """GET /api/feed/ (async), see FeedView."""
+
+    query_budget = FeedView.query_budget
+    read_from_replica = FeedView.read_from_replica
+    throttle_scope = FeedView.throttle_scope
+
+    async def get(self, request):
+        drf_request = self.drf_request(request)
+        paginator = FeedPagination()
+        paginator.feed = await aget_feed(request.user)
+        posts = sparse_queryset(
+            Post.objects.select_related("author"),
+            PostSerializer, drf_request, keep=FeedPagination.ordering,
+        )
+
+        etag, last_modified = await apage_validators(
+            paginator, posts, drf_request, None, scope=request.user.pk
+        )
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
+        page = await paginator.apaginate_queryset(posts, drf_request)
+        serializer = PostSerializer(page, many=True, context={"request": drf_request})
+        response = self.json(paginator.get_paginated_data(serializer.data))
+        return set_validators(response, etag, last_modified)
+
+
+class AsyncPostDetailView(AsyncAPIView):
+    """
+    GET /api/posts/<pk>/ (async), see PostViewSet.retrieve.
+    PUT/PATCH/DELETE go to the DRF viewset.
+    """
+
+    allow_anonymous = True
+    query_budget = PostViewSet.query_budget
+    read_from_replica = PostViewSet.read_from_replica
+
+    async def get(self, request, pk):
+        drf_request = self.drf_request(request)
+        posts = sparse_queryset(PostViewSet.queryset, PostSerializer, drf_request)
+
+        etag, last_modified = await apost_validators(pk, scope=request.get_full_path())
+        if etag is None:
+            raise NotFound()
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
+        try:
+            post = await posts.aget(pk=pk)
+        except Post.DoesNotExist:
+            raise NotFound()
+        serializer = PostSerializer(post, context={"request": drf_request})
+        return set_validators(self.json(serializer.data), etag, last_modified)
@@ -0,0 +1,172 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Seeded users are named "bench_<n>" so the data can be told apart from
+real accounts (and removed with `delete_seed_data`). Run benchmarks
+against a scratch database, e.g.:
+
+    DATABASE_URL=sqlite:////tmp/bench.sqlite3 python manage.py migrate
+    DATABASE_URL=sqlite:////tmp/bench.sqlite3 python manage.py benchmark_queries
+"""
+
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import Notification
+from .models import Comment, Like, Post
+
+User = get_user_model()
+
+SEED_PREFIX = "bench_"
+BATCH_SIZE = 5000
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Let bulk_create keep the created_at/updated_at/timestamp values we set,
+    so seeded rows are spread over time instead of all sharing "now".
+    """
+    changed = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+                changed.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in changed:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _insert(model, objects, **kwargs):
+    """bulk_create from any iterable, BATCH_SIZE rows at a time."""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, BATCH_SIZE))
+        if not batch:
+            return
+        model.objects.bulk_create(batch, **kwargs)
+
+
+def _spread(count, days=365):
+    """`count` timestamps spread over the last `days` days, oldest first."""
+    now = timezone.now()
+    step = timedelta(days=days) / max(count, 1)
+    return (now - timedelta(days=days) + step * i for i in range(count))
+
+
+def seed(users=1000, posts=100000, comments=100000, likes=200000,
+         notifications=200000, follows_per_user=50, stdout=None):
+    """Insert a synthetic dataset. Returns the seeded users."""
+    rng = random.Random(42)
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    start = User.objects.filter(username__startswith=SEED_PREFIX).count()
+    _insert(User, (
+        User(username=f"{SEED_PREFIX}{start + i}", password="!")
+        for i in range(users)
+    ))
+    user_ids = list(
+        User.objects.filter(username__startswith=SEED_PREFIX).values_list("id", flat=True)
+    )
+    log(f"users: {len(user_ids)}")
+
+    through = User.followers.through
+    follows = set()
+    for user_id in user_ids:
+        for other in rng.sample(user_ids, min(follows_per_user, len(user_ids))):
+            if other != user_id:
+                follows.add((other, user_id))
+    _insert(
+        through,
+        [through(from_user_id=a, to_user_id=b) for a, b in follows],
+        ignore_conflicts=True,
+    )
+    log(f"follows: {len(follows)}")
+
+    with explicit_timestamps(Post, Comment, Like, Notification), transaction.atomic():
+        _insert(Post, (
+            Post(
+                author_id=rng.choice(user_ids),
+                title=f"Post {i} about {rng.choice(['django', 'python', 'cats', 'travel'])}",
+                content=" ".join(rng.choice(WORDS) for _ in range(40)),
+                created_at=ts,
+                updated_at=ts,
+                last_activity_at=ts,
+            )
+            for i, ts in enumerate(_spread(posts))
+        ))
+        post_ids = list(Post.objects.values_list("id", flat=True))
+        log(f"posts: {len(post_ids)}")
+
+        if post_ids:
+            _insert(Comment, (
+                Comment(
+                    post_id=rng.choice(post_ids),
+                    author_id=rng.choice(user_ids),
+                    content="Nice post!",
+                    created_at=ts,
+                    updated_at=ts,
+                )
+                for ts in _spread(comments)
+            ))
+            log(f"comments: {comments}")
+
+            _insert(Like, (
+                Like(user_id=rng.choice(user_ids), post_id=rng.choice(post_ids), created_at=ts)
+                for ts in _spread(likes)
+            ), ignore_conflicts=True)
+            log(f"likes: up to {likes}")
+
+        _insert(Notification, (
+            Notification(
+                recipient_id=rng.choice(user_ids),
+                actor_id=rng.choice(user_ids),
+                verb="liked your post",
+                object_id=rng.choice(post_ids) if post_ids else None,
+                timestamp=ts,
+                read=rng.random() < 0.7,
+            )
+            for ts in _spread(notifications)
+        ))
+        log(f"notifications: {notifications}")
+
+    return User.objects.filter(id__in=user_ids)
+
+
+def delete_seed_data():
+    """Remove every seeded user (posts, likes, ... go with them)."""
+    deleted, _ = User.objects.filter(username__startswith=SEED_PREFIX).delete()
+    return deleted
+
+
+def timed(func, repeat=20):
+    """Run `func` `repeat` times; returns (median ms, p95 ms)."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return statistics.median(samples), p95
+
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog django python rest api social "
+    "media post comment like follow feed timeline cache index query fast "
+    "slow database server client mobile photo travel food music cats"
+).split()
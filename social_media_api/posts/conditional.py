@@ -0,0 +1,106 @@
+"""
+Conditional GET (ETag / Last-Modified) for posts and the feed.
+
+Validators are computed from a narrow query (ids, last_activity_at and
+the counters), never by serializing. If the client's If-None-Match /
+If-Modified-Since still matches, the view answers 304 Not Modified and
+skips the full query and serialization.
+
+Edits, likes and comments all bump Post.last_activity_at (likes and
+comments together with the counters, see posts/counters.py), so each of
+them invalidates the validators.
+"""
+
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Post
+
+VALIDATOR_FIELDS = ("id", "last_activity_at", "like_count", "comment_count")
+
+
+def _etag(*parts):
+    digest = hashlib.md5(repr(parts).encode("utf-8"), usedforsecurity=False)
+    return quote_etag(digest.hexdigest())
+
+
+def _post_rows(pk):
+    """The validator query for post `pk`, or None if `pk` is not a valid id."""
+    try:
+        return Post.objects.filter(pk=pk).values_list(*VALIDATOR_FIELDS)
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+def post_validators(pk, scope=None):
+    """
+    (etag, last_modified) of one post, or (None, None) if it does not exist
+    or `pk` is malformed (the view then answers its usual 404).
+    `scope` separates representations of the same post (e.g. ?fields=).
+    """
+    rows = _post_rows(pk)
+    row = rows.first() if rows is not None else None
+    if row is None:
+        return None, None
+    return _etag(row, scope), row[1]
+
+
+async def apost_validators(pk, scope=None):
+    """post_validators for async views."""
+    rows = _post_rows(pk)
+    row = await rows.afirst() if rows is not None else None
+    if row is None:
+        return None, None
+    return _etag(row, scope), row[1]
+
+
+def page_validators(paginator, queryset, request, view, scope=None):
+    """
+    (etag, last_modified) of the page the paginator would return: one query
+    on the validator columns of exactly those rows. `scope` separates
+    responses that share a URL (e.g. the feed of different users).
+    """
+    rows = list(
+        paginator.get_page_queryset(queryset, request, view).values_list(*VALIDATOR_FIELDS)
+    )
+    return _page_validators(rows, request, scope)
+
+
+async def apage_validators(paginator, queryset, request, view, scope=None):
+    """page_validators for async views."""
+    rows = [
+        row
+        async for row in paginator.get_page_queryset(queryset, request, view)
+        .values_list(*VALIDATOR_FIELDS)
+    ]
+    return _page_validators(rows, request, scope)
+
+
+def _page_validators(rows, request, scope):
+    last_modified = max((row[1] for row in rows), default=None)
+    return _etag(scope, request.get_full_path(), rows), last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 response if the client's copy is still current, else None."""
+    if etag is None:
+        return None
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    if etag is not None:
+        response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,63 @@
+"""
+Atomic updates of the denormalized Post counters.
+
+Counters are changed with a single `UPDATE ... SET x = x + 1` (an F()
+expression), so concurrent requests never overwrite each other's
+increments.
+
+The same UPDATE bumps last_activity_at (updated_at stays the time of the
+last edit): the counters are part of the post's representation, so
+ETag/Last-Modified (posts/conditional.py) must change.
+
+The trending score (posts/trending.py) is not part of the response: each
+change queues `update_trending_score` (posts/tasks.py), keyed per post,
+so a burst of likes on one post is scored once after the commit.
+"""
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest, Now
+
+from tasks.queue import enqueue
+
+from .models import Comment, Like, Post
+from .tasks import update_trending_score
+
+
+def _change(post_id, field, delta):
+    Post.objects.filter(pk=post_id).update(
+        **{field: Greatest(F(field) + delta, 0)},
+        last_activity_at=Now(),
+    )
+    enqueue(update_trending_score, {"post_id": post_id}, key=f"trending:{post_id}")
+
+
+def increment_likes(post_id, delta=1):
+    _change(post_id, "like_count", delta)
+
+
+def increment_comments(post_id, delta=1):
+    _change(post_id, "comment_count", delta)
+
+
+def actual_like_count():
+    """Subquery counting the Like rows of the outer Post."""
+    likes = (
+        Like.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return Coalesce(Subquery(likes), 0)
+
+
+def actual_comment_count():
+    """Subquery counting the Comment rows of the outer Post."""
+    comments = (
+        Comment.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return Coalesce(Subquery(comments), 0)
@@ -0,0 +1,66 @@
+"""
+Race-free like/unlike.
+
+Every step is a single conditional statement, so two concurrent taps on
+the like button cannot both "win":
+
+- DELETE ... WHERE user=? AND post=? tells us (by its row count) whether
+  a like existed and was removed.
+- Otherwise an INSERT is attempted inside a savepoint; if another request
+  inserted the same like first, the unique (user, post) constraint
+  rejects ours and we report the post as liked without raising.
+
+The like_count update runs in the same transaction, and only when a row
+was actually inserted or deleted, so the counter never drifts.
+"""
+
+from django.db import IntegrityError, transaction
+
+from .counters import increment_likes
+from .models import Like
+
+
+def _delete_like(user, post_id):
+    deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+    return deleted > 0
+
+
+def _insert_like(user, post_id):
+    """True if the like row was inserted, False if it already existed."""
+    try:
+        with transaction.atomic():
+            Like.objects.create(user=user, post_id=post_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def toggle_like(user, post_id):
+    """
+    Like the post if the user has not liked it yet, otherwise remove the like.
+
+    Returns (liked, created):
+      - liked: the state after the call
+      - created: True only if this call inserted the like (used to decide
+        whether to notify the author)
+    """
+    with transaction.atomic():
+        if _delete_like(user, post_id):
+            increment_likes(post_id, -1)
+            return False, False
+
+        if _insert_like(user, post_id):
+            increment_likes(post_id)
+            return True, True
+
+    # A concurrent request liked the post between our DELETE and INSERT.
+    return True, False
+
+
+def remove_like(user, post_id):
+    """Remove the user's like. Returns False if there was none."""
+    with transaction.atomic():
+        if not _delete_like(user, post_id):
+            return False
+        increment_likes(post_id, -1)
+    return True
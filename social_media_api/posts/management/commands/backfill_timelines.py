@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.models import Post, TimelineEntry
+from posts.timeline import backfill_limit, fanout_max_followers
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Fill the materialized timelines for existing users.
+
+    Usage:
+      python manage.py backfill_timelines
+      python manage.py backfill_timelines --user alice --limit 500
+    """
+
+    help = "Backfill home timelines from the follow graph and existing posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only backfill this username.")
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Most recent posts to copy per user (default: TIMELINE_BACKFILL_LIMIT).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        limit = options["limit"] or backfill_limit()
+        batch_size = options["batch_size"]
+
+        users = User.objects.order_by("id")
+        if options["user"]:
+            users = users.filter(username=options["user"])
+
+        # Only authors below the threshold are materialized; the others are
+        # merged at read time (Feed in posts/timeline.py).
+        fanout_authors = set(
+            User.objects.filter(follower_count__lte=fanout_max_followers())
+            .values_list("id", flat=True)
+        )
+
+        total = 0
+        for user in users.iterator():
+            author_ids = [
+                author_id
+                for author_id in user.following.values_list("id", flat=True)
+                if author_id in fanout_authors
+            ]
+            if not author_ids:
+                continue
+
+            posts = (
+                Post.objects.filter(author_id__in=author_ids)
+                .order_by("-created_at")
+                .values_list("id", "author_id", "created_at")[:limit]
+            )
+            entries = [
+                TimelineEntry(
+                    user_id=user.pk,
+                    post_id=post_id,
+                    author_id=author_id,
+                    created_at=created_at,
+                )
+                for post_id, author_id, created_at in posts
+            ]
+            TimelineEntry.objects.bulk_create(
+                entries, batch_size=batch_size, ignore_conflicts=True
+            )
+            total += len(entries)
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {total} timeline entries."))
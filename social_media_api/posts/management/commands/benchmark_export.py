@@ -0,0 +1,79 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Post
+from posts.serializers import PostSerializer
+from social_media_api.exports import ChunkEncoder, stream_export
+from social_media_api.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    """
+    Peak memory and time of exporting posts: the streamed export
+    (social_media_api/exports.py) against building the whole list in
+    memory first, as an unpaginated list view would.
+
+    Usage (on a seeded scratch database, see posts/benchmarking.py):
+      python manage.py benchmark_export
+      python manage.py benchmark_export --rows 10000 --rows 250000 --ndjson
+    """
+
+    help = "Compare memory use of the streamed post export with an in-memory list."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            action="append",
+            help="Rows to export (repeatable). Default: 10000, 100000 and every post.",
+        )
+        parser.add_argument("--ndjson", action="store_true")
+        parser.add_argument(
+            "--in-memory-limit",
+            type=int,
+            default=100000,
+            help="Skip the in-memory comparison above this many rows.",
+        )
+
+    def handle(self, *args, **options):
+        total = Post.objects.count()
+        if not total:
+            raise CommandError("No posts (run benchmark_queries --seed).")
+
+        for rows in options["rows"] or [10000, 100000, total]:
+            posts = Post.objects.select_related("author").order_by("id")[:rows]
+
+            def streamed():
+                encoder = ChunkEncoder(PostSerializer, {}, options["ndjson"])
+                return sum(len(piece) for piece in stream_export(posts, encoder))
+
+            size, ms, peak = measure(streamed)
+            self.stdout.write(
+                f"{min(rows, total):>8} rows  streamed   {ms:>9.0f} ms   "
+                f"peak {peak / 2**20:>7.1f} MB   {size / 2**20:>7.1f} MB sent"
+            )
+
+            if rows > options["in_memory_limit"]:
+                continue
+
+            def in_memory():
+                return len(FastJSONRenderer().render(PostSerializer(posts, many=True).data))
+
+            size, ms, peak = measure(in_memory)
+            self.stdout.write(
+                f"{'':>8}       in memory  {ms:>9.0f} ms   "
+                f"peak {peak / 2**20:>7.1f} MB   {size / 2**20:>7.1f} MB sent"
+            )
+
+
+def measure(func):
+    """(result, milliseconds, peak bytes allocated) of one run of `func`."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+        return result, (time.perf_counter() - started) * 1000, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from notifications.models import Notification
+from posts.benchmarking import SEED_PREFIX, User, delete_seed_data, seed, timed
+from posts.models import Comment, Like, Post
+from posts.timeline import get_feed
+
+
+class Command(BaseCommand):
+    """
+    Seed a large dataset and print EXPLAIN plans and timings for the
+    queries behind the hot endpoints, with and without the Meta.indexes
+    declared on Post, Comment and Notification.
+
+    Usage (on a scratch database, see posts/benchmarking.py):
+      python manage.py benchmark_queries --seed
+      python manage.py benchmark_queries --posts 500000 --seed
+      python manage.py benchmark_queries --cleanup
+    """
+
+    help = "Benchmark the hot query shapes before/after the composite indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", action="store_true", help="Insert synthetic data first.")
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=100000)
+        parser.add_argument("--comments", type=int, default=100000)
+        parser.add_argument("--likes", type=int, default=200000)
+        parser.add_argument("--notifications", type=int, default=200000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--no-explain", action="store_true")
+        parser.add_argument("--cleanup", action="store_true", help="Delete seeded data and exit.")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            self.stdout.write(f"Deleted {delete_seed_data()} rows.")
+            return
+
+        if options["seed"]:
+            seed(
+                users=options["users"],
+                posts=options["posts"],
+                comments=options["comments"],
+                likes=options["likes"],
+                notifications=options["notifications"],
+                stdout=self.stdout,
+            )
+
+        user = User.objects.filter(username__startswith=SEED_PREFIX).order_by("id").first()
+        post = Post.objects.order_by("-comment_count", "-id").first()
+        if user is None or post is None:
+            self.stderr.write("No seeded data found; run with --seed first.")
+            return
+        call_command("backfill_timelines", user=user.username, stdout=self.stdout)
+
+        queries = {
+            "posts list": lambda: Post.objects.select_related("author").order_by("-created_at", "-id")[:10],
+            "author's posts": lambda: Post.objects.filter(author=user).order_by("-created_at")[:10],
+            "feed": lambda: get_feed(user).page(Post.objects.select_related("author"), None, False, 10),
+            "comments of a post": lambda: Comment.objects.filter(post=post).order_by("-created_at")[:10],
+            "notifications": lambda: Notification.objects.filter(recipient=user).order_by("read", "-timestamp", "-id")[:20],
+            "unread notifications": lambda: Notification.objects.filter(recipient=user, read=False).order_by("-timestamp")[:20],
+            "likes of a post": lambda: Like.objects.filter(post=post),
+        }
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== Without composite indexes =="))
+        with self.indexes_removed():
+            before = self.run(queries, options)
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== With composite indexes =="))
+        after = self.run(queries, options)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== Summary (median ms) =="))
+        for name in queries:
+            self.stdout.write(f"{name:<22} {before[name]:>9.2f} -> {after[name]:>9.2f}")
+
+    def run(self, queries, options):
+        medians = {}
+        for name, build in queries.items():
+            if not options["no_explain"]:
+                self.stdout.write(self.style.SQL_KEYWORD(f"\n-- {name}"))
+                self.stdout.write(build().explain())
+            median, p95 = timed(lambda: list(build()), repeat=options["repeat"])
+            medians[name] = median
+            self.stdout.write(f"{name}: median {median:.2f} ms, p95 {p95:.2f} ms")
+        return medians
+
+    @contextmanager
+    def indexes_removed(self):
+        """Temporarily drop the Meta.indexes of the benchmarked models."""
+        models = [Post, Comment, Notification]
+        with connection.schema_editor() as editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+        self.analyze()
+        try:
+            yield
+        finally:
+            with connection.schema_editor() as editor:
+                for model in models:
+                    for index in model._meta.indexes:
+                        editor.add_index(model, index)
+            self.analyze()
+
+    def analyze(self):
+        # refresh planner statistics so EXPLAIN reflects the current indexes
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.benchmarking import seed, timed
+from posts.models import Post
+from posts.search import IContainsBackend, cursor_ordering, get_search_backend, search_terms
+
+
+class Command(BaseCommand):
+    """
+    Compare post search latency: the old icontains filter against the
+    full-text backend of the current database (posts/search.py).
+
+    Usage (on a scratch database, see posts/benchmarking.py):
+      python manage.py benchmark_search --seed            # 1,000,000 posts
+      python manage.py benchmark_search --query "django rest"
+    """
+
+    help = "Benchmark icontains search against the full-text search backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", action="store_true", help="Insert synthetic posts first.")
+        parser.add_argument("--posts", type=int, default=1000000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--query",
+            action="append",
+            help="Search string to time (repeatable). Defaults to a small built-in set.",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            seed(
+                users=1000,
+                posts=options["posts"],
+                comments=0,
+                likes=0,
+                notifications=0,
+                follows_per_user=0,
+                stdout=self.stdout,
+            )
+
+        backend = get_search_backend(connection.alias)
+        self.stdout.write(
+            f"{Post.objects.count()} posts, backend: {type(backend).__name__} ({connection.vendor})"
+        )
+
+        # Selective terms (rare, none) show the index; common ones show the
+        # cost of ranking every match before the first page can be cut.
+        queries = options["query"] or ["12345", "zebra", "trav", "quick fox", "django"]
+        for query in queries:
+            terms = search_terms(query)
+            icontains = self.page(IContainsBackend(), terms)
+            full_text = self.page(backend, terms)
+
+            old, _ = timed(lambda: list(icontains.all()), repeat=options["repeat"])
+            new, _ = timed(lambda: list(full_text.all()), repeat=options["repeat"])
+            self.stdout.write(
+                f"{query!r:<26} icontains {old:>9.2f} ms   "
+                f"{type(backend).__name__} {new:>9.2f} ms   ({old / max(new, 0.001):.1f}x)"
+            )
+
+    def page(self, backend, terms):
+        """First page of results, ordered the way PostViewSet orders them."""
+        queryset = backend.search(Post.objects.all(), terms)
+        return queryset.order_by(*cursor_ordering(queryset, ("-created_at", "-id")))[:10]
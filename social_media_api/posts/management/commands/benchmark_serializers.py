@@ -0,0 +1,92 @@
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from posts.benchmarking import WORDS, User, timed
+from posts.models import Post
+from posts.serializers import PostSerializer
+from social_media_api.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    """
+    Time and peak memory of a PostSerializer(many=True) response, split
+    into serializing (serializer.data) and rendering to JSON, for DRF's
+    JSONRenderer and FastJSONRenderer (social_media_api/renderers.py).
+
+    Posts are built in memory, so no database is needed.
+
+    Usage:
+      python manage.py benchmark_serializers
+      python manage.py benchmark_serializers --rows 1000 --rows 100000
+    """
+
+    help = "Benchmark PostSerializer output with the stdlib and the fast JSON renderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            action="append",
+            help="Payload size (repeatable). Default: 1000, 10000 and 100000.",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"orjson: {orjson.__version__ if orjson else 'not installed'}")
+        for rows in options["rows"] or [1000, 10000, 100000]:
+            posts = build_posts(rows)
+            data = PostSerializer(posts, many=True).data
+            report(self.stdout, rows, options["repeat"], lambda: PostSerializer(posts, many=True).data, data)
+
+
+def build_posts(count):
+    now = timezone.now()
+    authors = [User(id=i + 1, username=f"bench_{i}") for i in range(100)]
+    return [
+        Post(
+            id=i + 1,
+            author=authors[i % len(authors)],
+            title=f"Post {i} about {WORDS[i % len(WORDS)]}",
+            content=" ".join(WORDS[(i + j) % len(WORDS)] for j in range(40)),
+            like_count=i % 50,
+            comment_count=i % 7,
+            created_at=now - timedelta(minutes=i),
+            updated_at=now - timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+
+
+def peak_memory(func):
+    """Peak bytes allocated while `func` runs (tracemalloc)."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def report(stdout, rows, repeat, serialize, data):
+    """One line each for serializing `data` and rendering it with both renderers."""
+    stdout.write(f"{rows} rows")
+    ms, _ = timed(serialize, repeat=repeat)
+    stdout.write(
+        f"  serialize        {ms:>9.1f} ms   peak {peak_memory(serialize) / 2**20:>7.1f} MB"
+    )
+
+    baseline = None
+    for renderer in (JSONRenderer(), FastJSONRenderer()):
+        render = lambda: renderer.render(data)
+        ms, _ = timed(render, repeat=repeat)
+        size = len(render())
+        baseline = baseline or ms
+        stdout.write(
+            f"  {type(renderer).__name__:<16} {ms:>9.1f} ms   "
+            f"peak {peak_memory(render) / 2**20:>7.1f} MB   "
+            f"{size / 2**20:>6.1f} MB out   ({baseline / max(ms, 0.001):.1f}x)"
+        )
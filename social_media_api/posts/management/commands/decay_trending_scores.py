@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import decay_interval, decay_scores, rebuild_scores
+
+
+class Command(BaseCommand):
+    """
+    Age the trending scores (posts/trending.py). Schedule it every
+    TRENDING_DECAY_INTERVAL seconds; each run decays the scores by that
+    much time.
+
+    Usage:
+      python manage.py decay_trending_scores                 # from cron, hourly
+      python manage.py decay_trending_scores --seconds 7200  # a missed run
+      python manage.py decay_trending_scores --rebuild       # recompute from likes/comments
+    """
+
+    help = "Decay (or rebuild) the trending scores of posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seconds",
+            type=float,
+            help="Time to decay by. Default: TRENDING_DECAY_INTERVAL.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute every score from the Like and Comment rows instead.",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            scored = rebuild_scores()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt trending scores: {scored} posts scored."))
+            return
+
+        seconds = options["seconds"] if options["seconds"] is not None else decay_interval()
+        changed = decay_scores(seconds)
+        self.stdout.write(self.style.SUCCESS(f"Decayed {changed} scores by {seconds:.0f}s."))
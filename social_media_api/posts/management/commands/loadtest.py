@@ -0,0 +1,147 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from posts.benchmarking import SEED_PREFIX, User
+
+
+class Command(BaseCommand):
+    """
+    Load test a running server with many concurrent clients, some of them
+    slow, to compare the WSGI (gunicorn) and ASGI (uvicorn) deployments.
+
+    Slow clients trickle their request over --slow-seconds, like a phone
+    on a bad connection. Throughput and latency are reported for the
+    fast clients only: they show how much the slow ones hold up everyone
+    else.
+
+    Usage (same database for the server and this command):
+      gunicorn social_media_api.wsgi:application -w 4 -b 127.0.0.1:8000
+      python manage.py loadtest --url http://127.0.0.1:8000
+
+      uvicorn social_media_api.asgi:application --workers 4 --port 8001
+      python manage.py loadtest --url http://127.0.0.1:8001
+    """
+
+    help = "Measure throughput and p99 latency of the read endpoints under slow clients."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Endpoint to request (repeatable). Default: /api/feed/ and /notifications/.",
+        )
+        parser.add_argument("--token", help="API token. Default: a token of a seeded bench_ user.")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--slow-clients", type=int, default=20)
+        parser.add_argument("--slow-seconds", type=float, default=5.0)
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http":
+            raise CommandError("Only http:// URLs are supported.")
+        self.host, self.port = url.hostname, url.port or 80
+        self.token = options["token"] or self.bench_token()
+        self.timeout = options["timeout"]
+        paths = options["path"] or ["/api/feed/", "/notifications/"]
+
+        for path in paths:
+            latencies, errors, elapsed = asyncio.run(self.run(path, options))
+            if not latencies:
+                self.stderr.write(f"{path}: every request failed ({errors} errors)")
+                continue
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            self.stdout.write(
+                f"{path:<20} {len(latencies) / elapsed:>8.1f} req/s   "
+                f"p50 {statistics.median(latencies):>8.1f} ms   p99 {p99:>8.1f} ms   "
+                f"errors {errors}"
+            )
+
+    def bench_token(self):
+        user = User.objects.filter(username__startswith=SEED_PREFIX).order_by("id").first()
+        if user is None:
+            raise CommandError("No --token given and no seeded users (run benchmark_queries --seed).")
+        token, _ = Token.objects.get_or_create(user=user)
+        return token.key
+
+    async def run(self, path, options):
+        """Returns (fast-client latencies in ms, error count, elapsed seconds)."""
+        queue = asyncio.Queue()
+        for _ in range(options["requests"]):
+            queue.put_nowait(path)
+        latencies, errors = [], 0
+        done = asyncio.Event()
+
+        async def fast_client():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    status = await self.request(path)
+                except (OSError, asyncio.TimeoutError):
+                    status = None
+                if status in (200, 304):
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        async def slow_client():
+            while not done.is_set():
+                try:
+                    await self.request(path, trickle=options["slow_seconds"])
+                except (OSError, asyncio.TimeoutError):
+                    await asyncio.sleep(0.1)
+
+        slow = [asyncio.create_task(slow_client()) for _ in range(options["slow_clients"])]
+        # let the slow clients occupy their connections first
+        await asyncio.sleep(min(options["slow_seconds"] / 2, 1.0))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fast_client() for _ in range(options["concurrency"])))
+        elapsed = time.perf_counter() - started
+
+        done.set()
+        for task in slow:
+            task.cancel()
+        await asyncio.gather(*slow, return_exceptions=True)
+        return latencies, errors, elapsed
+
+    async def request(self, path, trickle=0.0):
+        """One GET over a fresh connection; returns the HTTP status code."""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        try:
+            head = (
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                f"Authorization: Token {self.token}\r\n"
+                "Accept: application/json\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("ascii")
+            if trickle:
+                pieces = 10
+                step = -(-len(head) // pieces)
+                for start in range(0, len(head), step):
+                    writer.write(head[start:start + step])
+                    await writer.drain()
+                    await asyncio.sleep(trickle / pieces)
+            else:
+                writer.write(head)
+                await writer.drain()
+
+            status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+            await asyncio.wait_for(reader.read(), self.timeout)
+            parts = status_line.split()
+            return int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+        finally:
+            writer.close()
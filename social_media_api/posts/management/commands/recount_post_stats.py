@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from posts.counters import actual_comment_count, actual_like_count
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Repair drift in Post.like_count / Post.comment_count.
+
+    Finds posts whose stored counters differ from the real number of
+    Like/Comment rows and fixes them with one UPDATE per batch.
+
+    Usage:
+      python manage.py recount_post_stats
+      python manage.py recount_post_stats --dry-run
+    """
+
+    help = "Recompute denormalized like/comment counters on posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many posts have drifted.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        drifted = (
+            Post.objects.annotate(
+                actual_likes=actual_like_count(),
+                actual_comments=actual_comment_count(),
+            )
+            .exclude(like_count=F("actual_likes"), comment_count=F("actual_comments"))
+            .values_list("id", flat=True)
+        )
+        drifted_ids = list(drifted.iterator())
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(drifted_ids)} posts have drifted counters.")
+            return
+
+        for start in range(0, len(drifted_ids), batch_size):
+            Post.objects.filter(pk__in=drifted_ids[start:start + batch_size]).update(
+                like_count=actual_like_count(),
+                comment_count=actual_comment_count(),
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Repaired counters on {len(drifted_ids)} posts."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.timeline import max_length, trim_timelines
+
+
+class Command(BaseCommand):
+    """
+    Keep every materialized timeline to its newest TIMELINE_MAX_LENGTH
+    entries (posts/timeline.py). Older posts drop out of the feed.
+
+    Usage:
+      python manage.py trim_timelines              # from cron, daily
+      python manage.py trim_timelines --keep 500
+    """
+
+    help = "Delete timeline entries beyond TIMELINE_MAX_LENGTH per user."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep",
+            type=int,
+            help="Entries to keep per timeline. Default: TIMELINE_MAX_LENGTH.",
+        )
+
+    def handle(self, *args, **options):
+        keep = options["keep"] if options["keep"] is not None else max_length()
+        if keep < 1:
+            raise CommandError("--keep must be at least 1.")
+        deleted = trim_timelines(keep)
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} timeline entries (kept {keep} per user).")
+        )
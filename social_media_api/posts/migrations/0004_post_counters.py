@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:54
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Like = apps.get_model("posts", "Like")
+    Comment = apps.get_model("posts", "Comment")
+
+    def total(model):
+        rows = (
+            model.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        return Coalesce(Subquery(rows), 0)
+
+    Post.objects.update(like_count=total(Like), comment_count=total(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created_at'], name='posts_comment_post_created'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='posts_post_created'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created_at'], name='posts_post_author_created'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import migrations
+
+# The schema as of this migration. It is written out here rather than
+# imported from posts/search.py, so later changes there cannot change
+# what this migration does.
+
+SQLITE_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5(
+        title, content,
+        content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS posts_post_fts_ai AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_post_fts_ad AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_post_fts_au AFTER UPDATE OF title, content ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS posts_post_fts_ai",
+    "DROP TRIGGER IF EXISTS posts_post_fts_ad",
+    "DROP TRIGGER IF EXISTS posts_post_fts_au",
+    "DROP TABLE IF EXISTS posts_post_fts",
+]
+
+POSTGRES_SCHEMA = [
+    """ALTER TABLE posts_post ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(content, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS posts_post_search_gin ON posts_post USING GIN (search_vector)",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS posts_post_search_gin",
+    "ALTER TABLE posts_post DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def fts5_available(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return "ENABLE_FTS5" in {row[0] for row in cursor.fetchall()}
+
+
+def forwards(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite" and fts5_available(connection):
+        run(schema_editor, SQLITE_SCHEMA)
+    elif connection.vendor == "postgresql":
+        run(schema_editor, POSTGRES_SCHEMA)
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        run(schema_editor, SQLITE_DROP)
+    elif vendor == "postgresql":
+        run(schema_editor, POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index for post search (see posts/search.py): an FTS5 table
+    with sync triggers on SQLite, a generated tsvector column with a GIN
+    index on PostgreSQL, nothing on other databases.
+    """
+
+    dependencies = [
+        ('posts', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_postsearchindex'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-trending_score', '-id'], name='posts_post_trending'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:31
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_updated_at(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Post.objects.update(last_activity_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='last_activity_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_updated_at, migrations.RunPython.noop),
+    ]
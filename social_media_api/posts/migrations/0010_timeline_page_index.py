@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_last_activity_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='timelineentry',
+            name='posts_timeline_user_created',
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-created_at', '-post'], name='posts_timeline_user_created'),
+        ),
+    ]
@@ -15,6 +15,25 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)  
     updated_at = models.DateTimeField(auto_now=True)       
+    # last edit, like or comment: Last-Modified/ETag (posts/conditional.py)
+    last_activity_at = models.DateTimeField(auto_now=True)
+
+    # Denormalized counters, kept in sync with F() updates in the views
+    # (see posts/counters.py). `recount_post_stats` repairs any drift.
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # time-decayed like/comment activity (see posts/trending.py)
+    trending_score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            # PostViewSet.list and the feed: newest first, keyset on (created_at, id)
+            models.Index(fields=["-created_at", "-id"], name="posts_post_created"),
+            # an author's posts, newest first (profile pages, timeline backfill)
+            models.Index(fields=["author", "-created_at"], name="posts_post_author_created"),
+            # GET /posts/trending/: keyset on (trending_score, id)
+            models.Index(fields=["-trending_score", "-id"], name="posts_post_trending"),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.author.username}"
@@ -38,6 +57,12 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # comments of a post, newest first
+            models.Index(fields=["post", "-created_at"], name="posts_comment_post_created"),
+        ]
+
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
 
@@ -66,6 +91,91 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ("user", "post")  # 👈 prevents duplicate likes
+        # Like(post) lookups use the index Django creates for the `post` FK.
 
     def __str__(self):
         return f"{self.user.username} likes {self.post.title}"
+
+
+class TimelineEntry(models.Model):
+    """
+    One row of a user's materialized home timeline.
+
+    When a post is created it is copied ("fanned out") into the timeline of
+    every follower of its author, so building the feed is an indexed range
+    scan on (user, created_at) instead of a join over the follow table and
+    the whole post table.
+
+    `author` and `created_at` are copied from the post so unfollowing and
+    ordering never need to join back to `Post`.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "post")
+        indexes = [
+            # the feed's page order (posts/timeline.py Feed)
+            models.Index(
+                fields=["user", "-created_at", "-post"], name="posts_timeline_user_created"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in timeline of {self.user_id}"
+
+
+class FullTextField(models.TextField):
+    """The FTS5 document column; the only field with the `match` lookup."""
+
+
+@FullTextField.register_lookup
+class FullTextMatch(models.Lookup):
+    """`document__match="..."`, compiled to SQLite's `MATCH` operator."""
+
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class PostSearchIndex(models.Model):
+    """
+    Read-only view of the SQLite FTS5 table `posts_post_fts` (created by
+    migration, see posts/search.py), one row per post keyed by rowid.
+
+    Only used to JOIN search matches and their rank onto Post queries.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        related_name="search_index",
+    )
+    # FTS5's hidden column named after the table: `posts_post_fts MATCH ?`
+    document = FullTextField(db_column="posts_post_fts")
+    # bm25 score of the current MATCH (lower is better)
+    rank = models.FloatField(db_column="rank")
+
+    class Meta:
+        managed = False
+        db_table = "posts_post_fts"
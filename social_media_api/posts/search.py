@@ -0,0 +1,199 @@
+"""
+Full-text search for posts.
+
+`PostSearchFilter` replaces DRF's SearchFilter (which compiles to
+`LIKE '%q%'` over every row) and delegates to a backend:
+
+- SQLiteFTS5Backend: an FTS5 index `posts_post_fts` kept in sync by
+  triggers on posts_post, joined through the unmanaged PostSearchIndex
+  model. Ranked with bm25().
+- PostgresFullTextBackend: a generated `search_vector` tsvector column
+  with a GIN index. Ranked with ts_rank().
+- IContainsBackend: the old behaviour, used when neither is available.
+
+The backend is picked from the database vendor, or set explicitly with
+POSTS_SEARCH_BACKEND = "posts.search.IContainsBackend" (dotted path).
+
+Every term is prefix-matched ("djan" finds "django"). Ranked results are
+annotated with `search_rank` (higher is better) and paginated on
+("-search_rank", "-id").
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Post
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+FTS_TABLE = "posts_post_fts"
+RANK_ORDERING = ("-search_rank", "-id")
+
+
+def search_terms(query):
+    """Words of the search string; punctuation and operators are dropped."""
+    return TERM_RE.findall(query or "")[:10]
+
+
+class IContainsBackend:
+    """Substring match on title/content (no ranking, no index)."""
+
+    ranked = False
+
+    def search(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(content__icontains=term))
+        return queryset
+
+
+class SQLiteFTS5Backend:
+    ranked = True
+
+    def match_expression(self, terms):
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, terms):
+        # JOIN posts_post_fts ON rowid = posts_post.id WHERE posts_post_fts MATCH ...
+        # bm25 is "lower is better"; negate it so every backend sorts descending.
+        return queryset.filter(
+            search_index__document__match=self.match_expression(terms)
+        ).annotate(search_rank=-F("search_index__rank"))
+
+
+class PostgresFullTextBackend:
+    ranked = True
+
+    def tsquery(self, terms):
+        return " & ".join(f"{term}:*" for term in terms)
+
+    def search(self, queryset, terms):
+        query = self.tsquery(terms)
+        table = Post._meta.db_table
+        return queryset.filter(
+            RawSQL(
+                f"{table}.search_vector @@ to_tsquery('english', %s)",
+                [query],
+                output_field=BooleanField(),
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({table}.search_vector, to_tsquery('english', %s))",
+                [query],
+                output_field=FloatField(),
+            )
+        )
+
+
+_fts_available = {}
+
+
+def sqlite_fts_available(connection):
+    if connection.alias not in _fts_available:
+        with connection.cursor() as cursor:
+            tables = connection.introspection.table_names(cursor)
+        _fts_available[connection.alias] = FTS_TABLE in tables
+    return _fts_available[connection.alias]
+
+
+def get_search_backend(using="default"):
+    path = getattr(settings, "POSTS_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        return PostgresFullTextBackend()
+    if connection.vendor == "sqlite" and sqlite_fts_available(connection):
+        return SQLiteFTS5Backend()
+    return IContainsBackend()
+
+
+class PostSearchFilter(BaseFilterBackend):
+    """?search=<words> on PostViewSet, using the configured backend."""
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(request.query_params.get(self.search_param, ""))
+        if not terms:
+            return queryset
+        return get_search_backend(queryset.db).search(queryset, terms)
+
+
+def cursor_ordering(queryset, default):
+    """Rank ordering for searched querysets, `default` otherwise."""
+    if "search_rank" in queryset.query.annotations:
+        return RANK_ORDERING
+    return default
+
+
+# ---- schema (used by the post_migrate hook; migration 0006 has its own copy) ----
+
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content,
+        content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, content ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+
+POSTGRES_SCHEMA = [
+    """ALTER TABLE posts_post ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(content, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS posts_post_search_gin ON posts_post USING GIN (search_vector)",
+]
+
+
+def install_search_index(connection, rebuild=False):
+    """
+    Create the full-text index for this database if the vendor has one.
+    Idempotent. On SQLite, Django rebuilds a table for some ALTERs, which
+    drops its triggers, so this also runs after every migrate.
+    """
+    _fts_available.pop(connection.alias, None)
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if "ENABLE_FTS5" not in {row[0] for row in cursor.fetchall()}:
+                return
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+            if rebuild:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            for statement in POSTGRES_SCHEMA:
+                cursor.execute(statement)
+
+
+def uninstall_search_index(connection):
+    _fts_available.pop(connection.alias, None)
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif connection.vendor == "postgresql":
+            cursor.execute("DROP INDEX IF EXISTS posts_post_search_gin")
+            cursor.execute("ALTER TABLE posts_post DROP COLUMN IF EXISTS search_vector")
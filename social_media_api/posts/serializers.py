@@ -1,9 +1,10 @@
 
 from rest_framework import serializers
+from social_media_api.sparse_fields import SparseFieldsetMixin
 from .models import Post, Comment
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author_username = serializers.ReadOnlyField(source="author.username")
 
     class Meta:
@@ -14,13 +15,17 @@ class PostSerializer(serializers.ModelSerializer):
             "author_username",
             "title",
             "content",
+            "like_count",
+            "comment_count",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["author", "created_at", "updated_at"]
+        read_only_fields = ["author", "like_count", "comment_count", "created_at", "updated_at"]
+        # cut in ?compact=1 mode (social_media_api/sparse_fields.py)
+        compact_fields = ("content",)
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author_username = serializers.ReadOnlyField(source="author.username")
 
     class Meta:
@@ -35,3 +40,4 @@ class CommentSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ["author", "created_at", "updated_at"]
+        compact_fields = ("content",)
@@ -0,0 +1,21 @@
+"""Background tasks of the posts app (run through tasks/queue.py)."""
+
+from tasks.queue import task
+
+from .models import Post
+from .timeline import fan_out_post
+from .trending import rescore_post
+
+
+@task("posts.fan_out_post")
+def fan_out_new_post(post_id):
+    """Copy a new post into its author's followers' timelines."""
+    post = Post.objects.select_related("author").filter(pk=post_id).first()
+    if post is not None:  # deleted before the job ran
+        fan_out_post(post)
+
+
+@task("posts.rescore_post")
+def update_trending_score(post_id):
+    """Recompute a post's trending score after likes or comments changed."""
+    rescore_post(post_id)
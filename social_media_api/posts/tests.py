@@ -1,3 +1,794 @@
-from django.test import TestCase
+import io
+import uuid
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import tracemalloc
+import unittest
+from contextlib import closing
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import F
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.follows import follow
+from notifications.models import Notification, NotificationOutbox
+from social_media_api.query_budget import QueryBudgetExceeded, assert_max_queries
+from social_media_api import renderers
+from social_media_api.renderers import FastJSONParser, FastJSONRenderer
+from social_media_api.replicas import PIN_COOKIE, REPLICA
+from tasks.models import Job
+from tasks.queue import claim_due, execute
+
+from .async_views import AsyncFeedView
+from .models import Comment, Like, Post, TimelineEntry
+from .search import get_search_backend
+from .timeline import fan_out_post, trim_timeline
+from .trending import comment_weight, decay_scores, half_life, like_weight
+from .views import CommentViewSet, FeedView, PostViewSet
+
+User = get_user_model()
+
+
+# jobs are left queued: the test is about the counter
+@override_settings(NOTIFICATIONS_ASYNC=False, TASKS_MODE="worker")
+class ConcurrentLikeTests(TransactionTestCase):
+    """Many clients toggling likes at once (posts/likes.py)."""
+
+    THREADS_PER_USER = 3
+    TOGGLES = 7
+
+    def setUp(self):
+        cache.clear()
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("needs a file-backed test database shared by the threads")
+
+    def test_concurrent_toggles_keep_the_counter_exact(self):
+        author = User.objects.create_user("author", password="pw")
+        users = [User.objects.create_user(f"user{i}", password="pw") for i in range(8)]
+        post = Post.objects.create(author=author, title="t", content="c")
+        errors = []
+
+        def hammer(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                for _ in range(self.TOGGLES):
+                    response = client.post(f"/api/posts/{post.pk}/like/")
+                    if response.status_code not in (200, 201):
+                        errors.append(response.status_code)
+            except Exception as exc:  # IntegrityError, "database is locked", ...
+                errors.append(repr(exc))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=hammer, args=(user,))
+            for user in users
+            for _ in range(self.THREADS_PER_USER)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, Like.objects.filter(post=post).count())
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset cursors on posts and comments (social_media_api/pagination.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user("author", password="pw")
+        now = timezone.now()
+        posts = Post.objects.bulk_create(
+            Post(author=author, title=f"post {i}", content="c") for i in range(11)
+        )
+        # equal timestamps in threes: the id breaks the tie
+        for i, post in enumerate(posts):
+            post.created_at = now - timedelta(minutes=i // 3)
+        Post.objects.bulk_update(posts, ["created_at"])
+        Comment.objects.bulk_create(
+            Comment(post=posts[0], author=author, content=f"comment {i}") for i in range(7)
+        )
+        cls.expected_posts = [
+            post.pk for post in sorted(posts, key=lambda p: (p.created_at, p.pk), reverse=True)
+        ]
+        cls.expected_comments = list(
+            Comment.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, url):
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                body = self.client.get(url).json()
+            # no OFFSET to walk past earlier pages, no COUNT(*)
+            for query in queries:
+                self.assertNotIn("OFFSET", query["sql"].upper())
+                self.assertNotIn("COUNT(", query["sql"].upper())
+            ids.extend(row["id"] for row in body["results"])
+            url = body["next"]
+        return ids
+
+    def test_posts(self):
+        self.assertEqual(self.walk("/api/posts/?page_size=4"), self.expected_posts)
+
+    def test_comments(self):
+        self.assertEqual(self.walk("/api/comments/?page_size=3"), self.expected_comments)
+
+    def test_previous(self):
+        first = self.client.get("/api/posts/?page_size=4").json()
+        second = self.client.get(first["next"]).json()
+        self.assertIsNone(first["previous"])
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual(
+            [row["id"] for row in back["results"]], [row["id"] for row in first["results"]]
+        )
+
+    def test_invalid_cursor(self):
+        for cursor in ("nonsense", "e30="):  # not base64 JSON; {}
+            response = self.client.get("/api/posts/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+
+class JSONRenderingTests(TestCase):
+    """orjson output and parsing match DRF's (social_media_api/renderers.py)."""
+
+    data = {
+        "id": 1,
+        "title": "caf\u00e9 \u2028 \U0001f600 </script>",
+        "created_at": timezone.now(),
+        "score": Decimal("1.50"),
+        "uuid": uuid.uuid4(),
+        "label": gettext_lazy("Invalid token."),
+        "nested": [{"a": None, "b": True, "c": 1.5}, []],
+        7: "int key",
+    }
+
+    def assert_same_bytes(self, data, media_type=None, context=None):
+        fast = FastJSONRenderer().render(data, media_type, context)
+        self.assertEqual(fast, JSONRenderer().render(data, media_type, context))
+
+    @unittest.skipIf(renderers.orjson is None, "orjson is not installed")
+    def test_orjson_is_used(self):
+        with mock.patch.object(JSONRenderer, "render") as drf:
+            FastJSONRenderer().render(self.data)
+        drf.assert_not_called()
+
+    def test_same_bytes(self):
+        self.assert_same_bytes(self.data)
+        self.assert_same_bytes([self.data, self.data])
+        self.assert_same_bytes({"count": 2**70})  # falls back to DRF
+        self.assert_same_bytes(None)
+
+    def test_indent(self):
+        self.assert_same_bytes(self.data, "application/json; indent=4")
+
+    def test_api_response(self):
+        author = User.objects.create_user("author", password="pw")
+        Post.objects.create(author=author, title="t\u2028", content="c\u00e9")
+        client = APIClient()
+        client.force_authenticate(author)
+        response = client.get("/api/posts/")
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def parse(self, parser, body, encoding="utf-8"):
+        return parser.parse(io.BytesIO(body), None, {"encoding": encoding})
+
+    def test_parse(self):
+        body = '{"title": "caf\u00e9", "ids": [1, 2], "x": null}'.encode()
+        self.assertEqual(self.parse(FastJSONParser(), body), self.parse(JSONParser(), body))
+        latin1 = '{"title": "caf\u00e9"}'.encode("latin-1")
+        self.assertEqual(self.parse(FastJSONParser(), latin1, "latin-1"), {"title": "caf\u00e9"})
+
+    def test_parse_errors(self):
+        for body in (b"{", b'{"x": NaN}', b"\xff"):
+            with self.assertRaises(ParseError, msg=body):
+                self.parse(FastJSONParser(), body)
+
+
+@override_settings(COMPACT_TEXT_LENGTH=10)
+class SparseFieldsTests(TestCase):
+    """?fields=, ?exclude= and ?compact=1 (social_media_api/sparse_fields.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user("author", password="pw")
+        cls.post = Post.objects.create(author=cls.author, title="t", content="x" * 50)
+        Comment.objects.create(post=cls.post, author=cls.author, content="short")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        sql = "\n".join(query["sql"] for query in queries.captured_queries)
+        return response.json()["results"], sql
+
+    def test_fields(self):
+        [row], sql = self.get("/api/posts/", {"fields": "id,title"})
+        self.assertEqual(row, {"id": self.post.pk, "title": "t"})
+        self.assertNotIn('"content"', sql)
+
+    def test_exclude(self):
+        [row], sql = self.get("/api/posts/", {"exclude": "content,author_username"})
+        self.assertNotIn("content", row)
+        self.assertIn("like_count", row)
+        self.assertNotIn('"content"', sql)
+
+    def test_compact(self):
+        [row], sql = self.get("/api/posts/", {"compact": "1", "fields": "id,content"})
+        self.assertEqual(row["content"], "x" * 10 + "…")
+        # the long text is cut in the database
+        self.assertIn("SUBSTR", sql.upper())
+        self.assertNotIn('"posts_post"."content" AS', sql)
+        [comment], _ = self.get("/api/comments/", {"compact": "1"})
+        self.assertEqual(comment["content"], "short")
+
+    def test_unknown_field(self):
+        for params in ({"fields": "id,bogus"}, {"exclude": "bogus"}):
+            response = self.client.get("/api/posts/", params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json(), {"fields": "Unknown field(s): bogus"})
+
+    def test_writes_get_every_field(self):
+        response = self.client.post(
+            "/api/posts/?fields=id&compact=1", {"title": "n", "content": "y" * 50}, format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["content"], "y" * 50)
+        self.assertIn("author_username", response.json())
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, TASKS_MODE="sync")
+class ConditionalGetTests(TestCase):
+    """ETag/Last-Modified of posts and the feed (posts/conditional.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author", password="pw")
+        self.reader = User.objects.create_user("reader", password="pw")
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+        self.reader_client = APIClient()
+        self.reader_client.force_authenticate(self.reader)
+        self.reader_client.post(f"/follow/{self.author.pk}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.author_client.post("/api/posts/", {"title": "t", "content": "c"})
+        self.post_id = response.json()["id"]
+        self.urls = [f"/api/posts/{self.post_id}/", "/api/posts/", "/api/feed/"]
+
+    def etags(self):
+        etags = {}
+        for url in self.urls:
+            response = self.reader_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            etags[url] = response["ETag"]
+        return etags
+
+    def assert_changed(self, etags):
+        for url, etag in etags.items():
+            response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response["ETag"], etag, url)
+
+    def test_unchanged(self):
+        for url, etag in self.etags().items():
+            response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+
+    def test_edit(self):
+        etags = self.etags()
+        self.author_client.patch(f"/api/posts/{self.post_id}/", {"title": "edited"})
+        self.assert_changed(etags)
+
+    def test_like(self):
+        etags = self.etags()
+        updated_at = Post.objects.get(pk=self.post_id).updated_at
+        self.reader_client.post(f"/api/posts/{self.post_id}/like/")
+        self.assert_changed(etags)
+        # a like is activity, not an edit
+        self.assertEqual(Post.objects.get(pk=self.post_id).updated_at, updated_at)
+
+    def test_comment(self):
+        etags = self.etags()
+        self.reader_client.post("/api/comments/", {"post": self.post_id, "content": "hi"})
+        self.assert_changed(etags)
+
+    def test_malformed_pk(self):
+        response = self.reader_client.get("/api/posts/abc/")
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=1)
+class FeedTests(TestCase):
+    """The feed is paged on the timeline (posts/timeline.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user("reader", password="pw")
+        fanned_out = User.objects.create_user("fanned_out", password="pw")
+        # two followers, over TIMELINE_FANOUT_MAX_FOLLOWERS: read at feed time
+        popular = User.objects.create_user("popular", password="pw")
+        cls.reader.following.add(fanned_out, popular)
+        User.objects.create_user("fan", password="pw").following.add(popular)
+        now = timezone.now()
+        posts = Post.objects.bulk_create(
+            Post(author=popular if i % 3 == 0 else fanned_out, title=f"post {i}", content="c")
+            for i in range(25)
+        )
+        # equal timestamps in pairs: the post id breaks the tie
+        for i, post in enumerate(posts):
+            post.created_at = now - timedelta(minutes=i // 2)
+        Post.objects.bulk_update(posts, ["created_at"])
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user=cls.reader, post=post, author_id=post.author_id, created_at=post.created_at
+            )
+            for post in posts
+            # the popular author used to be fanned out: an entry of theirs too
+            if post.author_id == fanned_out.pk or post is posts[0]
+        )
+        cls.expected = [
+            post.pk for post in sorted(posts, key=lambda p: (p.created_at, p.pk), reverse=True)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def walk(self, url, link):
+        ids = []
+        while url:
+            body = self.client.get(url).json()
+            ids.extend(post["id"] for post in body["results"])
+            url = body[link]
+        return ids
+
+    def test_pages(self):
+        self.assertEqual(self.walk("/api/feed/?page_size=4", "next"), self.expected)
+
+    def test_previous_pages(self):
+        body = self.client.get("/api/feed/?page_size=4").json()
+        while body["next"]:
+            body = self.client.get(body["next"]).json()
+        ids = [post["id"] for post in body["results"]]
+        url = body["previous"]
+        while url:
+            page = self.client.get(url).json()
+            ids[:0] = [post["id"] for post in page["results"]]
+            url = page["previous"]
+        self.assertEqual(ids, self.expected)
+
+    def test_trim(self):
+        entries = TimelineEntry.objects.filter(user=self.reader)
+        newest = list(entries.order_by("-created_at", "-post_id").values_list("post_id", flat=True)[:5])
+        self.assertEqual(trim_timeline(self.reader.pk, keep=5), 12)
+        self.assertEqual(sorted(entries.values_list("post_id", flat=True)), sorted(newest))
+        call_command("trim_timelines", keep=5, stdout=io.StringIO())
+        self.assertEqual(entries.count(), 5)
+
+
+class SearchTests(TestCase):
+    """?search= on posts (posts/search.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user("author", password="pw")
+        filler = " ".join(f"word{i}" for i in range(100))
+        cls.focused = Post.objects.create(
+            author=author, title="Django tips", content="django models and django views"
+        )
+        cls.passing = Post.objects.create(
+            author=author, title="A long read", content=f"{filler} django {filler}"
+        )
+        cls.unrelated = Post.objects.create(author=author, title="Flask", content="routes")
+
+    def setUp(self):
+        if not get_search_backend().ranked:
+            self.skipTest("no full-text index on this database")
+        self.client = APIClient()
+
+    def search(self, query, **params):
+        response = self.client.get("/api/posts/", {"search": query, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [post["id"] for post in response.json()["results"]]
+
+    def test_ranked(self):
+        self.assertEqual(self.search("django"), [self.focused.pk, self.passing.pk])
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(self.search("djan"), [self.focused.pk, self.passing.pk])
+        self.assertEqual(self.search("django tips"), [self.focused.pk])
+
+    def test_operators_are_plain_words(self):
+        self.assertEqual(self.search('django" OR "flask* NOT'), [])
+
+    def test_pages_follow_the_rank(self):
+        ids = []
+        url = "/api/posts/?search=django&page_size=1"
+        while url:
+            body = self.client.get(url).json()
+            ids.extend(post["id"] for post in body["results"])
+            url = body["next"]
+        self.assertEqual(ids, [self.focused.pk, self.passing.pk])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.unrelated.content = "django routes"
+        self.unrelated.save()
+        self.focused.delete()
+        self.assertEqual(self.search("django"), [self.unrelated.pk, self.passing.pk])
+        self.assertEqual(self.search("flask"), [self.unrelated.pk])
+
+    @override_settings(POSTS_SEARCH_BACKEND="posts.search.IContainsBackend")
+    def test_icontains_fallback(self):
+        self.assertEqual(sorted(self.search("django")), [self.focused.pk, self.passing.pk])
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class CommentCounterTests(TestCase):
+    """comment_count changes in the same transaction as the comment (posts/counters.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.post = Post.objects.create(author=self.user, title="t", content="c")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def comment_count(self):
+        self.post.refresh_from_db()
+        return self.post.comment_count
+
+    def test_create_and_delete(self):
+        response = self.client.post("/api/comments/", {"post": self.post.pk, "content": "hi"})
+        self.assertEqual(self.comment_count(), 1)
+        self.client.delete(f"/api/comments/{response.json()['id']}/")
+        self.assertEqual(self.comment_count(), 0)
+
+    def test_failed_counter_update_keeps_the_comment(self):
+        comment = Comment.objects.create(post=self.post, author=self.user, content="hi")
+        with mock.patch("posts.views.increment_comments", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.delete(f"/api/comments/{comment.pk}/")
+        self.assertTrue(Comment.objects.filter(pk=comment.pk).exists())
+
+
+@override_settings(TASKS_MODE="worker")
+class SideEffectTests(TestCase):
+    """Likes and comments leave their side effects to queued jobs (tasks/queue.py)."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author", password="pw")
+        self.post = Post.objects.create(author=self.author, title="t", content="c")
+
+    def client_for(self, username):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username, password="pw"))
+        return client
+
+    def queued(self):
+        return sorted(Job.objects.filter(status=Job.QUEUED).values_list("name", "key"))
+
+    def test_like_and_comment(self):
+        alice, bob = self.client_for("alice"), self.client_for("bob")
+        alice.post(f"/api/posts/{self.post.pk}/like/")
+        bob.post(f"/api/posts/{self.post.pk}/like/")
+        bob.post("/api/comments/", {"post": self.post.pk, "content": "hi"})
+        # one queued job per key, however many events
+        self.assertEqual(
+            self.queued(),
+            [
+                ("notifications.deliver", "notifications:deliver"),
+                ("posts.rescore_post", f"trending:{self.post.pk}"),
+            ],
+        )
+        self.assertEqual(NotificationOutbox.objects.count(), 3)
+
+        # what run_workers does, in this thread
+        for job_id in claim_due(10):
+            execute(job_id)
+        self.assertEqual(self.queued(), [])
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 2)
+        self.post.refresh_from_db()
+        self.assertAlmostEqual(
+            self.post.trending_score, 2 * like_weight() + comment_weight(), places=3
+        )
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, TASKS_MODE="sync")
+class TrendingTests(TestCase):
+    """Trending scores follow likes and unlikes (posts/trending.py)."""
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user("author", password="pw")
+        self.post = Post.objects.create(author=author, title="t", content="c")
+        self.like_url = f"/api/posts/{self.post.pk}/like/"
+
+    def client_for(self, username):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username, password="pw"))
+        return client
+
+    def toggle(self, client):
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(self.like_url)
+        self.post.refresh_from_db()
+        return self.post.trending_score
+
+    def test_unlike_takes_back_the_decayed_weight(self):
+        early, late = self.client_for("early"), self.client_for("late")
+        self.assertAlmostEqual(self.toggle(early), like_weight(), places=3)
+        # one half-life later, as the decay cron job leaves it
+        Like.objects.update(created_at=F("created_at") - timedelta(seconds=half_life()))
+        decay_scores(half_life())
+        self.assertAlmostEqual(self.toggle(late), 1.5 * like_weight(), places=3)
+        # the early like is worth half its weight by now: only that goes
+        self.assertAlmostEqual(self.toggle(early), like_weight(), places=3)
+
+    def test_toggling_does_not_pump_the_score(self):
+        client = self.client_for("fan")
+        for _ in range(5):
+            self.toggle(client)
+        self.assertAlmostEqual(self.toggle(client), 0.0)
+
+
+class QueryBudgetTests(TestCase):
+    """Full pages stay within the `query_budget` their views declare."""
+
+    ROWS = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user("reader", password="pw")
+        authors = [User.objects.create_user(f"author{i}", password="pw") for i in range(10)]
+        posts = Post.objects.bulk_create(
+            Post(author=authors[i % 10], title=f"post {i}", content="c")
+            for i in range(cls.ROWS)
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=authors[i % 10], content="c")
+            for i, post in enumerate(posts)
+        )
+        Like.objects.bulk_create(Like(post=post, user=cls.reader) for post in posts)
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user=cls.reader, post=post, author_id=post.author_id, created_at=post.created_at
+            )
+            for post in posts
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def assert_within_budget(self, url, view):
+        with assert_max_queries(view.query_budget, url):
+            response = self.client.get(url, {"page_size": self.ROWS})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(response.json()["results"]), self.ROWS)
+
+    def test_posts(self):
+        self.assert_within_budget("/api/posts/", PostViewSet)
+
+    def test_comments(self):
+        self.assert_within_budget("/api/comments/", CommentViewSet)
+
+    def test_feed(self):
+        self.assert_within_budget("/api/feed/", FeedView)
+
+
+@override_settings(ROOT_URLCONF="social_media_api.urls_asgi")
+class AsyncErrorTests(TestCase):
+    """Async views render errors as DRF does (social_media_api/async_views.py)."""
+
+    async def test_field_errors_keep_their_shape(self):
+        user = await User.objects.acreate_user("alice", password="pw")
+        token = await Token.objects.acreate(user=user)
+        response = await AsyncClient().get(
+            "/api/feed/?fields=bogus", headers={"authorization": f"Token {token.key}"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"fields": "Unknown field(s): bogus"})
+
+    async def test_detail(self):
+        response = await AsyncClient().get("/api/feed/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(
+            response.json(), {"detail": "Authentication credentials were not provided."}
+        )
+
+
+@override_settings(ROOT_URLCONF="social_media_api.urls_asgi", QUERY_BUDGET_STRICT=True)
+class AsyncQueryBudgetTests(TestCase):
+    """QueryBudgetMiddleware counts the queries async views run in worker threads."""
+
+    async def get_feed(self):
+        user = await User.objects.acreate_user("alice", password="pw")
+        token = await Token.objects.acreate(user=user)
+        return await AsyncClient().get(
+            "/api/feed/", headers={"authorization": f"Token {token.key}"}
+        )
+
+    async def test_within_budget(self):
+        response = await self.get_feed()
+        self.assertEqual(response.status_code, 200)
+
+    async def test_over_budget(self):
+        with mock.patch.object(AsyncFeedView, "query_budget", 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                await self.get_feed()
+
+
+@override_settings(EXPORT_CHUNK_SIZE=500)
+class ExportMemoryTests(TestCase):
+    """The export streams: its peak memory does not grow with the table."""
+
+    ROWS = 20_000
+    PEAK_BYTES = 4 * 2**20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="pw", is_staff=True)
+        Post.objects.bulk_create(
+            Post(author=cls.admin, title=f"post {i}", content="x" * 500)
+            for i in range(cls.ROWS)
+        )
+
+    def test_peak_memory_is_bounded(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        # warm up: imports and caches of the first request are not the export's
+        last_id = Post.objects.latest("id").id
+        warm_up = client.get(f"/api/posts/export/?format=ndjson&after_id={last_id - 10}")
+        list(warm_up.streaming_content)
+        tracemalloc.start()
+        try:
+            response = client.get("/api/posts/export/?format=ndjson")
+            lines = size = 0
+            for piece in response.streaming_content:
+                lines += piece.count(b"\n")
+                size += len(piece)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(lines, self.ROWS)
+        # the body is several times larger than the bound
+        self.assertGreater(size, 3 * self.PEAK_BYTES)
+        self.assertLess(peak, self.PEAK_BYTES, f"peak {peak} bytes for a {size}-byte body")
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, TASKS_MODE="worker")
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Reads of the post, feed and notification views go to the replica,
+    writes and pinned clients to the primary (social_media_api/replicas.py).
+    The replica is a second SQLite file, copied from the primary.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if connections["default"].vendor != "sqlite":
+            raise unittest.SkipTest("copies the primary with SQLite's backup API")
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory, ignore_errors=True)
+        cls.replica_path = os.path.join(directory, "replica.sqlite3")
+        # an alias, as settings.py adds it for DATABASE_REPLICA_URL
+        replica = {**connections.settings["default"], "NAME": cls.replica_path, "TEST": {}}
+        connections.settings[REPLICA] = connections.configure_settings(
+            {"default": connections.settings["default"], REPLICA: replica}
+        )[REPLICA]
+        cls.addClassCleanup(cls.remove_replica)
+        # declared only now: the test runner sets up "default" alone
+        cls.databases = {"default", REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def remove_replica(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author", password="pw")
+        self.reader = User.objects.create_user("reader", password="pw")
+        follow(self.reader, self.author)
+        self.replicated = self.publish("replicated")
+        self.replicate()
+        # written after the copy: only on the primary
+        self.primary_only = self.publish("primary only")
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def publish(self, title):
+        post = Post.objects.create(author=self.author, title=title, content="c")
+        fan_out_post(post)
+        Notification.objects.create(recipient=self.reader, actor=self.author, verb=title)
+        return post
+
+    def replicate(self):
+        connections[REPLICA].close()
+        primary = connections["default"]
+        primary.ensure_connection()
+        with closing(sqlite3.connect(self.replica_path)) as replica:
+            primary.connection.backup(replica)
+
+    def read(self):
+        """What the reader sees on each replica-routed endpoint."""
+        return {
+            "posts": [post["title"] for post in self.client.get("/api/posts/").json()["results"]],
+            "post": self.client.get(f"/api/posts/{self.primary_only.pk}/").status_code,
+            "feed": [post["title"] for post in self.client.get("/api/feed/").json()["results"]],
+            "notifications": [
+                row["verb"] for row in self.client.get("/notifications/").json()["results"]
+            ],
+        }
+
+    def test_safe_reads_use_the_replica(self):
+        self.assertEqual(
+            self.read(),
+            {
+                "posts": ["replicated"],
+                "post": 404,
+                "feed": ["replicated"],
+                "notifications": ["replicated"],
+            },
+        )
+
+    def test_writes_use_the_primary_and_pin_the_client(self):
+        response = self.client.post(
+            "/api/comments/", {"post": self.primary_only.pk, "content": "hi"}
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(Comment.objects.using("default").exists())
+        self.assertFalse(Comment.objects.using(REPLICA).exists())
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        # the signed cookie pins without the cache
+        cache.clear()
+        self.assertEqual(
+            self.read(),
+            {
+                "posts": ["primary only", "replicated"],
+                "post": 200,
+                "feed": ["primary only", "replicated"],
+                "notifications": ["primary only", "replicated"],
+            },
+        )
+
+    def test_forged_pin_cookie_is_ignored(self):
+        self.client.cookies[PIN_COOKIE] = "1"
+        self.assertEqual(self.read()["posts"], ["replicated"])
@@ -0,0 +1,230 @@
+"""
+Materialized home timelines (fan-out on write) with a hybrid fallback.
+
+- Normal authors: when they post, the post is copied into the timeline
+  of each follower (`fan_out_post`).
+- Authors with more than TIMELINE_FANOUT_MAX_FOLLOWERS followers are not
+  fanned out (one post would mean a huge write). Their posts are merged
+  into the feed at read time instead (fan-out on read).
+- Timelines are kept to their newest TIMELINE_MAX_LENGTH entries by
+  `python manage.py trim_timelines` (from cron).
+"""
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from social_media_api.pagination import keyset_filter, reverse_ordering
+
+from .models import Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def fanout_max_followers():
+    """Authors with more followers than this are read at feed time."""
+    return getattr(settings, "TIMELINE_FANOUT_MAX_FOLLOWERS", 10000)
+
+
+def backfill_limit():
+    """How many recent posts of an author to copy on follow/backfill."""
+    return getattr(settings, "TIMELINE_BACKFILL_LIMIT", 200)
+
+
+def max_length():
+    """Entries kept per timeline by `trim_timelines`; older posts drop out of the feed."""
+    return getattr(settings, "TIMELINE_MAX_LENGTH", 800)
+
+
+def is_fanout_author(author):
+    """True if new posts by `author` are pushed into follower timelines."""
+    return author.follower_count <= fanout_max_followers()
+
+
+def _insert_entries(entries):
+    for start in range(0, len(entries), BATCH_SIZE):
+        TimelineEntry.objects.bulk_create(
+            entries[start:start + BATCH_SIZE],
+            ignore_conflicts=True,
+        )
+
+
+def fan_out_post(post):
+    """
+    Copy a new post into the timeline of every follower of its author.
+
+    Returns the number of timelines written (0 for high-follower authors,
+    whose posts are picked up at read time).
+    """
+    if not is_fanout_author(post.author):
+        return 0
+
+    follower_ids = list(post.author.followers.values_list("id", flat=True))
+    entries = [
+        TimelineEntry(
+            user_id=follower_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            created_at=post.created_at,
+        )
+        for follower_id in follower_ids
+    ]
+    _insert_entries(entries)
+    return len(entries)
+
+
+def add_author_to_timeline(user, author, limit=None):
+    """
+    After `user` follows `author`, copy the author's recent posts into the
+    user's timeline so the feed is not empty until the next post.
+    """
+    if not is_fanout_author(author):
+        return 0
+
+    limit = backfill_limit() if limit is None else limit
+    posts = (
+        Post.objects.filter(author=author)
+        .order_by("-created_at")
+        .values_list("id", "created_at")[:limit]
+    )
+    entries = [
+        TimelineEntry(
+            user_id=user.pk,
+            post_id=post_id,
+            author_id=author.pk,
+            created_at=created_at,
+        )
+        for post_id, created_at in posts
+    ]
+    _insert_entries(entries)
+    return len(entries)
+
+
+def remove_author_from_timeline(user, author):
+    """After `user` unfollows `author`, drop the author's posts from the timeline."""
+    deleted, _ = TimelineEntry.objects.filter(user=user, author=author).delete()
+    return deleted
+
+
+def add_authors_to_timeline(user, authors, limit=None):
+    """
+    Bulk version of add_author_to_timeline (used by bulk follow): one query
+    for the newest `limit` posts across all fan-out authors, one insert.
+    """
+    author_ids = [author.pk for author in authors if is_fanout_author(author)]
+    if not author_ids:
+        return 0
+
+    limit = backfill_limit() if limit is None else limit
+    posts = (
+        Post.objects.filter(author_id__in=author_ids)
+        .order_by("-created_at")
+        .values_list("id", "author_id", "created_at")[:limit]
+    )
+    entries = [
+        TimelineEntry(
+            user_id=user.pk,
+            post_id=post_id,
+            author_id=author_id,
+            created_at=created_at,
+        )
+        for post_id, author_id, created_at in posts
+    ]
+    _insert_entries(entries)
+    return len(entries)
+
+
+def remove_authors_from_timeline(user, author_ids):
+    deleted, _ = TimelineEntry.objects.filter(user=user, author_id__in=author_ids).delete()
+    return deleted
+
+
+def fanout_on_read_author_ids(user):
+    """IDs of followed authors whose posts are not materialized."""
+    return list(
+        user.following.filter(follower_count__gt=fanout_max_followers())
+        .values_list("id", flat=True)
+    )
+
+
+class Feed:
+    """
+    The home feed of `user`: the materialized timeline plus the posts of
+    `read_time_authors` (followed authors who are not fanned out).
+
+    A page is chosen on the timeline index (user, -created_at, -post) and
+    on the post index of those authors, each subquery stopping after the
+    page size, so only about one page of posts is read however long the
+    timeline is. Positions are (created_at, post id), as in the cursors
+    of DefaultPagination.
+    """
+
+    ordering = ("-created_at", "-post_id")
+    post_ordering = ("-created_at", "-id")
+
+    def __init__(self, user, read_time_authors):
+        self.user = user
+        self.read_time_authors = read_time_authors
+
+    def page(self, posts, position, reverse, size):
+        """`posts` limited to the `size` newest after `position` (before it if `reverse`)."""
+        entries = TimelineEntry.objects.filter(user=self.user)
+        condition = Q(id__in=_page(entries, self.ordering, position, reverse, size).values("post_id"))
+        if self.read_time_authors:
+            authored = Post.objects.filter(author_id__in=self.read_time_authors)
+            condition |= Q(
+                id__in=_page(authored, self.post_ordering, position, reverse, size).values("id")
+            )
+        # a post can be in both (its author crossed the threshold): the
+        # union still holds the `size` newest
+        posts = posts.filter(condition)
+        ordering = reverse_ordering(self.post_ordering) if reverse else self.post_ordering
+        return posts.order_by(*ordering)[:size]
+
+
+def _page(queryset, ordering, position, reverse, size):
+    if position is not None:
+        queryset = queryset.filter(keyset_filter(ordering, position, reverse))
+    return queryset.order_by(*(reverse_ordering(ordering) if reverse else ordering))[:size]
+
+
+def get_feed(user):
+    return Feed(user, fanout_on_read_author_ids(user))
+
+
+async def aget_feed(user):
+    """get_feed for async views."""
+    read_time_authors = [
+        author_id
+        async for author_id in user.following.filter(
+            follower_count__gt=fanout_max_followers()
+        ).values_list("id", flat=True)
+    ]
+    return Feed(user, read_time_authors)
+
+
+def trim_timeline(user_id, keep=None):
+    """
+    Delete the entries of a timeline beyond its `keep` newest (default:
+    TIMELINE_MAX_LENGTH). Returns the number deleted.
+    """
+    keep = max_length() if keep is None else keep
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    oldest_kept = (
+        entries.order_by(*Feed.ordering).values_list("created_at", "post_id")[keep - 1:keep].first()
+    )
+    if oldest_kept is None:
+        return 0
+    deleted, _ = entries.filter(keyset_filter(Feed.ordering, oldest_kept)).delete()
+    return deleted
+
+
+def trim_timelines(keep=None):
+    """trim_timeline for every timeline longer than `keep`."""
+    keep = max_length() if keep is None else keep
+    long_timelines = list(
+        TimelineEntry.objects.values("user_id")
+        .annotate(entries=Count("id"))
+        .filter(entries__gt=keep)
+        .values_list("user_id", flat=True)
+    )
+    return sum(trim_timeline(user_id, keep) for user_id in long_timelines)
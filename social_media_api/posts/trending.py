@@ -0,0 +1,108 @@
+"""
+Trending posts (GET /api/posts/trending/).
+
+Each post has a `trending_score`: its likes and comments, each worth
+TRENDING_LIKE_WEIGHT / TRENDING_COMMENT_WEIGHT when it happens and losing
+half its worth every TRENDING_HALF_LIFE seconds.
+
+- Every like, unlike, comment and comment deletion queues a background
+  job (posts/tasks.py, one queued per post) that recomputes the post's
+  score from its Like and Comment rows (`rescore_post`). A removed like
+  takes back exactly what it is still worth after decaying, so newer
+  activity is kept and toggling a like cannot pump a score.
+- `decay_trending_scores` (run it every TRENDING_DECAY_INTERVAL seconds,
+  e.g. from cron) multiplies every non-zero score by
+  0.5 ** (interval / half life) and drops tiny ones to 0.
+- `decay_trending_scores --rebuild` recomputes all scores from the Like
+  and Comment rows (after the migration, or to repair drift).
+
+The list is read in (-trending_score, -id) order from the
+posts_post_trending index: an index range scan, not an aggregation over
+the Like table.
+"""
+
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from .models import Comment, Like, Post
+
+TRENDING_ORDERING = ("-trending_score", "-id")
+
+
+def like_weight():
+    return getattr(settings, "TRENDING_LIKE_WEIGHT", 1.0)
+
+
+def comment_weight():
+    return getattr(settings, "TRENDING_COMMENT_WEIGHT", 3.0)
+
+
+def half_life():
+    return getattr(settings, "TRENDING_HALF_LIFE", 6 * 60 * 60)
+
+
+def decay_interval():
+    return getattr(settings, "TRENDING_DECAY_INTERVAL", 60 * 60)
+
+
+def min_score():
+    """Scores decayed below this become 0 (and leave the trending list)."""
+    return getattr(settings, "TRENDING_MIN_SCORE", 0.01)
+
+
+def trending_queryset():
+    return Post.objects.filter(trending_score__gt=0).select_related("author")
+
+
+def decay_factor(seconds):
+    return 0.5 ** (seconds / half_life())
+
+
+def decay_scores(seconds=None):
+    """Decay every score by `seconds` worth of half-life. Returns rows changed."""
+    factor = decay_factor(decay_interval() if seconds is None else seconds)
+    return Post.objects.filter(trending_score__gt=0).update(
+        trending_score=Case(
+            When(trending_score__lt=min_score() / factor, then=Value(0.0)),
+            default=F("trending_score") * factor,
+            output_field=FloatField(),
+        )
+    )
+
+
+def _scores(batch_size=5000, **filters):
+    """{post_id: score} from the Like and Comment rows matching `filters`."""
+    now = timezone.now()
+    scores = defaultdict(float)
+    for model, weight in ((Like, like_weight()), (Comment, comment_weight())):
+        rows = (
+            model.objects.filter(**filters)
+            .values_list("post_id", "created_at")
+            .iterator(chunk_size=batch_size)
+        )
+        for post_id, created_at in rows:
+            scores[post_id] += weight * decay_factor((now - created_at).total_seconds())
+    return {post_id: score for post_id, score in scores.items() if score >= min_score()}
+
+
+def rescore_post(post_id):
+    """Recompute one post's score from its Like and Comment rows."""
+    score = _scores(post_id=post_id).get(post_id, 0.0)
+    Post.objects.filter(pk=post_id).update(trending_score=score)
+
+
+def rebuild_scores(batch_size=5000):
+    """Recompute every score from the Like and Comment rows. Returns posts scored."""
+    scores = _scores(batch_size)
+    with transaction.atomic():
+        Post.objects.filter(trending_score__gt=0).update(trending_score=0)
+        items = iter(scores.items())
+        while batch := list(islice(items, batch_size)):
+            posts = [Post(id=post_id, trending_score=score) for post_id, score in batch]
+            Post.objects.bulk_update(posts, ["trending_score"])
+    return len(scores)
@@ -1,132 +1,293 @@
-from rest_framework import viewsets, permissions, filters, generics
-from rest_framework.pagination import PageNumberPagination
+from rest_framework import viewsets, permissions, generics
+from rest_framework.decorators import action
+from django.db import transaction
 from django.db.models import Q
 from rest_framework.generics import ListAPIView
 from .models import Post, Comment
 from .serializers import PostSerializer, CommentSerializer
 from .permissions import IsOwnerOrReadOnly
-from notifications.utils import create_notification
-from notifications.models import Notification
+from notifications.utils import notify
+from .timeline import get_feed
+from .tasks import fan_out_new_post
+from .counters import increment_comments
+from .likes import remove_like, toggle_like
+from .search import PostSearchFilter, cursor_ordering
+from .trending import TRENDING_ORDERING, trending_queryset
+from .conditional import not_modified, page_validators, post_validators, set_validators
+from social_media_api.pagination import KeysetPagination
+from social_media_api.sparse_fields import sparse_queryset
+from social_media_api.exports import EXPORT_RENDERERS, export_response
+from tasks.queue import enqueue
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Post, Like
 
-class DefaultPagination(PageNumberPagination):
+class DefaultPagination(KeysetPagination):
     """
-    Simple page number pagination:
-    - ?page=1, ?page=2
-    - default page size: 10 items
+    Cursor pagination, newest first:
+    - ?cursor=<value from "next"/"previous">
+    - default page size: 10 items (?page_size= up to 100)
+    - keyed on (created_at, id), so deep pages cost the same as page 1
     """
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+    ordering = ("-created_at", "-id")
+
+
+class FeedPagination(DefaultPagination):
+    """
+    DefaultPagination for the home feed: the page is picked on the timeline
+    index and only its posts are read (posts/timeline.py). Set `feed`
+    (get_feed/aget_feed) before paginating.
+    """
+
+    feed = None
+
+    def get_page_queryset(self, queryset, request, view=None):
+        self.read_cursor(queryset, request, view)
+        return self.feed.page(queryset, self.position, self.reverse, self.page_size + 1)
+
 
 class PostViewSet(viewsets.ModelViewSet):
     """
     ViewSet for CRUD operations on posts.
 
     Endpoints (through router):
-      - GET    /posts/           -> list posts (with pagination + search)
+      - GET    /posts/           -> list posts (cursor pagination + search)
       - POST   /posts/           -> create new post (auth required)
       - GET    /posts/{id}/      -> retrieve one post
       - PUT    /posts/{id}/      -> update post (only author)
       - PATCH  /posts/{id}/      -> partial update (only author)
       - DELETE /posts/{id}/      -> delete post (only author)
+      - GET    /posts/trending/  -> most liked/commented lately (cursor pagination)
+      - GET    /posts/export/    -> every post, streamed (admin only)
+
+    list and retrieve send ETag/Last-Modified and answer 304 Not Modified
+    to a matching If-None-Match/If-Modified-Since (see posts/conditional.py).
+
+    Reads take ?fields=, ?exclude= and ?compact=1
+    (see social_media_api/sparse_fields.py).
     """
 
-    queryset = Post.objects.all().order_by("-created_at")
+    # select_related: PostSerializer reads author.username for every row
+    queryset = Post.objects.select_related("author").order_by("-created_at")
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     pagination_class = DefaultPagination
+    query_budget = 4
+    read_from_replica = True
+
+    # ?search= full-text search on title/content, ranked (posts/search.py)
+    filter_backends = [PostSearchFilter]
+
+    def get_queryset(self):
+        return sparse_queryset(
+            super().get_queryset(), self.get_serializer_class(), self.request,
+            keep=DefaultPagination.ordering,
+        )
+
+    def get_cursor_ordering(self, queryset):
+        """Newest first, or best match first when searching."""
+        if self.action == "trending":
+            return TRENDING_ORDERING
+        return cursor_ordering(queryset, DefaultPagination.ordering)
 
-    # DRF filtering: allow searching by title or content
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["title", "content"]
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = page_validators(self.paginator, queryset, request, self)
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+        response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = post_validators(kwargs["pk"], scope=request.get_full_path())
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    @action(detail=False)
+    def trending(self, request):
+        """
+        Posts ranked by time-decayed likes and comments (posts/trending.py).
+        Scores move between requests, so a post can show up on two pages.
+        """
+        posts = sparse_queryset(
+            trending_queryset(), self.get_serializer_class(), request, keep=TRENDING_ORDERING
+        )
+        page = self.paginate_queryset(posts)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=[permissions.IsAdminUser],
+        renderer_classes=EXPORT_RENDERERS,
+    )
+    def export(self, request):
+        """All posts as a streamed JSON array or NDJSON (social_media_api/exports.py)."""
+        return export_response(
+            request, Post.objects.select_related("author"), PostSerializer, "posts"
+        )
 
     def perform_create(self, serializer):
         """
-        When a post is created, set the author to the current user.
+        When a post is created, set the author to the current user and
+        queue pushing it into the followers' timelines (posts/tasks.py),
+        which runs once the post is committed.
         """
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            post = serializer.save(author=self.request.user)
+            enqueue(fan_out_new_post, {"post_id": post.pk}, key=f"fan-out:{post.pk}")
 
 class CommentViewSet(viewsets.ModelViewSet):
     """
     ViewSet for CRUD operations on comments.
 
     Endpoints (through router):
-      - GET    /comments/           -> list comments (paginated)
+      - GET    /comments/           -> list comments (cursor pagination)
       - POST   /comments/           -> create comment
       - GET    /comments/{id}/      -> retrieve one comment
       - PUT    /comments/{id}/      -> update comment (only author)
       - PATCH  /comments/{id}/      -> partial update (only author)
       - DELETE /comments/{id}/      -> delete comment (only author)
+      - GET    /comments/export/    -> every comment, streamed (admin only)
+
+    Reads take ?fields=, ?exclude= and ?compact=1, as on posts.
     """
 
-    queryset = Comment.objects.all().order_by("-created_at")
+    queryset = Comment.objects.select_related("author").order_by("-created_at")
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     pagination_class = DefaultPagination
+    query_budget = 4
+
+    def get_queryset(self):
+        return sparse_queryset(
+            super().get_queryset(), self.get_serializer_class(), self.request,
+            keep=DefaultPagination.ordering,
+        )
+
+    @action(
+        detail=False,
+        permission_classes=[permissions.IsAdminUser],
+        renderer_classes=EXPORT_RENDERERS,
+    )
+    def export(self, request):
+        """All comments as a streamed JSON array or NDJSON."""
+        return export_response(
+            request, Comment.objects.select_related("author"), CommentSerializer, "comments"
+        )
+
+    @property
+    def throttle_scope(self):
+        """Only new comments are rate limited (throttling/throttles.py)."""
+        return "comment" if self.action == "create" else None
 
     def perform_create(self, serializer):
         """
         When a comment is created, set the author to the current user.
         """
-        comment = serializer.save(author=self.request.user)
-        post = comment.post
-
-        # Notify post author (if not same user)
-        if post.author != self.request.user:
-            create_notification(
-                recipient=post.author,
-                actor=self.request.user,
-                verb="commented on your post",
-                target=post,
-            )
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user)
+            post = comment.post
+            increment_comments(post.pk)
+
+            # Notify post author (if not same user); delivered by a background task
+            if post.author_id != self.request.user.pk:
+                notify(post.author_id, self.request.user.pk, "commented on your post", target=post)
+
+    def perform_destroy(self, instance):
+        # the delete and the counter commit together, as on create
+        with transaction.atomic():
+            post_id = instance.post_id
+            instance.delete()
+            increment_comments(post_id, -1)
+
 class FeedView(generics.GenericAPIView):
     """
     GET /feed/
-    Returns posts from users the current user follows.
+    Returns posts from users the current user follows, newest first,
+    one cursor page at a time. Supports ETag/Last-Modified (304).
+
+    Pages through the materialized timeline (see posts/timeline.py) and
+    reads only the posts of the page, instead of joining the follow table
+    with the whole post table.
+    Takes ?fields=, ?exclude= and ?compact=1, as on posts.
     """
 
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedPagination
+    query_budget = 5
+    read_from_replica = True
+    throttle_scope = "feed"
 
     def get(self, request):
-        following_users = request.user.following.all()
-        posts = Post.objects.filter(author__in=following_users).order_by("-created_at")
-        serializer = self.get_serializer(posts, many=True)
-        return Response(serializer.data)
+        self.paginator.feed = get_feed(request.user)
+        posts = sparse_queryset(
+            Post.objects.select_related("author"),
+            PostSerializer, request, keep=FeedPagination.ordering,
+        )
+
+        etag, last_modified = page_validators(
+            self.paginator, posts, request, self, scope=request.user.pk
+        )
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
+        page = self.paginate_queryset(posts)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        return set_validators(response, etag, last_modified)
     
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from .models import Post, Like
-from notifications.models import Notification
+
+
+def post_counters(pk):
+    """Current like/comment counters of a post, read after a like toggle."""
+    return Post.objects.filter(pk=pk).values("like_count", "comment_count").first()
 
 
 class LikePostView(generics.GenericAPIView):
+    """
+    POST /posts/<pk>/like/
+    - Toggles the current user's like on the post (see posts/likes.py).
+    - 201 when the post is now liked, 200 when the like was removed.
+    - The response carries the new state and the post counters.
+    """
+
     permission_classes = [IsAuthenticated]
+    queryset = Post.objects.only("id", "author_id")
+    # per user (throttling/throttles.py); like and unlike share the limit
+    throttle_scope = "like"
 
     def post(self, request, pk):
-        
-        post = generics.get_object_or_404(Post, pk=pk)
-     
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-
-        if created:
-            # create a notification for the post author
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb="liked your post",        
-                target=post,
-            )
-            return Response({"detail": "Post liked"}, status=status.HTTP_201_CREATED)
-       
-        like.delete()
-        return Response({"detail": "Like removed"}, status=status.HTTP_204_NO_CONTENT)
+        post = generics.get_object_or_404(self.get_queryset(), pk=pk)
+
+        with transaction.atomic():
+            liked, created = toggle_like(request.user, post.pk)
+
+            if created:
+                # queue a notification for the post author (delivered off the request path)
+                notify(post.author_id, request.user.pk, "liked your post", target=post)
+
+        data = {"detail": "Post liked" if liked else "Like removed", "liked": liked}
+        data.update(post_counters(post.pk))
+        return Response(
+            data,
+            status=status.HTTP_201_CREATED if liked else status.HTTP_200_OK,
+        )
 
 
 class PostUnlikeView(generics.GenericAPIView):
@@ -137,19 +298,17 @@ class PostUnlikeView(generics.GenericAPIView):
 
     permission_classes = [permissions.IsAuthenticated]
     queryset = Post.objects.all()
+    throttle_scope = "like"
 
     def post(self, request, pk):
-        post = generics.get_object_or_404(self.get_queryset(), pk=pk)
-
-        like_qs = Like.objects.filter(user=request.user, post=post)
-        if not like_qs.exists():
+        # Delete first; only look the post up when there was nothing to delete.
+        if not remove_like(request.user, pk):
+            generics.get_object_or_404(self.get_queryset(), pk=pk)
             return Response(
                 {"detail": "You have not liked this post."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        like_qs.delete()
-        return Response(
-            {"detail": "Like removed."},
-            status=status.HTTP_200_OK,
-        )
+        data = {"detail": "Like removed.", "liked": False}
+        data.update(post_counters(pk))
+        return Response(data, status=status.HTTP_200_OK)
@@ -2,6 +2,9 @@
 ASGI config for social_media_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with uvicorn (see the Procfile); it uses settings_asgi.py, which
+routes the read-heavy endpoints to async views. Static files are served
+by WhiteNoiseASGI (asgi_static.py) in front of Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +14,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
+from social_media_api.asgi_static import WhiteNoiseASGI
 
-application = get_asgi_application()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings_asgi')
+
+application = WhiteNoiseASGI(get_asgi_application())
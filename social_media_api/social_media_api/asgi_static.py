@@ -0,0 +1,80 @@
+"""
+Static files for the ASGI deployment (asgi.py).
+
+WhiteNoise's middleware is sync-only, so settings_asgi.py leaves it out,
+and Django's ASGIStaticFilesHandler is meant for development only.
+WhiteNoiseASGI wraps the ASGI application instead. It answers requests
+for files under STATIC_URL from WhiteNoise's index of STATIC_ROOT, built
+from the same WHITENOISE_* settings as under WSGI. Compressed variants,
+cache headers, 304s and ranges all work as they do there. Other requests
+go to Django.
+
+Files are opened and read in a worker thread, CHUNK_SIZE at a time, so
+the event loop never waits on the disk.
+"""
+
+from asgiref.sync import sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+CHUNK_SIZE = 64 * 2**10
+
+
+def request_headers(scope):
+    """WSGI-style header keys (HTTP_ACCEPT_ENCODING, ...), as WhiteNoise reads them."""
+    return {
+        "HTTP_" + name.decode("latin1").upper().replace("-", "_"): value.decode("latin1")
+        for name, value in scope["headers"]
+    }
+
+
+class WhiteNoiseASGI:
+    """ASGI application serving static files, passing other requests to `application`."""
+
+    def __init__(self, application):
+        self.application = application
+        # indexes STATIC_ROOT (or the finders) from the Django settings
+        self.whitenoise = WhiteNoiseMiddleware()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            static_file = await self.find_file(scope)
+            if static_file is not None:
+                await self.serve(static_file, scope, send)
+                return
+        await self.application(scope, receive, send)
+
+    async def find_file(self, scope):
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        if self.whitenoise.autorefresh:
+            # looks at the disk on every request (DEBUG)
+            return await sync_to_async(self.whitenoise.find_file, thread_sensitive=False)(path)
+        return self.whitenoise.files.get(path)
+
+    async def serve(self, static_file, scope, send):
+        response = await sync_to_async(static_file.get_response, thread_sensitive=False)(
+            scope["method"], request_headers(scope)
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": int(response.status),
+                "headers": [
+                    (name.lower().encode("latin1"), value.encode("latin1"))
+                    for name, value in response.headers
+                ],
+            }
+        )
+        file = response.file
+        if file is None:  # HEAD, 304, 405
+            await send({"type": "http.response.body"})
+            return
+        read = sync_to_async(file.read, thread_sensitive=False)
+        try:
+            while chunk := await read(CHUNK_SIZE):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            file.close()
+        await send({"type": "http.response.body"})
@@ -0,0 +1,105 @@
+"""
+Plain Django async views for the ASGI deployment (social_media_api/asgi.py).
+
+DRF's APIView is sync only, so under ASGI each DRF request holds a worker
+thread for its whole duration. The read-heavy endpoints (feed,
+notification list, post detail) have async versions built on
+AsyncAPIView, which reuses the DRF pieces that do no I/O of their own:
+serializers, KeysetPagination and CachedTokenAuthentication (through its
+async cache/ORM methods).
+
+urls_asgi.py mounts them on the same paths as the DRF views. Methods an
+async view does not implement (e.g. PUT on a post) are handed to its
+`fallback_view`, the DRF view, in a thread.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated, Throttled
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from accounts.authentication import CachedTokenAuthentication
+from .renderers import FastJSONRenderer
+
+
+class AsyncAPIView(View):
+    """
+    Base class: authenticates (token, then session), applies the DRF
+    throttles to views with a `throttle_scope`, turns DRF exceptions into
+    JSON error responses and passes unknown methods to `fallback_view`.
+    """
+
+    # DRF view serving the methods this view has no handler for
+    fallback_view = None
+    # allow requests without credentials (like IsAuthenticatedOrReadOnly on GET)
+    allow_anonymous = False
+    # picked up by QueryBudgetMiddleware, as on the DRF views
+    query_budget = None
+    # rate limit scope, as on the DRF views (throttling/throttles.py)
+    throttle_scope = None
+
+    authentication = CachedTokenAuthentication()
+    # same bytes as the DRF views send
+    renderer = FastJSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Like DRF views: token requests carry no CSRF cookie; the session
+        # case is only ever a safe method here.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = getattr(self, method, None) if method in self.http_method_names else None
+        if handler is None or method == "options":
+            if self.fallback_view is not None:
+                return await sync_to_async(self.fallback_view)(request, *args, **kwargs)
+            return self.error(405, f'Method "{request.method}" not allowed.')
+
+        try:
+            await self.authenticate(request)
+            await self.check_throttles(request)
+            return await handler(request, *args, **kwargs)
+        except APIException as exc:
+            response = self.error(exc.status_code, exc.detail)
+            if exc.status_code == 401:
+                response["WWW-Authenticate"] = self.authentication.authenticate_header(request)
+            if getattr(exc, "wait", None):
+                response["Retry-After"] = str(int(exc.wait))
+            return response
+
+    async def authenticate(self, request):
+        result = await self.authentication.aauthenticate(request)
+        if result is not None:
+            request.user, request.auth = result
+            return
+        request.user, request.auth = await request.auser(), None
+        if not request.user.is_authenticated and not self.allow_anonymous:
+            raise NotAuthenticated()
+
+    async def check_throttles(self, request):
+        if not self.throttle_scope:
+            return
+        for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+            throttle = throttle_class()
+            # the store may be the database
+            if not await sync_to_async(throttle.allow_request)(request, self):
+                raise Throttled(wait=throttle.wait())
+
+    def drf_request(self, request):
+        """A DRF Request around `request`, for KeysetPagination and serializers."""
+        return Request(request)
+
+    def json(self, data, status=200):
+        return HttpResponse(
+            self.renderer.render(data), status=status, content_type="application/json"
+        )
+
+    def error(self, status, detail):
+        """Body as DRF's exception_handler renders it: field errors stay a dict."""
+        if isinstance(detail, (list, dict)):
+            return self.json(detail, status=status)
+        return self.json({"detail": detail}, status=status)
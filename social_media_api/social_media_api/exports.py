@@ -0,0 +1,131 @@
+"""
+Streaming exports of whole tables (admin only):
+
+    GET /api/posts/export/
+    GET /api/comments/export/
+    GET /notifications/export/
+
+The body is one JSON array, or NDJSON (one object per line) with
+`Accept: application/x-ndjson` or ?format=ndjson. Items are rendered by
+the list endpoint's serializer, so ?fields=, ?exclude= and ?compact=1
+work here too (social_media_api/sparse_fields.py). Rows come in id
+order. ?after_id= resumes an interrupted export.
+
+Rows are read with QuerySet.iterator(chunk_size=EXPORT_CHUNK_SIZE) (or
+aiterator() under ASGI). Each chunk is serialized and rendered, then
+sent, so memory stays flat however many rows there are.
+"""
+
+from itertools import islice
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+
+from .renderers import FastJSONRenderer
+from .sparse_fields import sparse_queryset
+
+
+def chunk_size():
+    return getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    application/x-ndjson. Used for the export body (see `stream_export`),
+    and for error responses to clients that asked for NDJSON.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return FastJSONRenderer().render(data) + b"\n"
+
+
+# renderer_classes of the export views: negotiation picks the body format
+EXPORT_RENDERERS = [FastJSONRenderer, NDJSONRenderer]
+
+
+class ChunkEncoder:
+    """Serializes and renders one chunk of rows into a piece of the body."""
+
+    def __init__(self, serializer_class, context, ndjson):
+        self.serializer_class = serializer_class
+        self.context = context
+        self.ndjson = ndjson
+        self.renderer = FastJSONRenderer()
+        self.first = True
+
+    def start(self):
+        return b"" if self.ndjson else b"["
+
+    def encode(self, rows):
+        data = self.serializer_class(rows, many=True, context=self.context).data
+        if self.ndjson:
+            return b"".join(self.renderer.render(item) + b"\n" for item in data)
+        # "[a,b]" -> "a,b", comma-joined with the previous chunks
+        body = self.renderer.render(data)[1:-1]
+        if not self.first:
+            body = b"," + body
+        self.first = False
+        return body
+
+    def end(self):
+        return b"" if self.ndjson else b"]"
+
+
+def stream_export(queryset, encoder, size=None):
+    """Body iterator: the rows of `queryset`, `size` at a time."""
+    size = size or chunk_size()
+    rows = queryset.iterator(chunk_size=size)
+    yield encoder.start()
+    while chunk := list(islice(rows, size)):
+        yield encoder.encode(chunk)
+    yield encoder.end()
+
+
+async def astream_export(queryset, encoder, size=None):
+    """stream_export for ASGI (Django buffers sync iterators there)."""
+    size = size or chunk_size()
+    yield encoder.start()
+    chunk = []
+    async for row in queryset.aiterator(chunk_size=size):
+        chunk.append(row)
+        if len(chunk) == size:
+            yield encoder.encode(chunk)
+            chunk = []
+    if chunk:
+        yield encoder.encode(chunk)
+    yield encoder.end()
+
+
+def export_response(request, queryset, serializer_class, filename):
+    """
+    StreamingHttpResponse of `queryset` rendered with `serializer_class`,
+    in the format DRF negotiated (JSON array or NDJSON).
+    """
+    after_id = request.query_params.get("after_id")
+    if after_id is not None:
+        try:
+            queryset = queryset.filter(id__gt=int(after_id))
+        except ValueError:
+            raise ValidationError({"after_id": "A valid integer is required."})
+    queryset = sparse_queryset(queryset.order_by("id"), serializer_class, request, keep=("id",))
+
+    renderer = request.accepted_renderer
+    ndjson = renderer.format == NDJSONRenderer.format
+    encoder = ChunkEncoder(serializer_class, {"request": request}, ndjson)
+    if isinstance(request._request, ASGIRequest):
+        body = astream_export(queryset, encoder)
+    else:
+        body = stream_export(queryset, encoder)
+
+    response = StreamingHttpResponse(body, content_type=renderer.media_type)
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{"ndjson" if ndjson else "json"}"'
+    )
+    return response
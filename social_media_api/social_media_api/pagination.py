@@ -0,0 +1,223 @@
+"""
+Keyset (cursor) pagination shared by the posts and notifications apps.
+
+Instead of `OFFSET n` (which makes the database walk and discard n rows)
+each page is fetched with a `WHERE (ordering columns) < (last row seen)`
+condition, so page 1000 costs the same as page 1 and no COUNT(*) is issued.
+
+The cursor is an opaque base64 string holding the ordering values of the
+row at the edge of the current page.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _field_name(ordering_item):
+    return ordering_item.lstrip("-")
+
+
+def encode_cursor(position, reverse=False):
+    """Turn a list of ordering values into an opaque cursor string."""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+    payload = json.dumps({"p": values, "r": int(reverse)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor, model, ordering):
+    """
+    Inverse of `encode_cursor`. Values are converted back with each model
+    field's `to_python`. Returns (position, reverse) or raises ValueError.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii"))
+        values = payload["p"]
+        reverse = bool(payload.get("r", 0))
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError("Invalid cursor")
+
+    position = []
+    for item, value in zip(ordering, values):
+        try:
+            field = model._meta.get_field(_field_name(item))
+        except FieldDoesNotExist:
+            # Annotations (e.g. a search rank) are stored as plain JSON values.
+            position.append(value)
+            continue
+        try:
+            position.append(field.to_python(value))
+        except ValidationError:
+            raise ValueError("Invalid cursor")
+    return position, reverse
+
+
+def keyset_filter(ordering, position, reverse=False):
+    """
+    Q object selecting the rows that come after `position` in `ordering`
+    (or before it when `reverse` is true).
+
+    For ordering ("-created_at", "-id") this builds:
+      created_at < v1 OR (created_at = v1 AND id < v2)
+    """
+    condition = Q()
+    equal_so_far = Q()
+    for item, value in zip(ordering, position):
+        name = _field_name(item)
+        descending = item.startswith("-")
+        lookup = "lt" if descending != reverse else "gt"
+        condition |= equal_so_far & Q(**{f"{name}__{lookup}": value})
+        equal_so_far &= Q(**{name: value})
+    return condition
+
+
+def reverse_ordering(ordering):
+    return [item[1:] if item.startswith("-") else f"-{item}" for item in ordering]
+
+
+def row_position(row, ordering):
+    """Ordering values of a model instance (or a values() dict)."""
+    if isinstance(row, dict):
+        return [row[_field_name(item)] for item in ordering]
+    return [getattr(row, _field_name(item)) for item in ordering]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a unique ordering (default: newest first).
+
+    - ?cursor=<opaque>  -> page after/before a given row
+    - ?page_size=20     -> items per page (max 100)
+
+    Views can override the ordering with a `cursor_ordering` attribute or
+    a `get_cursor_ordering(queryset)` method; the last item must be unique
+    (usually "id" or "-id").
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, "get_cursor_ordering"):
+            return list(view.get_cursor_ordering(queryset))
+        return list(getattr(view, "cursor_ordering", self.ordering))
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def read_cursor(self, queryset, request, view=None):
+        """Set page_size, ordering, position and reverse from the request."""
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.position, self.reverse = None, False
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                self.position, self.reverse = decode_cursor(cursor, queryset.model, self.ordering)
+            except ValueError:
+                raise NotFound("Invalid cursor")
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Ordered, filtered and sliced queryset for the requested page. It has
+        one extra row so we can tell whether another page exists.
+        """
+        self.read_cursor(queryset, request, view)
+
+        if self.reverse:
+            queryset = queryset.order_by(*reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.position is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, self.position, self.reverse))
+
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        rows = list(self.get_page_queryset(queryset, request, view))
+        return self.set_page(rows)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views (Django's async ORM iteration)."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        rows = [row async for row in self.get_page_queryset(queryset, request, view)]
+        return self.set_page(rows)
+
+    def set_page(self, rows):
+        """Trim the extra row and work out the next/previous links."""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = encode_cursor(row_position(self.page[-1], self.ordering))
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        cursor = encode_cursor(row_position(self.page[0], self.ordering), reverse=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_data(self, data):
+        return OrderedDict(
+            [
+                ("next", self.get_next_link()),
+                ("previous", self.get_previous_link()),
+                ("results", data),
+            ]
+        )
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,142 @@
+"""
+Query budget: an upper bound on the number of SQL queries a view may run.
+
+List views declare `query_budget = <n>` as a class attribute. The
+`QueryBudgetMiddleware` counts every query run while handling a GET/HEAD
+request to such a view and, when the budget is exceeded:
+  - raises QueryBudgetExceeded if settings.QUERY_BUDGET_STRICT is True
+    (use this in tests/CI so an N+1 regression fails loudly)
+  - otherwise logs a warning.
+
+`assert_max_queries(n)` is the same check as a context manager, for use
+in tests and scripts.
+"""
+
+import logging
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Counts queries on every configured database while active."""
+
+    def __init__(self):
+        self.count = 0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def capture(self):
+        """Counts the queries run by this thread inside the block."""
+        wrappers = self.start()
+        try:
+            yield self
+        finally:
+            self.stop(wrappers)
+
+    def start(self):
+        # connections are per thread: this counts the calling thread only
+        wrappers = [connection.execute_wrapper(self) for connection in connections.all()]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        return wrappers
+
+    def stop(self, wrappers):
+        for wrapper in reversed(wrappers):
+            wrapper.__exit__(None, None, None)
+
+
+@contextmanager
+def assert_max_queries(budget, label="block"):
+    """
+    with assert_max_queries(3):
+        client.get("/api/posts/")
+    """
+    counter = QueryCounter()
+    with counter.capture():
+        yield counter
+    if counter.count > budget:
+        raise QueryBudgetExceeded(_message(label, counter, budget))
+
+
+def _message(label, counter, budget):
+    queries = "\n".join(f"  {i}. {sql}" for i, sql in enumerate(counter.queries, 1))
+    return f"{label} ran {counter.count} queries (budget {budget}):\n{queries}"
+
+
+def get_view_budget(view_func):
+    """The `query_budget` declared on a (class-based) view, if any."""
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    return getattr(view_class, "query_budget", None)
+
+
+class QueryBudgetMiddleware:
+    """
+    Enforces `query_budget` on safe-method requests (see module docstring).
+
+    Works in both WSGI and ASGI stacks: under ASGI it stays async, so it
+    does not force async views into a thread. Async views cannot query
+    from the event loop; their ORM calls (and sync views, adapted by
+    Django) run in the request's sync_to_async thread, so that is the
+    thread whose connections are counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method not in SAFE_METHODS:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        with counter.capture():
+            response = self.get_response(request)
+        self.check(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        if request.method not in SAFE_METHODS:
+            return await self.get_response(request)
+
+        counter = QueryCounter()
+        # thread_sensitive: the same thread the view's queries will run in
+        wrappers = await sync_to_async(counter.start)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(counter.stop)(wrappers)
+        self.check(request, counter)
+        return response
+
+    def check(self, request, counter):
+        budget = getattr(request, "query_budget", None)
+        if budget is not None and counter.count > budget:
+            message = _message(request.path, counter, budget)
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_view_budget(view_func)
@@ -0,0 +1,161 @@
+"""
+Read replica routing.
+
+When DATABASE_REPLICA_URL is set, settings.py adds a "replica" database
+and ReplicaRouter sends some reads to it:
+
+- only GET/HEAD requests to views declaring `read_from_replica = True`
+  (posts, feed, notification list), which ReplicaMiddleware marks with a
+  context variable for the duration of the request;
+- only models of DATABASE_REPLICA_APPS; users and tokens (authentication)
+  always come from the primary;
+- not for a client that wrote something in the last REPLICA_PIN_SECONDS:
+  after any other request it is pinned to the primary, so it reads its
+  own writes while the replica catches up. The pin is a signed cookie
+  on the write's response (any worker can check it, and its signature
+  carries the expiry), and, for clients that drop cookies, a key in the
+  default cache named after their Authorization header, else session,
+  else IP. That second pin is only seen by every worker when the cache
+  is shared (Redis, Memcached) rather than per-process local memory.
+
+Everything else, and every write, uses "default".
+"""
+
+import hashlib
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+REPLICA = "replica"
+PRIMARY = "default"
+
+SAFE_METHODS = ("GET", "HEAD")
+
+PIN_COOKIE = "replica_pin"
+
+# True while handling a request whose reads may use the replica
+_read_from_replica = ContextVar("read_from_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def replica_apps():
+    return getattr(settings, "DATABASE_REPLICA_APPS", ("posts", "notifications"))
+
+
+def pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            _read_from_replica.get()
+            and model._meta.app_label in replica_apps()
+            and replica_configured()
+        ):
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # also for objects read from the replica
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica gets its schema from the primary
+        return db != REPLICA
+
+
+def client_key(request):
+    """Cache key of the primary pin for the client making `request`."""
+    identity = (
+        request.META.get("HTTP_AUTHORIZATION")
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get("REMOTE_ADDR", "")
+    )
+    return "replica_pin:" + hashlib.sha256(identity.encode()).hexdigest()[:32]
+
+
+def pin_to_primary(request, response):
+    response.set_signed_cookie(
+        PIN_COOKIE,
+        "1",
+        salt=PIN_COOKIE,
+        max_age=pin_seconds(),
+        secure=request.is_secure(),
+        httponly=True,
+        samesite="Lax",
+    )
+    cache.set(client_key(request), True, pin_seconds())
+
+
+def is_pinned(request):
+    try:
+        # max_age: a replayed or stale cookie does not pin
+        request.get_signed_cookie(PIN_COOKIE, salt=PIN_COOKIE, max_age=pin_seconds())
+        return True
+    except (KeyError, signing.BadSignature):
+        return cache.get(client_key(request)) is not None
+
+
+def wants_replica(view_func):
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    return getattr(view_class, "read_from_replica", False)
+
+
+class ReplicaMiddleware:
+    """
+    Turns replica reads on for safe requests to `read_from_replica` views
+    and pins clients to the primary after they write (see module docstring).
+
+    Works in both WSGI and ASGI stacks.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _read_from_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        self.after(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _read_from_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        self.after(request, response)
+        return response
+
+    def after(self, request, response):
+        if request.method not in SAFE_METHODS and replica_configured():
+            pin_to_primary(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in SAFE_METHODS
+            and replica_configured()
+            and wants_replica(view_func)
+            and not is_pinned(request)
+        ):
+            _read_from_replica.set(True)
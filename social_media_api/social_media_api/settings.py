@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 import dj_database_url
 
@@ -50,20 +51,151 @@ INSTALLED_APPS = [
     'accounts',
     'posts',
     'notifications',
+    'throttling',
+    'tasks',
 ]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "accounts.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication", 
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # orjson when installed, DRF's json otherwise (social_media_api/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "social_media_api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "social_media_api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # only views with a `throttle_scope` are limited (throttling/throttles.py)
+    "DEFAULT_THROTTLE_CLASSES": [
+        "throttling.throttles.ScopedSlidingWindowThrottle",
+    ],
+    "DEFAULT_THROTTLE_RATES": {
+        "like": "120/min",
+        "comment": "30/min",
+        "follow": "60/min",
+        "login": "10/min",
+        "feed": "120/min",
+    },
 }
 
 AUTH_USER_MODEL = "accounts.User"
 
+# ---- Sparse fieldsets (social_media_api/sparse_fields.py) ----
+# Characters of a long text field kept in ?compact=1 mode.
+COMPACT_TEXT_LENGTH = 140
+
+# ---- Exports (social_media_api/exports.py) ----
+# Rows fetched, serialized and sent per step of a streamed export.
+EXPORT_CHUNK_SIZE = 2000
+
+# ---- Trending posts (posts/trending.py) ----
+TRENDING_LIKE_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 3.0
+# Seconds for an event's weight to halve.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+# How often `decay_trending_scores` is scheduled to run (cron), in seconds.
+TRENDING_DECAY_INTERVAL = 60 * 60
+
+# ---- Home timeline (posts/timeline.py) ----
+# Authors with more followers than this are not fanned out on write;
+# their posts are merged into the feed at read time instead.
+TIMELINE_FANOUT_MAX_FOLLOWERS = 10000
+# Recent posts copied into a timeline when a user follows someone.
+TIMELINE_BACKFILL_LIMIT = 200
+# Entries kept per timeline by `trim_timelines` (run it from cron).
+TIMELINE_MAX_LENGTH = 800
+
+# ---- Notifications (notifications/tasks.py) ----
+# Save notification events to the outbox in the request's transaction and
+# deliver them in batches from a background task.
+# Set to False to write them synchronously (e.g. in tests).
+NOTIFICATIONS_ASYNC = True
+NOTIFICATIONS_BATCH_SIZE = 500
+# Events for the same (recipient, verb, target) within this many seconds
+# update the existing unread notification instead of adding a row.
+NOTIFICATIONS_AGGREGATION_WINDOW = 24 * 60 * 60
+# How many of the latest actors an aggregated notification remembers.
+NOTIFICATIONS_RECENT_ACTORS = 3
+# Seconds a cached unread count is trusted (notifications/unread.py).
+NOTIFICATIONS_UNREAD_CACHE_TIMEOUT = 300
+# Live stream (notifications/stream.py, notifications/pubsub.py).
+# The in-process broker only reaches streams of the same process.
+NOTIFICATIONS_PUBSUB_BACKEND = "notifications.pubsub.InProcessBroker"
+NOTIFICATIONS_STREAM_HEARTBEAT = 15
+# Undelivered events kept per stream before it is closed for a resume.
+NOTIFICATIONS_STREAM_QUEUE_SIZE = 100
+# Most events replayed from Last-Event-ID on reconnect.
+NOTIFICATIONS_STREAM_REPLAY_LIMIT = 100
+
+# ---- Background tasks (tasks/queue.py) ----
+# Where a committed job runs: "thread" (a pool in the web process),
+# "sync" (the committing thread, e.g. in tests) or "worker" (only
+# `run_workers`). Retries and stale jobs always need `run_workers`.
+TASKS_MODE = "thread"
+TASKS_IN_PROCESS_WORKERS = 2
+TASKS_MAX_ATTEMPTS = 3
+# Seconds before the first retry; doubled on each further attempt.
+TASKS_RETRY_DELAY = 10
+# Seconds a running job may take before it is assumed lost and requeued.
+TASKS_LEASE = 5 * 60
+
+# ---- Follow graph (accounts/follows.py) ----
+# Seconds a cached "ids this user follows" set is trusted.
+FOLLOW_GRAPH_CACHE_TIMEOUT = 600
+
+# ---- Profile picture renditions (accounts/avatars.py) ----
+# Square copies rendered after each upload: name -> edge in pixels, each
+# saved in every format listed.
+AVATAR_SIZES = {"small": 64, "medium": 256}
+AVATAR_FORMATS = ("webp", "jpeg")
+AVATAR_QUALITY = 80
+# Largest profile picture upload accepted (accounts/uploads.py), in bytes
+# and in pixels (width * height, checked from the image header).
+AVATAR_UPLOAD_MAX_BYTES = 10 * 2**20
+AVATAR_UPLOAD_MAX_PIXELS = 40_000_000
+
+# ---- Token auth cache (accounts/authentication.py) ----
+# Cache holding token -> user lookups, and how long (seconds) an entry
+# is trusted. Logout and password changes invalidate entries earlier.
+AUTH_TOKEN_CACHE_ALIAS = "auth_tokens"
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+
+# ---- Throttling (throttling/stores.py) ----
+# CacheStore counts per process with LocMemCache; DatabaseStore is shared
+# by every gunicorn worker.
+THROTTLE_STORE = "throttling.stores.CacheStore"
+THROTTLE_CACHE_ALIAS = "throttle"
+
+# ---- Cache ----
+# Local memory by default (per process). Point this at Redis/Memcached
+# when running several processes so counters and caches are shared.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "social-media-api",
+        # least recently used keys are evicted beyond this
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "auth_tokens": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "auth-tokens",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttle",
+        "OPTIONS": {"MAX_ENTRIES": 50000},
+    },
+}
+
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -74,8 +206,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'social_media_api.query_budget.QueryBudgetMiddleware',
+    'social_media_api.replicas.ReplicaMiddleware',
 ]
 
+# Views declare `query_budget = n`; going over it is logged, or raises
+# QueryBudgetExceeded when this is True (turn it on in tests/CI).
+QUERY_BUDGET_STRICT = False
+
 ROOT_URLCONF = 'social_media_api.urls'
 
 TEMPLATES = [
@@ -113,6 +251,26 @@ DATABASES["default"] = dj_database_url.config(
     default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
     conn_max_age=600,
 )
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # a file, not memory, so threaded tests (posts/tests.py) share the data
+    DATABASES["default"]["TEST"] = {"NAME": BASE_DIR / "test_db.sqlite3"}
+
+# ---- Read replica (social_media_api/replicas.py) ----
+# If DATABASE_REPLICA_URL is set, safe requests to the post, feed and
+# notification list views read DATABASE_REPLICA_APPS models from it.
+# Locally: DATABASE_REPLICA_URL=sqlite:///replica.sqlite3 (a copy of db.sqlite3).
+if os.environ.get("DATABASE_REPLICA_URL"):
+    DATABASES["replica"] = dj_database_url.config(
+        env="DATABASE_REPLICA_URL",
+        conn_max_age=600,
+    )
+    # tests read the replica's data from the test primary
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["social_media_api.replicas.ReplicaRouter"]
+DATABASE_REPLICA_APPS = ("posts", "notifications")
+# Seconds a client reads from the primary after a write (read-your-writes).
+REPLICA_PIN_SECONDS = 5
 
 
 # Password validation
@@ -159,8 +317,6 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
-import os
-
 # Media files (Uploaded by users)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -0,0 +1,22 @@
+"""
+Settings for the ASGI deployment (uvicorn, see asgi.py and the Procfile).
+
+Same as settings.py, except:
+- ROOT_URLCONF serves the feed, notification list and post detail with
+  async views (urls_asgi.py);
+- WhiteNoise is left out: it is sync-only middleware, and one sync
+  middleware makes Django run every request in a thread. asgi.py serves
+  /static/ with WhiteNoiseASGI (asgi_static.py) instead;
+- persistent DB connections are off: under ASGI each request gets its
+  own connection context, so idle connections would only pile up.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, MIDDLEWARE
+
+ROOT_URLCONF = "social_media_api.urls_asgi"
+
+MIDDLEWARE = [m for m in MIDDLEWARE if not m.startswith("whitenoise.")]
+
+for database in DATABASES.values():
+    database["CONN_MAX_AGE"] = 0
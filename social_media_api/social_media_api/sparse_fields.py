@@ -0,0 +1,178 @@
+"""
+Sparse fieldsets and compact mode for the read endpoints (posts, comments,
+notifications).
+
+- ?fields=id,title          -> only these fields in each item
+- ?exclude=content          -> every field except these
+- ?compact=1                -> long text fields (Meta.compact_fields) cut
+                               to COMPACT_TEXT_LENGTH characters
+
+Two halves:
+
+- SparseFieldsetMixin (serializers) drops the fields that were not asked
+  for and swaps the compact fields for TruncatedTextField.
+- `sparse_queryset` (views) narrows the SELECT to the columns those fields
+  read, with only(). In compact mode a compact field is read as a
+  SUBSTR(...) annotation, so long texts do not leave the database.
+
+Both only apply to GET/HEAD. A write always gets the full representation
+back.
+
+Unknown field names are a 400.
+"""
+
+from django.conf import settings
+from django.db.models.functions import Substr
+from rest_framework import serializers
+
+# attribute holding the SUBSTR annotation of a compact field
+PREVIEW_PREFIX = "compact_"
+
+
+def compact_text_length():
+    return getattr(settings, "COMPACT_TEXT_LENGTH", 140)
+
+
+def _names(request, param):
+    value = request.query_params.get(param, "")
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def requested_fields(request, available):
+    """
+    The field names of `available` (in order) that the request wants, or
+    None when it did not narrow them.
+    """
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None
+    fields, exclude = _names(request, "fields"), _names(request, "exclude")
+    if not fields and not exclude:
+        return None
+
+    unknown = [name for name in fields + exclude if name not in available]
+    if unknown:
+        raise serializers.ValidationError(
+            {"fields": f"Unknown field(s): {', '.join(unknown)}"}
+        )
+    keep = set(fields or available) - set(exclude)
+    return [name for name in available if name in keep]
+
+
+def is_compact(request):
+    if request is None or request.method not in ("GET", "HEAD"):
+        return False
+    return request.query_params.get("compact", "").lower() in ("1", "true", "yes")
+
+
+def truncate(text, length):
+    if text is None or len(text) <= length:
+        return text
+    return text[:length].rstrip() + "…"
+
+
+class TruncatedTextField(serializers.ReadOnlyField):
+    """
+    A text field cut to `length` characters. Reads the SUBSTR annotation
+    added by `sparse_queryset` when there is one, else the full attribute.
+    """
+
+    def __init__(self, length, **kwargs):
+        self.length = length
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        preview = getattr(instance, PREVIEW_PREFIX + self.source, None)
+        if preview is not None:
+            return preview
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        return truncate(value, self.length)
+
+
+class SparseFieldsetMixin:
+    """
+    ModelSerializer mixin. Optional Meta attributes:
+
+    - compact_fields: text fields cut in compact mode, e.g. ("content",)
+    - field_sources: model fields (ORM paths) a serializer field reads,
+      for fields whose `source` does not say it, e.g. method fields:
+      {"summary": ("verb", "actor_count", "recent_actors", "actor__username")}
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+
+        keep = requested_fields(request, list(self.fields))
+        if keep is not None:
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+        if is_compact(request):
+            length = compact_text_length()
+            for name in getattr(self.Meta, "compact_fields", ()):
+                if name in self.fields:
+                    self.fields[name] = TruncatedTextField(length)
+
+    @classmethod
+    def model_fields_for(cls, names):
+        """
+        ORM paths read by the serializer fields `names`, or None if one of
+        them cannot be mapped (then nothing is trimmed).
+        """
+        declared = cls().get_fields()
+        sources = getattr(cls.Meta, "field_sources", {})
+        paths = []
+        for name in names:
+            if name in sources:
+                paths.extend(sources[name])
+                continue
+            source = declared[name].source or name
+            if source == "*":
+                return None
+            paths.append(source.replace(".", "__"))
+        return paths
+
+
+def sparse_queryset(queryset, serializer_class, request, keep=()):
+    """
+    `queryset` narrowed to the columns the requested fields read (plus the
+    `keep` fields, e.g. the pagination ordering), with compact fields
+    read through SUBSTR. Unchanged for a plain request.
+    """
+    model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+    names = requested_fields(request, list(serializer_class().get_fields()))
+    compact = [
+        name
+        for name in getattr(serializer_class.Meta, "compact_fields", ())
+        if is_compact(request) and (names is None or name in names)
+    ]
+
+    paths = None
+    if names is not None:
+        paths = serializer_class.model_fields_for(names)
+    if paths is None and compact:
+        # compact only: every field except the ones read through SUBSTR
+        paths = serializer_class.model_fields_for(list(serializer_class().get_fields()))
+    if paths is None:
+        return queryset
+
+    if compact:
+        length = compact_text_length()
+        paths = [path for path in paths if path not in compact]
+        queryset = queryset.annotate(
+            **{PREVIEW_PREFIX + name: Substr(name, 1, length + 1) for name in compact}
+        )
+
+    paths += [name.lstrip("-") for name in keep if name.lstrip("-") in model_fields]
+
+    # a select_related relation must be loaded or dropped
+    related = queryset.query.select_related
+    if isinstance(related, dict):
+        needed = [name for name in related if any(p.startswith(name + "__") for p in paths)]
+        queryset = queryset.select_related(None)
+        if needed:
+            queryset = queryset.select_related(*needed)
+    return queryset.only(*dict.fromkeys(paths))
@@ -25,6 +25,7 @@ urlpatterns = [
     path("api/", include("posts.urls")),
     path("api-auth/", include("rest_framework.urls")),
     path("", include("notifications.urls")),
+    path("", include("tasks.urls")),
 ]
 
 if settings.DEBUG:
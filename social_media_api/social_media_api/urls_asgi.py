@@ -0,0 +1,25 @@
+"""
+URL configuration for the ASGI deployment (settings_asgi.py).
+
+The async views take over the read-heavy paths; everything else (and the
+non-GET methods on those paths) is served by the regular urls.py. The
+notification stream exists only here.
+"""
+from django.urls import path
+
+from notifications.async_views import AsyncNotificationListView, AsyncNotificationStreamView
+from posts.async_views import AsyncFeedView, AsyncPostDetailView
+from posts.views import PostViewSet
+
+from .urls import urlpatterns as sync_urlpatterns
+
+post_detail = PostViewSet.as_view(
+    {"put": "update", "patch": "partial_update", "delete": "destroy"}
+)
+
+urlpatterns = [
+    path("api/feed/", AsyncFeedView.as_view()),
+    path("api/posts/<int:pk>/", AsyncPostDetailView.as_view(fallback_view=post_detail)),
+    path("notifications/", AsyncNotificationListView.as_view()),
+    path("notifications/stream/", AsyncNotificationStreamView.as_view(), name="notifications-stream"),
+] + sync_urlpatterns
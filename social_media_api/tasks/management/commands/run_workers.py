@@ -0,0 +1,83 @@
+import json
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks.metrics import queue_metrics
+from tasks.queue import claim_due, execute, lease, purge_finished, requeue_stale
+
+
+class Command(BaseCommand):
+    """
+    Run queued background tasks (tasks/queue.py) until stopped.
+
+    Picks up what the web processes leave: retries, jobs queued with
+    TASKS_MODE = "worker", and jobs of processes that stopped mid-run.
+    Several workers can run at once; each job is claimed by one of them.
+
+    Usage:
+      python manage.py run_workers
+      python manage.py run_workers --threads 8 --stats 60
+      python manage.py run_workers --once      # drain due jobs and exit
+    """
+
+    help = "Execute queued background tasks with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--poll", type=float, default=1.0, help="Seconds to wait when no job is due."
+        )
+        parser.add_argument(
+            "--stats", type=float, default=0, help="Print queue metrics every N seconds."
+        )
+        parser.add_argument(
+            "--keep-done",
+            type=int,
+            default=7 * 24 * 60 * 60,
+            help="Seconds finished jobs are kept before being deleted.",
+        )
+        parser.add_argument("--once", action="store_true")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        threads = options["threads"]
+        next_sweep = next_stats = 0
+
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="worker") as pool:
+            running = set()
+            try:
+                while not self.stopping:
+                    now = time.monotonic()
+                    if now >= next_sweep:
+                        requeue_stale()
+                        purge_finished(options["keep_done"])
+                        next_sweep = now + lease() / 2
+                    if options["stats"] and now >= next_stats:
+                        self.stdout.write(json.dumps(queue_metrics()))
+                        next_stats = now + options["stats"]
+
+                    claimed = claim_due(threads - len(running))
+                    running.update(pool.submit(self.run, job_id) for job_id in claimed)
+                    if running:
+                        _, running = wait(running, timeout=options["poll"], return_when=FIRST_COMPLETED)
+                    elif options["once"]:
+                        break
+                    elif not claimed:
+                        time.sleep(options["poll"])
+            except KeyboardInterrupt:
+                pass
+            self.stdout.write("Finishing running jobs...")
+
+    def run(self, job_id):
+        try:
+            execute(job_id)
+        finally:
+            connections.close_all()
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,68 @@
+"""
+Queue health for GET /tasks/metrics/ and `run_workers --stats`.
+
+- depth: queued jobs per task name, and how many of those are due
+- running / failed: jobs per task name
+- oldest_due_seconds: how long the oldest due job has been waiting
+- latency_ms: enqueue -> finished of recently finished jobs (p50/p95/max)
+- run_ms: started -> finished of the same jobs
+"""
+
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    values = sorted(values)
+    last = len(values) - 1
+    return {
+        "p50": round(values[last // 2], 1),
+        "p95": round(values[int(last * 0.95)], 1),
+        "max": round(values[last], 1),
+    }
+
+
+def queue_metrics(sample=1000):
+    """Counts of the Job table and latencies of the last `sample` finished jobs."""
+    now = timezone.now()
+    counts = (
+        Job.objects.filter(status__in=[Job.QUEUED, Job.RUNNING, Job.FAILED])
+        .values("name", "status")
+        .annotate(total=Count("id"), due=Count("id", filter=Q(run_after__lte=now)))
+        .order_by("name")
+    )
+    tasks = {}
+    for row in counts:
+        stats = tasks.setdefault(row["name"], {"queued": 0, "due": 0, "running": 0, "failed": 0})
+        stats[row["status"]] = row["total"]
+        if row["status"] == Job.QUEUED:
+            stats["due"] = row["due"]
+
+    oldest = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).aggregate(
+        oldest=Min("run_after")
+    )["oldest"]
+
+    finished = (
+        Job.objects.filter(status=Job.DONE, finished_at__isnull=False)
+        .order_by("-finished_at")
+        .values_list("created_at", "started_at", "finished_at")[:sample]
+    )
+    latency, run = [], []
+    for created_at, started_at, finished_at in finished:
+        latency.append((finished_at - created_at).total_seconds() * 1000)
+        run.append((finished_at - started_at).total_seconds() * 1000)
+
+    return {
+        "depth": sum(stats["queued"] for stats in tasks.values()),
+        "due": sum(stats["due"] for stats in tasks.values()),
+        "running": sum(stats["running"] for stats in tasks.values()),
+        "failed": sum(stats["failed"] for stats in tasks.values()),
+        "oldest_due_seconds": round((now - oldest).total_seconds(), 1) if oldest else 0,
+        "latency_ms": percentiles(latency),
+        "run_ms": percentiles(run),
+        "tasks": tasks,
+    }
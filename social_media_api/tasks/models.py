@@ -0,0 +1,51 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    One call of a registered task (see tasks/queue.py), run by a worker
+    after the transaction that queued it commits.
+
+    Lifecycle: queued -> running -> done, or back to queued with a later
+    `run_after` when it raises, until `max_attempts` is reached (failed).
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    # at most one queued job per key (e.g. "fan-out:42")
+    key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # workers: due queued jobs, oldest first
+            models.Index(fields=["status", "run_after", "id"], name="tasks_job_due"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"], condition=Q(status="queued"), name="tasks_job_queued_key"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
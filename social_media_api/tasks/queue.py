@@ -0,0 +1,244 @@
+"""
+Background tasks backed by the Job table.
+
+    from tasks.queue import enqueue, task
+
+    @task()                       # in <app>/tasks.py, found at startup
+    def fan_out_new_post(post_id):
+        ...
+
+    enqueue(fan_out_new_post, {"post_id": post.pk}, key=f"fan-out:{post.pk}")
+
+- `enqueue` inserts the Job row in the caller's transaction, so a job
+  exists exactly when the change that needs it was committed, and
+  survives a crash of the process that queued it.
+- After the commit the job id is handed to a runner (TASKS_MODE):
+  "thread" runs it in a small in-process pool, "sync" runs it in the
+  committing thread, "worker" leaves it to `run_workers`.
+- A job that raises is queued again after TASKS_RETRY_DELAY * 2**n
+  seconds until `max_attempts`, then marked failed. A job left running
+  longer than TASKS_LEASE (its worker died) is queued again.
+- `key` is an idempotency key: while a job with that key is queued,
+  enqueueing it again returns the queued job instead of adding one (and
+  hands it to the runner again, in case the process that queued it
+  stopped before running it).
+
+Payloads are JSON (ids, not model instances), and tasks must be safe to
+run more than once.
+"""
+
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def tasks_mode():
+    return getattr(settings, "TASKS_MODE", "thread")
+
+
+def in_process_workers():
+    return getattr(settings, "TASKS_IN_PROCESS_WORKERS", 2)
+
+
+def max_attempts():
+    return getattr(settings, "TASKS_MAX_ATTEMPTS", 3)
+
+
+def retry_delay():
+    return getattr(settings, "TASKS_RETRY_DELAY", 10)
+
+
+def lease():
+    return getattr(settings, "TASKS_LEASE", 5 * 60)
+
+
+def task(name=None, attempts=None):
+    """Register a function as a task under `name` (default: module.function)."""
+
+    def register(func):
+        func.task_name = name or f"{func.__module__}.{func.__name__}"
+        func.max_attempts = attempts
+        registry[func.task_name] = func
+        return func
+
+    return register
+
+
+def enqueue(func, payload=None, key=None, delay=0):
+    """
+    Queue `func(**payload)` to run once the current transaction commits.
+
+    Returns the Job (the already queued one if `key` is taken).
+    """
+    job = Job(
+        name=func.task_name,
+        payload=payload or {},
+        key=key,
+        max_attempts=func.max_attempts or max_attempts(),
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        if key is None:
+            raise
+        queued = Job.objects.filter(key=key, status=Job.QUEUED).first()
+        if queued is not None:
+            job = queued
+        else:
+            # it was claimed in between: queue this one after all
+            job.save()
+
+    mode = tasks_mode()
+    if delay or mode == "worker":
+        return job
+    if mode == "sync":
+        transaction.on_commit(lambda: run_job(job.pk))
+    else:
+        transaction.on_commit(lambda: runner.submit(job.pk))
+    return job
+
+
+def claim(job_id):
+    """Mark a due queued job as running. True if this caller got it."""
+    now = timezone.now()
+    return bool(
+        Job.objects.filter(pk=job_id, status=Job.QUEUED, run_after__lte=now).update(
+            status=Job.RUNNING, started_at=now, attempts=F("attempts") + 1
+        )
+    )
+
+
+def claim_due(limit):
+    """Claim up to `limit` due jobs, oldest first. Returns their ids."""
+    candidates = (
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now())
+        .order_by("run_after", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    return [job_id for job_id in candidates if claim(job_id)]
+
+
+def execute(job_id):
+    """Run a claimed job and record the outcome."""
+    job = Job.objects.get(pk=job_id)
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"No task registered as {job.name!r}")
+        func(**job.payload)
+    except Exception as exc:
+        logger.exception("Task %s failed (attempt %s)", job, job.attempts)
+        _failed(job, exc)
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.DONE, finished_at=timezone.now(), error=""
+        )
+
+
+def _failed(job, exc):
+    now = timezone.now()
+    error = f"{type(exc).__name__}: {exc}"
+    if job.attempts >= job.max_attempts:
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=now, error=error)
+        return
+    run_after = now + timedelta(seconds=retry_delay() * 2 ** (job.attempts - 1))
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, run_after=run_after, error=error
+            )
+    except IntegrityError:
+        # a newer job with the same key is queued and will do the work
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.DONE, finished_at=now, error=f"{error} (superseded)"
+        )
+
+
+def run_job(job_id):
+    """Claim and execute one job (no-op if it is not due or already taken)."""
+    if claim(job_id):
+        execute(job_id)
+
+
+def requeue_stale():
+    """Queue again the jobs whose worker stopped mid-run. Returns how many."""
+    stale = Job.objects.filter(
+        status=Job.RUNNING, started_at__lt=timezone.now() - timedelta(seconds=lease())
+    )
+    return sum(_requeue(job) for job in stale.only("id", "attempts", "max_attempts"))
+
+
+def _requeue(job):
+    running = Job.objects.filter(pk=job.pk, status=Job.RUNNING)
+    if job.attempts >= job.max_attempts:
+        return bool(
+            running.update(status=Job.FAILED, finished_at=timezone.now(), error="Lease expired")
+        )
+    try:
+        with transaction.atomic():
+            return bool(running.update(status=Job.QUEUED, run_after=timezone.now()))
+    except IntegrityError:
+        return bool(running.update(status=Job.DONE, finished_at=timezone.now()))
+
+
+def purge_finished(older_than):
+    """Delete done jobs finished more than `older_than` seconds ago."""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+class InProcessRunner:
+    """Runs freshly committed jobs in a small pool of the web process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, job_id):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=in_process_workers(), thread_name_prefix="tasks"
+                )
+            executor = self._executor
+        executor.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        try:
+            run_job(job_id)
+        except Exception:
+            # left running; requeue_stale picks it up after the lease
+            logger.exception("Task runner failed on job %s", job_id)
+        finally:
+            # The pool thread has its own connections; don't leave them open.
+            connections.close_all()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+runner = InProcessRunner()
+
+
+@atexit.register
+def _finish_on_exit():
+    runner.shutdown()
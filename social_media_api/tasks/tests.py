@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim_due, enqueue, execute, requeue_stale, run_job, task
+
+calls = []
+
+
+@task("tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task("tests.fail", attempts=2)
+def fail():
+    raise RuntimeError("boom")
+
+
+@override_settings(TASKS_MODE="worker", TASKS_RETRY_DELAY=10, TASKS_LEASE=300)
+class QueueTests(TestCase):
+    """Job lifecycle (tasks/queue.py)."""
+
+    def setUp(self):
+        calls.clear()
+
+    def job(self, pk):
+        return Job.objects.get(pk=pk)
+
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+
+    def run_failing(self, job_id, run=run_job):
+        with self.assertLogs("tasks.queue", "ERROR"):
+            run(job_id)
+
+    def test_run(self):
+        job = enqueue(record, {"value": 1})
+        self.assertEqual(claim_due(10), [job.pk])
+        execute(job.pk)
+        self.assertEqual(calls, [1])
+        job = self.job(job.pk)
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+
+    def test_claimed_once(self):
+        job = enqueue(record, {"value": 1})
+        run_job(job.pk)
+        run_job(job.pk)
+        self.assertEqual(calls, [1])
+
+    def test_key_while_queued(self):
+        first = enqueue(record, {"value": 1}, key="k")
+        self.assertEqual(enqueue(record, {"value": 2}, key="k").pk, first.pk)
+        run_job(first.pk)
+        # once it has run, the key is free again
+        second = enqueue(record, {"value": 3}, key="k")
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_retry_with_backoff(self):
+        job = enqueue(fail)
+        before = timezone.now()
+        self.run_failing(job.pk)
+        job = self.job(job.pk)
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertEqual(job.error, "RuntimeError: boom")
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=10))
+        # not due yet
+        self.assertEqual(claim_due(10), [])
+
+        self.make_due(job)
+        self.run_failing(job.pk)
+        job = self.job(job.pk)
+        # `attempts=2` on the task
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_unknown_task(self):
+        job = Job.objects.create(name="tests.missing")
+        self.run_failing(job.pk)
+        self.assertIn("LookupError", self.job(job.pk).error)
+
+    def test_stale_job_is_requeued(self):
+        job = enqueue(record, {"value": 1})
+        self.assertEqual(claim_due(10), [job.pk])
+        # its worker died; within the lease nothing happens
+        self.assertEqual(requeue_stale(), 0)
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(seconds=301))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(self.job(job.pk).status, Job.QUEUED)
+        run_job(job.pk)
+        self.assertEqual(calls, [1])
+
+    def test_stale_job_out_of_attempts_fails(self):
+        job = enqueue(fail)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            attempts=2,
+            started_at=timezone.now() - timedelta(seconds=301),
+        )
+        requeue_stale()
+        job = self.job(job.pk)
+        self.assertEqual((job.status, job.error), (Job.FAILED, "Lease expired"))
+
+    def test_retry_superseded_by_a_newer_job(self):
+        job = enqueue(fail, key="k")
+        self.assertEqual(claim_due(10), [job.pk])
+        newer = enqueue(fail, key="k")
+        self.run_failing(job.pk, run=execute)
+        # the newer queued job does the work; this one is not queued twice
+        self.assertEqual(self.job(job.pk).status, Job.DONE)
+        self.assertEqual(self.job(newer.pk).status, Job.QUEUED)
+
+    @override_settings(TASKS_MODE="sync")
+    def test_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(record, {"value": 1})
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [1])
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import TaskMetricsView
+
+urlpatterns = [
+    path("tasks/metrics/", TaskMetricsView.as_view(), name="task-metrics"),
+]
@@ -0,0 +1,18 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import queue_metrics
+
+
+class TaskMetricsView(APIView):
+    """
+    GET /tasks/metrics/
+    Queue depth, failures and job latency of the background tasks
+    (tasks/metrics.py). Admin only.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(queue_metrics())
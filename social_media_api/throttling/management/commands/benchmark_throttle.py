@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from posts.benchmarking import timed
+from throttling.models import ThrottleCounter
+from throttling.stores import CacheStore, DatabaseStore
+from throttling.throttles import ScopedSlidingWindowThrottle
+
+User = get_user_model()
+
+
+class BenchmarkThrottle(ScopedSlidingWindowThrottle):
+    """The real throttle with a given rate and store."""
+
+    def __init__(self, rate, store):
+        super().__init__()
+        self.bench_rate = rate
+        self.store = store
+
+    def get_rate(self):
+        return self.bench_rate
+
+    def get_store(self):
+        return self.store
+
+
+class BenchmarkView:
+    throttle_scope = "benchmark"
+
+
+class Command(BaseCommand):
+    """
+    Cost of one throttle check (ScopedSlidingWindowThrottle.allow_request)
+    with each store: allowed requests (read + count) and denied ones
+    (read only), spread over --users keys.
+
+    Usage (the database store writes ThrottleCounter rows; use a scratch
+    database, see posts/benchmarking.py):
+      python manage.py benchmark_throttle
+      python manage.py benchmark_throttle --checks 20000 --users 5000
+    """
+
+    help = "Time a throttle check with the cache store and the database store."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checks", type=int, default=5000)
+        parser.add_argument("--users", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        requests = []
+        for user_id in range(1, options["users"] + 1):
+            request = factory.post("/api/posts/1/like/")
+            request.user = User(id=user_id)
+            requests.append(request)
+
+        view = BenchmarkView()
+        for store in (CacheStore(), DatabaseStore()):
+            for label, rate in (("allowed", "1000000/min"), ("denied", "1/min")):
+                throttle = BenchmarkThrottle(rate, store)
+                position = iter(range(10**9))
+
+                def check():
+                    request = requests[next(position) % len(requests)]
+                    return throttle.allow_request(request, view)
+
+                # one request per key first, so "denied" really is denied
+                for _ in requests:
+                    check()
+                p50, p95 = timed(check, repeat=options["checks"])
+                self.stdout.write(
+                    f"{type(store).__name__:<14} {label:<8} "
+                    f"p50 {p50 * 1000:>7.1f} us   p95 {p95 * 1000:>7.1f} us"
+                )
+
+        ThrottleCounter.objects.filter(key__startswith="throttle_benchmark_").delete()
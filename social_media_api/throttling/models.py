@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class ThrottleCounter(models.Model):
+    """
+    Requests counted for one throttle key in one fixed window, for the
+    database store (throttling/stores.py). Only the current and the
+    previous window of a key are kept.
+    """
+
+    key = models.CharField(max_length=200)
+    # window start, in whole periods since the epoch
+    window = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["key", "window"], name="unique_throttle_window"),
+        ]
+
+    def __str__(self):
+        return f"{self.key} @ {self.window}: {self.count}"
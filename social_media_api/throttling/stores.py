@@ -0,0 +1,117 @@
+"""
+Counter stores for the sliding-window throttle (throttling/throttles.py).
+
+A store keeps, per throttle key, how many requests were allowed in each
+fixed window (window = whole periods since the epoch). The throttle
+only ever reads the current and the previous window. Pick one with
+THROTTLE_STORE (dotted path):
+
+- CacheStore (default): counters in the cache named THROTTLE_CACHE_ALIAS.
+  With LocMemCache each process counts on its own, so with N gunicorn
+  workers a client gets up to N times the rate. Point the alias at a
+  shared cache (Redis, Memcached), or use DatabaseStore.
+- DatabaseStore: counters in the ThrottleCounter table, shared by every
+  process. Costs one SELECT and one upsert per allowed request. Both are
+  plain SQL: the ORM would add several times the query time to a check
+  that runs on every request.
+"""
+
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from .models import ThrottleCounter
+
+
+class CacheStore:
+    def __init__(self):
+        self.cache = caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")]
+
+    def counts(self, key, window):
+        """(previous window count, current window count)"""
+        names = [f"{key}:{window - 1}", f"{key}:{window}"]
+        values = self.cache.get_many(names)
+        return values.get(names[0], 0), values.get(names[1], 0)
+
+    def add(self, key, window, period):
+        name = f"{key}:{window}"
+        # kept for two periods: it is the "previous" window of the next one
+        timeout = 2 * period + 1
+        if self.cache.add(name, 1, timeout):
+            return
+        try:
+            self.cache.incr(name)
+        except ValueError:
+            # expired between add() and incr()
+            self.cache.set(name, 1, timeout)
+
+
+class DatabaseStore:
+    def __init__(self):
+        self.using = router.db_for_write(ThrottleCounter)
+        connection = connections[self.using]
+        quote = connection.ops.quote_name
+        table = quote(ThrottleCounter._meta.db_table)
+        key, window, count = quote("key"), quote("window"), quote("count")
+
+        self.select_sql = (
+            f"SELECT {window}, {count} FROM {table} WHERE {key} = %s AND {window} IN (%s, %s)"
+        )
+        # INSERT ... ON CONFLICT: SQLite 3.35+ and PostgreSQL
+        self.upsert_sql = None
+        if connection.vendor in ("sqlite", "postgresql"):
+            self.upsert_sql = (
+                f"INSERT INTO {table} ({key}, {window}, {count}) VALUES (%s, %s, 1) "
+                f"ON CONFLICT ({key}, {window}) DO UPDATE SET {count} = {table}.{count} + 1 "
+                f"RETURNING {count}"
+            )
+
+    def counts(self, key, window):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(self.select_sql, [key, window - 1, window])
+            rows = dict(cursor.fetchall())
+        return rows.get(window - 1, 0), rows.get(window, 0)
+
+    def add(self, key, window, period):
+        if self.upsert_sql is None:
+            created = self._add_orm(key, window)
+        else:
+            with connections[self.using].cursor() as cursor:
+                cursor.execute(self.upsert_sql, [key, window])
+                created = cursor.fetchone()[0] == 1
+        if created:
+            # first request of a new window: the key's older windows are done
+            ThrottleCounter.objects.using(self.using).filter(
+                key=key, window__lt=window - 1
+            ).delete()
+
+    def _add_orm(self, key, window):
+        """Returns True if the counter row was created."""
+        counter = ThrottleCounter.objects.using(self.using).filter(key=key, window=window)
+        if counter.update(count=F("count") + 1):
+            return False
+        try:
+            with transaction.atomic(using=self.using):
+                counter.create(key=key, window=window, count=1)
+        except IntegrityError:
+            # another process created it first
+            counter.update(count=F("count") + 1)
+            return False
+        return True
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = getattr(settings, "THROTTLE_STORE", "throttling.stores.CacheStore")
+            _store = import_string(path)()
+        return _store
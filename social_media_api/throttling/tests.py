@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+
+from posts.models import Post
+
+from .models import ThrottleCounter
+from .stores import CacheStore, DatabaseStore
+from .throttles import ScopedSlidingWindowThrottle
+
+User = get_user_model()
+
+def rates(**overrides):
+    rates = {**api_settings.DEFAULT_THROTTLE_RATES, **overrides}
+    return {**api_settings.user_settings, "DEFAULT_THROTTLE_RATES": rates}
+
+
+@override_settings(REST_FRAMEWORK=rates(like="10/min"))
+class SlidingWindowTests(TestCase):
+    """The sliding-window estimate (throttling/throttles.py), on both stores."""
+
+    store_class = CacheStore
+
+    def setUp(self):
+        caches["throttle"].clear()
+        self.store = self.store_class()
+        self.request = SimpleNamespace(user=User(pk=1, username="alice"))
+        self.view = SimpleNamespace(throttle_scope="like")
+        self.now = 600.0  # the start of window 10
+
+    def allowed(self, count=1, at=None):
+        """How many of `count` requests at time `at` are allowed."""
+        if at is not None:
+            self.now = at
+        allowed = 0
+        for _ in range(count):
+            throttle = ScopedSlidingWindowThrottle()
+            throttle.timer = lambda: self.now
+            throttle.get_store = lambda: self.store
+            if throttle.allow_request(self.request, self.view):
+                allowed += 1
+            self.throttle = throttle
+        return allowed
+
+    def test_rate_within_a_window(self):
+        self.assertEqual(self.allowed(15), 10)
+        # the whole next window: by then this one weighs too much
+        self.assertEqual(self.throttle.wait(), 60)
+
+    def test_no_burst_across_the_boundary(self):
+        self.assertEqual(self.allowed(10, at=659.0), 10)
+        # a fixed window would allow 10 more right after the reset
+        self.assertEqual(self.allowed(10, at=660.0), 0)
+        # half way through, the previous window counts for half
+        self.assertEqual(self.allowed(10, at=690.0), 5)
+
+    def test_denied_requests_are_not_counted(self):
+        self.allowed(50, at=600.0)
+        # 54 s into the next window the 10 allowed weigh 1: 9 more fit
+        # (had the denied ones counted, 50 would weigh 5)
+        self.assertEqual(self.allowed(10, at=714.0), 9)
+
+    def test_wait(self):
+        self.allowed(10, at=659.0)
+        # 10 * 59/60 + 1 is over the rate after one more request
+        self.assertEqual(self.allowed(2, at=661.0), 1)
+        # until the previous window's share drops under 9, at 666 s
+        self.assertAlmostEqual(self.throttle.wait(), 5.0)
+        self.assertEqual(self.allowed(1, at=666.5), 1)
+
+    def test_other_users_and_scopes_count_separately(self):
+        self.allowed(10)
+        self.request = SimpleNamespace(user=User(pk=2, username="bob"))
+        self.assertEqual(self.allowed(1), 1)
+        self.view = SimpleNamespace(throttle_scope=None)
+        self.assertEqual(self.allowed(20), 20)
+
+
+class DatabaseStoreTests(SlidingWindowTests):
+    store_class = DatabaseStore
+
+    def test_old_windows_are_deleted(self):
+        self.allowed(1, at=600.0)
+        self.allowed(1, at=660.0)
+        self.allowed(1, at=720.0)
+        self.assertEqual(
+            sorted(ThrottleCounter.objects.values_list("window", "count")), [(11, 1), (12, 1)]
+        )
+
+
+@override_settings(REST_FRAMEWORK=rates(like="2/min"))
+class ThrottledViewTests(TestCase):
+    """Views with a `throttle_scope` answer 429 once over the rate."""
+
+    def test_429_with_retry_after(self):
+        cache.clear()
+        caches["throttle"].clear()
+        user = User.objects.create_user("alice", password="pw")
+        post = Post.objects.create(author=user, title="t", content="c")
+        client = APIClient()
+        client.force_authenticate(user)
+        statuses = [client.post(f"/api/posts/{post.pk}/like/").status_code for _ in range(3)]
+        self.assertEqual(statuses, [201, 200, 429])
+        response = client.post(f"/api/posts/{post.pk}/like/")
+        self.assertIn("Retry-After", response)
@@ -0,0 +1,70 @@
+"""
+Rate limiting per user (per client IP when anonymous) and per endpoint
+scope, with a sliding-window counter.
+
+A view opts in with `throttle_scope = "like"` (like DRF's
+ScopedRateThrottle); rates are REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"].
+
+A fixed window ("60 per minute, reset on the minute") lets a client send
+twice the rate across a window boundary. A sliding log fixes that but
+stores every request. The sliding-window counter keeps two counters per
+key, for the current and the previous window, and estimates the requests
+in the last period as
+
+    previous * (1 - elapsed part of the current window) + current
+
+Requests are allowed while the estimate is under the rate. Denied
+requests are not counted. Counters live in a pluggable store
+(throttling/stores.py).
+"""
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+from .stores import get_store
+
+
+class ScopedSlidingWindowThrottle(ScopedRateThrottle):
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        window, offset = divmod(self.timer(), self.duration)
+        window = int(window)
+        store = self.get_store()
+        self.previous, self.current = store.counts(self.key, window)
+        self.offset = offset
+
+        estimate = self.previous * (1 - offset / self.duration) + self.current
+        if estimate >= self.num_requests:
+            return False
+        store.add(self.key, window, self.duration)
+        return True
+
+    def wait(self):
+        """Seconds until the estimate drops under the rate again."""
+        limit, period = self.num_requests, self.duration
+        if self.current < limit:
+            # the previous window's share keeps shrinking in this window
+            needed = period * (1 - (limit - self.current) / self.previous)
+            return max(needed - self.offset, 0)
+        # only the next window helps; then this window is the previous one
+        return period - self.offset + max(period * (1 - limit / self.current), 0)
+
+    def get_store(self):
+        return get_store()
+
+    def get_rate(self):
+        # DRF binds THROTTLE_RATES when the class is created; read the
+        # current settings so overridden rates apply
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()